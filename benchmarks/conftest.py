@@ -0,0 +1,84 @@
+"""
+Fixed snapshots for the benchmarks, generated from a seed so every run sees the same galaxy.
+"""
+import contextlib
+import json
+import os
+import random
+
+import pytest
+from pytest_benchmark.utils import parse_compare_fail
+from space_tycoon_client import ApiClient, Configuration, GameApi
+
+import bot
+from galaxy import generate
+from recording import RecordedResponse
+from scaling import GalaxyApiClient
+
+SEED = 44
+SHIPS = 1000
+PLANETS = 50
+# combat and trade reports in the /reports snapshot
+REPORTS = 2000
+# comparing with a saved run fails once a median gets slower by more than this
+REGRESSION = "median:25%"
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    if config.getoption("benchmark_compare", None) and not config.getoption("benchmark_compare_fail", None):
+        config.option.benchmark_compare_fail = [parse_compare_fail(REGRESSION)]
+
+
+def response(payload) -> RecordedResponse:
+    return RecordedResponse({"status": 200, "reason": "OK", "response": json.dumps(payload), "headers": {}})
+
+
+@pytest.fixture(scope="session")
+def snapshot():
+    """
+    /static-data and /data payloads
+    """
+    return generate(seed=SEED, ships=SHIPS, planets=PLANETS, wrecks=SHIPS // 10)
+
+
+@pytest.fixture(scope="session")
+def reports_payload(snapshot):
+    _, data = snapshot
+    rand = random.Random(SEED)
+    ship_ids = list(data["ships"])
+    planet_ids = list(data["planets"])
+    tick = data["currentTick"]["tick"]
+    return {
+        "combat": [{"tick": tick, "attacker": rand.choice(ship_ids), "defender": rand.choice(ship_ids),
+                    "killed": rand.random() < 0.1} for _ in range(REPORTS)],
+        "trade": [{"tick": tick, "buyer": rand.choice(ship_ids), "seller": rand.choice(planet_ids), "resource": "1",
+                   "amount": rand.randint(1, 100), "price": rand.randint(50, 300)} for _ in range(REPORTS)],
+        "profiling": [], "prices": {}, "resourceAmounts": {}, "scores": {},
+        "seasonScores": {"1": {player_id: 1000000 for player_id in data["players"]}}, "season": 1, "tick": tick,
+    }
+
+
+@pytest.fixture(scope="session")
+def api_client():
+    return ApiClient()
+
+
+@pytest.fixture(scope="session")
+def data(snapshot, api_client):
+    return api_client.deserialize(response(snapshot[1]), "Data")
+
+
+@pytest.fixture
+def game(snapshot):
+    """
+    Game logged into the snapshot, which has played one tick already.
+    """
+    configuration = Configuration()
+    configuration.host = "http://galaxy"
+    client = GameApi(api_client=GalaxyApiClient(*snapshot, configuration=configuration))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        game = bot.Game(client, {"user": "benchmark", "password": "benchmark"})
+        game.data = client.data_get()
+        game.game_logic()
+    return game
@@ -0,0 +1,116 @@
+"""
+Timings of the hot paths of a tick on a 1000 ship snapshot.
+
+    pytest --benchmark-save=baseline
+    pytest --benchmark-compare
+
+The second run fails once any median got slower than the saved one by more than REGRESSION.
+"""
+import contextlib
+import os
+import random
+
+from space_tycoon_client.models import AttackCommand, Destination, MoveCommand, TradeCommand
+
+import bot
+from conftest import SEED, response
+from world import WorldState
+
+
+def test_get_dist(benchmark):
+    rand = random.Random(SEED)
+    points = [(rand.uniform(-1500, 1500), rand.uniform(-1500, 1500)) for _ in range(1001)]
+
+    def run():
+        return [bot.get_dist(a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:])]
+
+    assert len(benchmark(run)) == 1000
+
+
+def test_find_ships_in_radius(benchmark, data):
+    enemy_ships = bot.get_enemy_ships(data.ships)
+    positions = [ship.position for ship in list(data.ships.values())[:20]]
+
+    def run():
+        return [bot.find_ships_in_radius(position, bot.RADIUS, enemy_ships, exclude_classes={"3"}) for position in positions]
+
+    assert len(benchmark(run)) == len(positions)
+
+
+def test_trade(benchmark, game):
+    shippers = game._get_ships(ship_class="3")
+
+    def run():
+        commands = {}
+        game.trade(commands, shippers)
+        return commands
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        benchmark(run)
+
+
+def test_hadrian_wall(benchmark, game):
+    motherships = game._get_our_motherships()
+    mothership_id, mothership = next(iter(motherships.items()))
+    fleet = game.fleets.update(motherships)[mothership_id]
+    fighters = game._get_fighters()
+    enemy_ships = game._get_enemy_ships()
+    "the closest enemies are the intruders, the snapshot has no fight going on by itself"
+    intruders = dict(sorted(enemy_ships.items(), key=lambda item: bot.get_dist(
+        item[1].position[0], item[1].position[1], mothership.position[0], mothership.position[1]))[:20])
+
+    def run():
+        commands = {}
+        game.hadrian_wall(commands, fleet, mothership, fighters, intruders, enemy_ships)
+        return commands
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        assert benchmark(run)
+
+
+def test_deserialize_data(benchmark, snapshot, api_client):
+    body = response(snapshot[1])
+    data = benchmark(api_client.deserialize, body, "Data")
+    assert len(data.ships) == len(snapshot[1]["ships"])
+
+
+def test_deserialize_reports(benchmark, reports_payload, api_client):
+    body = response(reports_payload)
+    reports = benchmark(api_client.deserialize, body, "Reports")
+    assert len(reports.trade) == len(reports_payload["trade"])
+
+
+def test_sanitize_commands(benchmark, data, api_client):
+    rand = random.Random(SEED)
+    ship_ids = list(data.ships)
+    planet_ids = list(data.planets)
+    commands = {}
+    for ship_id in ship_ids:
+        kind = rand.randrange(3)
+        if kind == 0:
+            commands[ship_id] = TradeCommand(amount=rand.randint(-100, 100) or 1, resource="1", target=rand.choice(planet_ids))
+        elif kind == 1:
+            commands[ship_id] = MoveCommand(destination=Destination(coordinates=[rand.uniform(-1500, 1500), rand.uniform(-1500, 1500)]))
+        else:
+            commands[ship_id] = AttackCommand(target=rand.choice(ship_ids))
+
+    assert len(benchmark(api_client.sanitize_for_serialization, commands)) == len(commands)
+
+
+def test_world_branch(benchmark, data):
+    "a planner exploring a branch: fork, move twenty ships, read them back and roll back"
+    world = WorldState(data)
+    ship_ids = list(data.ships)[:20]
+
+    def run():
+        branch = world.fork()
+        mark = branch.checkpoint()
+        for ship_id in ship_ids:
+            x, y = branch.ships[ship_id].position
+            branch.update("ships", ship_id, position=(x + 1, y + 1))
+        moved = [branch.ships[ship_id].position for ship_id in ship_ids]
+        branch.rollback(mark)
+        return moved
+
+    assert len(benchmark(run)) == len(ship_ids)
+    assert world.changed() == 0
@@ -1,4 +1,6 @@
 import collections
+import signal
+import sys
 import traceback
 from pprint import pprint
 from typing import Dict, Tuple
@@ -23,6 +25,15 @@ from space_tycoon_client.models.ship import Ship
 from space_tycoon_client.models.static_data import StaticData
 from space_tycoon_client.rest import ApiException
 
+from combat import DamageAllocator, EngagementSimulator, RepairPlanner, ThreatTracker
+from defense import EscortPlanner, FleetCoordinator
+from fleet import FleetPlanner
+from navigation import DangerMap, Navigator, WreckIndex
+from planning import CommandEvaluator
+from players import PlayerProfiles
+from recording import RecordingApiClient
+from trading import OpportunityDetector, PlanetDistances, SellPlanner, TradeLedger, TradeSizer
+
 debug = False
 trace = False
 if debug:
@@ -31,12 +42,14 @@ else:
     CONFIG_FILE = "config.yml"
 RADIUS = 250
 ATTACK_RADIUS = 70
+# distance from which an attack hits, targets are picked from further away
+ATTACK_RANGE = 50
 TRADE_CENTER_TOL = 30
+# season scores are fetched from /reports once in this many ticks
+SCORES_EVERY = 50
 ATTACK_PRIORITIES = ["5", "4", "1"]
-SHIP_LIFES = {
-    "4": 150,
-    "5": 250,
-}
+# smallest lot worth the trip
+MIN_CARGO = 4
 
 
 class ConfigException(Exception):
@@ -47,9 +60,6 @@ class Fighter:
     def __init__(self, idf, ship_class):
         self.id = idf
         self.ship_class = ship_class
-        self.maximum_life = 0
-        if ship_class in SHIP_LIFES:
-            self.maximum_life = SHIP_LIFES[ship_class]
         self.attack = False
 
 
@@ -65,10 +75,24 @@ class Game:
         self.tick = self.data.current_tick.tick
 
         # dynamic fleet values
-        self.active_defenders = {}
+        self.fleets = FleetCoordinator(cell_size=RADIUS)
         self.shippers_center = [0, 0]  # will be center of shippers for now
-        self.target_active: Optional[Tuple] = None
-        self.ticks_from_last_repair = 0
+        self.trade_sizer = TradeSizer(self.static_data)
+        self.planet_distances = PlanetDistances()
+        self.sell_planner = SellPlanner(self.planet_distances)
+        self.opportunities = OpportunityDetector()
+        self.fleet_planner = FleetPlanner(self.static_data)
+        self.ledger = TradeLedger()
+        self.wreck_index = WreckIndex()
+        self.danger = DangerMap()
+        self.navigator = Navigator(self.danger)
+        self.profiles = PlayerProfiles(self.static_data, self.player_id, allies=config.get("allies") or ())
+        self.escorts = EscortPlanner(self.static_data)
+        self.threats = ThreatTracker(radius=ATTACK_RADIUS, cell_size=RADIUS)
+        self.engagement = EngagementSimulator(self.static_data, support_radius=ATTACK_RADIUS, priorities=ATTACK_PRIORITIES)
+        self.repair_planner = RepairPlanner(self.static_data, radius=ATTACK_RADIUS)
+        self.damage_allocator = DamageAllocator(self.static_data, priorities=ATTACK_PRIORITIES)
+        self.what_if = CommandEvaluator(self.static_data, attack_range=ATTACK_RANGE)
 
         # this part is custom logic, feel free to edit / delete
         if self.player_id not in self.data.players:
@@ -144,6 +168,9 @@ class Game:
             return 0, 0
         return ships[0]
 
+    def _get_our_motherships(self) -> dict:
+        return self._get_ships(ship_class="1")
+
     def _get_closest_ship_to_all_fighters(self, enemy_ships, our_ships):
         ship_pos = [(ship.position[0], ship.position[1]) for ship in our_ships.values()]
 
@@ -174,151 +201,313 @@ class Game:
             sum_y += ship.position[1]
         self.shippers_center = [sum_x / ship_count, sum_y / ship_count]
 
-    def initiate_fleet_attack(self, commands, mothership_id, attack_id):
+    def initiate_fleet_attack(self, commands, fleet, attack_id):
         "skip when in manual mode"
-        #if self.data.ships[mothership_id].name == "RAGE":
+        #if self.data.ships[fleet.mothership_id].name == "RAGE":
         #    return
 
-        commands[mothership_id] = AttackCommand(attack_id)
-        for fighter in self.active_defenders.values():
-            commands[fighter.id] = MoveCommand(Destination(target=mothership_id))
+        commands[fleet.mothership_id] = AttackCommand(attack_id)
+        for fighter in fleet.active_defenders.values():
+            commands[fighter.id] = MoveCommand(Destination(target=fleet.mothership_id))
 
-    def initiate_fighters_attack(self, commands, attack_id):
-        for fighter in self.active_defenders.values():
+    def initiate_fighters_attack(self, commands, fleet, attack_id, fighters=None, targets=None):
+        """
+        Sends the defenders into battle. With the targets in reach given, the damage is split
+        by the DamageAllocator, the rest of the fighters go for attack_id.
+        """
+        allocation = {}
+        if fighters and targets:
+            attackers = {fighter_id: fighters[fighter_id] for fighter_id in fleet.active_defenders if fighter_id in fighters}
+            "the mothership keeps hitting its target, the fighters only cover the rest"
+            support = {}
+            mothership = self.data.ships.get(fleet.mothership_id)
+            command = commands.get(fleet.mothership_id, mothership.command if mothership is not None else None)
+            if command is not None and command.type == "attack" and command.target in targets:
+                support[command.target] = self.static_data.ship_classes[mothership.ship_class].damage or 0
+            allocation = self.damage_allocator.allocate(attackers, targets, primary=attack_id, support=support)
+
+        for fighter in fleet.active_defenders.values():
             "skip when in manual mode"
             #if fighter.name == "RAGE":
             #    continue
 
-            commands[fighter.id] = AttackCommand(attack_id)
+            commands[fighter.id] = AttackCommand(allocation.get(fighter.id, attack_id))
             fighter.attack = True
 
-    def move_fleet_to_position(self, commands, mothership_id, pos=None):
+    def move_fleet_to_position(self, commands, fleet, pos=None):
         "skip when in manual mode"
-        #if self.data.ships[mothership_id].name == "RAGE":
+        #if self.data.ships[fleet.mothership_id].name == "RAGE":
         #    return
 
-        commands[mothership_id] = MoveCommand(Destination(coordinates=pos))
-        for fighter in self.active_defenders.values():
-            commands[fighter.id] = MoveCommand(Destination(target=mothership_id))
+        commands[fleet.mothership_id] = MoveCommand(Destination(coordinates=pos))
+        for fighter in fleet.active_defenders.values():
+            commands[fighter.id] = MoveCommand(Destination(target=fleet.mothership_id))
 
-    def hadrian_wall(self, commands, mothership_id, mothership, fighters, enemy_ships, exclude_players=set()):
+    def hadrian_wall(self, commands, fleet, mothership, fighters, intruders, enemy_ships):
         """
         Attacks intruders in given RADIUS by sending our mothership.
         When on sight (ATTACK_RADIUS), fighters surrounding our motherships are sent into battle.
+        Targets are chosen by the EngagementSimulator, ATTACK_PRIORITIES only break ties.
+        Intruders are the ships assigned to this fleet by the FleetCoordinator.
         """
 
-        intruders = find_ships_in_radius(
-            mothership.position, RADIUS, enemy_ships, exclude_classes=set("3"), exclude_players=exclude_players
-        )
-        targets = find_ships_in_radius(
-            mothership.position, ATTACK_RADIUS, enemy_ships, exclude_classes=set("3"), exclude_players=exclude_players
-        )
+        mothership_id = fleet.mothership_id
+        targets = find_ships_in_radius(mothership.position, ATTACK_RADIUS, intruders)
 
         any_fighter_attacking = False
-        for fighter_id, fighter in self.active_defenders.items():
+        for fighter_id, fighter in fleet.active_defenders.items():
             any_fighter_attacking |= fighter.attack
 
         # we destroyed intruders, turn off the attack and return to base
-        if self.target_active is not None:
-            if self.target_active[0] not in intruders.keys():
-                self.target_active = None
-        if self.target_active is None:
+        if fleet.target_active is not None:
+            if fleet.target_active[0] not in intruders.keys():
+                fleet.target_active = None
+        if fleet.target_active is None:
             any_fighter_attacking = False
         if len(intruders.keys()) == 0:
-            for fighter_id, fighter in self.active_defenders.items():
+            for fighter_id, fighter in fleet.active_defenders.items():
                 fighter.attack = False
-            self.target_active = None
+            fleet.target_active = None
 
-            # move ships back to protect shipment
-            """
-            if self.data.ships[mothership_id].name != "RAGE":
-                pos = [int(self.shippers_center[0]), int(self.shippers_center[1])]
-                if pos[0] == -10000:
-                    return
+            # ships move back to protect shipment in escort_shippers
 
-                self.move_fleet_to_position(commands, mothership_id, pos=pos)
-            """
+        attackers = [mothership] + [fighters[fighter_id] for fighter_id in fleet.active_defenders if fighter_id in fighters]
 
-        # a new threat has appeared
+        # a new threat has appeared, go for the one with the best predicted outcome
         if not any_fighter_attacking and len(intruders.keys()) > 0:
-            enemy_ship_id = next(iter(intruders))
-            self.target_active = (enemy_ship_id, intruders[enemy_ship_id])
-            self.initiate_fleet_attack(commands, mothership_id, enemy_ship_id)
-        # we are combatting now but higher priority enemy has appeared close
-        if any_fighter_attacking and self.target_active is not None and len(targets.keys()) > 0:
-            enemy_ship = self.target_active[1]
-            if enemy_ship.ship_class in ATTACK_PRIORITIES:
-                pr_index = ATTACK_PRIORITIES.index(enemy_ship.ship_class)
-                look_for_classes = ATTACK_PRIORITIES[:pr_index]
-                for target_id, target_ship in targets.items():
-                    if target_ship.ship_class in look_for_classes:
-                        self.target_active = (target_id, targets[target_id])
-                        self.initiate_fighters_attack(commands, target_id)
-                        break
+            enemy_ship_id = self.engagement.best_target(attackers, intruders, enemy_ships, self.profiles.weight).target
+            fleet.target_active = (enemy_ship_id, intruders[enemy_ship_id])
+            self.initiate_fleet_attack(commands, fleet, enemy_ship_id)
+        # we are combatting now but a better target has appeared close
+        if any_fighter_attacking and fleet.target_active is not None and len(targets.keys()) > 0:
+            candidates = dict(targets)
+            candidates[fleet.target_active[0]] = intruders[fleet.target_active[0]]
+            best = self.engagement.best_target(attackers, candidates, enemy_ships, self.profiles.weight)
+            if best.target != fleet.target_active[0]:
+                fleet.target_active = (best.target, targets[best.target])
+                self.initiate_fighters_attack(commands, fleet, best.target, fighters, targets)
         # we are close, initiate full scale attack
-        if self.target_active is not None and not any_fighter_attacking and len(targets.keys()) > 0:
-            enemy_ship_id = next(iter(targets))
-            self.target_active = (enemy_ship_id, targets[enemy_ship_id])
-            self.initiate_fighters_attack(commands, enemy_ship_id)
+        if fleet.target_active is not None and not any_fighter_attacking and len(targets.keys()) > 0:
+            enemy_ship_id = self.engagement.best_target(attackers, targets, enemy_ships, self.profiles.weight).target
+            fleet.target_active = (enemy_ship_id, targets[enemy_ship_id])
+            self.initiate_fighters_attack(commands, fleet, enemy_ship_id, fighters, targets)
+
+    def escort_shippers(self, commands, motherships, shippers, threatened):
+        """
+        Moves fleets which have nothing else to do to the shippers they escort.
+
+        :param commands:
+        :return:
+        """
+        positions = self.escorts.plan(motherships, shippers, commands, self.data.planets, threatened, self.danger)
+        for mothership_id, pos in positions.items():
+            fleet = self.fleets.fleets[mothership_id]
+            if mothership_id in commands or fleet.target_active is not None:
+                continue
+            if any(fighter_id in commands for fighter_id in fleet.active_defenders):
+                continue
+            mothership = motherships[mothership_id]
+            if get_dist(pos[0], pos[1], mothership.position[0], mothership.position[1]) > TRADE_CENTER_TOL:
+                self.move_fleet_to_position(commands, fleet, pos=[int(pos[0]), int(pos[1])])
 
-    def _update_active_defenders(self, commands, fighters, mothership_id, ship_class, count):
-        for ship_id, ship in self.active_defenders.items():
+    def _in_formation(self, commands, ship_id, mothership_id) -> Optional[object]:
+        """
+        :return: the attack or the move back to the mothership the ship follows, None for any other command
+        """
+        ship = self.data.ships.get(ship_id)
+        command = commands.get(ship_id, ship.command if ship is not None else None)
+        if command is None:
+            return None
+        if command.type == "attack":
+            return command
+        if command.type == "move" and command.destination.target == mothership_id:
+            return command
+        return None
+
+    def choose_stance(self, commands, fleets, locked=()):
+        """
+        Weighs the plan against every engaged fleet pressing the attack with all its ships or holding back
+        to its mothership, one fleet at a time and all together, and keeps the best one.
+        Only ships attacking or following their mothership change, repairs, builds and retreats stay.
+        Pressing ships keep the targets given by the DamageAllocator.
+
+        :param locked: ids of the ships repaired or pulled back this tick
+        """
+        stances = {}
+        for mothership_id, fleet in fleets.items():
+            if fleet.target_active is None or fleet.target_active[0] not in self.data.ships:
+                continue
+            press, hold = {}, {}
+            for ship_id in [mothership_id] + list(fleet.active_defenders):
+                command = None if ship_id in locked else self._in_formation(commands, ship_id, mothership_id)
+                if command is None:
+                    continue
+                if command.type == "attack" and command.target in self.data.ships:
+                    press[ship_id] = command
+                else:
+                    press[ship_id] = AttackCommand(fleet.target_active[0])
+                hold[ship_id] = StopCommand() if ship_id == mothership_id else MoveCommand(Destination(target=mothership_id))
+            if press:
+                stances[mothership_id] = {"press": press, "hold": hold}
+        if not stances:
+            return
+
+        candidates = [("plan", {}, {})]
+        for mothership_id, options in stances.items():
+            for name, overrides in options.items():
+                candidates.append((name, overrides, {mothership_id: name}))
+        for name in ("press", "hold"):
+            overrides = {}
+            for options in stances.values():
+                overrides.update(options[name])
+            candidates.append((name, overrides, {mothership_id: name for mothership_id in stances}))
+
+        self.what_if.prepare(self.data, self.player_id, commands)
+        gains = self.what_if.evaluate([overrides for _, overrides, _ in candidates])
+        best = max(range(len(candidates)), key=lambda c: gains[c])
+        _, overrides, chosen = candidates[best]
+        commands.update(overrides)
+        for mothership_id, name in chosen.items():
+            fleet = fleets[mothership_id]
+            for fighter in fleet.active_defenders.values():
+                if fighter.id in overrides:
+                    fighter.attack = name == "press"
+            if name == "hold":
+                fleet.target_active = None
+
+    def _update_active_defenders(self, commands, fleet, fighters, ship_class, count):
+        for ship_id in list(fleet.active_defenders.keys()):
             if ship_id not in fighters:
-                del self.active_defenders[ship_id]
+                del fleet.active_defenders[ship_id]
 
         need_build = False
-        if len(self.active_defenders.keys()) < count and len(fighters.keys()) > 0:
+        if len(fleet.active_defenders.keys()) < count and len(fighters.keys()) > 0:
             for fighter_id, fighter in fighters.items():
-                if fighter.ship_class == ship_class and fighter_id not in self.active_defenders:
-                    self.active_defenders[fighter_id] = Fighter(fighter_id, ship_class)
-                if len(self.active_defenders.keys()) == count:
+                if fighter.ship_class == ship_class and self.fleets.owner(fighter_id) is None:
+                    fleet.active_defenders[fighter_id] = Fighter(fighter_id, ship_class)
+                if len(fleet.active_defenders.keys()) == count:
                     break
 
-        if len(self.active_defenders.keys()) < count:
+        if len(fleet.active_defenders.keys()) < count:
             need_build = True
-            commands[mothership_id] = ConstructCommand(ship_class=ship_class)
+            commands[fleet.mothership_id] = ConstructCommand(ship_class=ship_class)
 
         return need_build
 
-    def _heal_defenders_if_damaged(self, commands, fighters):
-        for ship_id, fighter in self.active_defenders.items():
-            ship = fighters[ship_id]
-            if ship.life <= fighter.maximum_life - 150:
-                commands[ship_id] = RepairCommand()
+    def repair_fleet(self, commands, motherships, fighters, enemy_ships):
+        """
+        Repairs or pulls back damaged motherships and defenders as decided by the RepairPlanner.
+        Ships which keep fighting keep their commands.
 
-    def _heal_mothership_if_damaged(self, commands, mothership_id, mothership):
-        if mothership.life <= 500 and self.tick - self.ticks_from_last_repair >= 3:
-            commands[mothership_id] = RepairCommand()
-            self.ticks_from_last_repair = self.tick
+        :param commands:
+        :return: ids of the ships repaired or pulled back
+        """
+        ships = dict(motherships)
+        for fleet in self.fleets.fleets.values():
+            ships.update({fighter_id: fighters[fighter_id] for fighter_id in fleet.active_defenders if fighter_id in fighters})
+        decisions = self.repair_planner.plan(
+            ships, self.fleets.index, self.threats.threatened(), enemy_ships, self.me.net_worth.money, self.tick
+        )
+
+        ordered = set()
+        for ship_id, decision in decisions.items():
+            if decision.action == "repair":
+                commands[ship_id] = RepairCommand()
+                ordered.add(ship_id)
+            elif decision.action == "retreat":
+                ship = ships[ship_id]
+                fleet = self.fleets.owner(ship_id)
+                if fleet is not None and decisions[fleet.mothership_id].action != "retreat":
+                    "fighters hide next to their mothership"
+                    commands[ship_id] = MoveCommand(Destination(target=fleet.mothership_id))
+                    ordered.add(ship_id)
+                else:
+                    "run directly away from the enemies around"
+                    enemies = self.fleets.index.query(ship.position, 2 * RADIUS)
+                    if not enemies:
+                        continue
+                    ex = sum(enemy.position[0] for enemy in enemies.values()) / len(enemies)
+                    ey = sum(enemy.position[1] for enemy in enemies.values()) / len(enemies)
+                    dist = max(get_dist(ex, ey, ship.position[0], ship.position[1]), 1)
+                    pos = [int(ship.position[0] + (ship.position[0] - ex) * RADIUS / dist),
+                           int(ship.position[1] + (ship.position[1] - ey) * RADIUS / dist)]
+                    commands[ship_id] = MoveCommand(Destination(coordinates=pos))
+                    ordered.add(ship_id)
+        return ordered
 
     def build_ships(self, commands, mothership_id):
         """
-        Builds extra shippers if we have money and small number of shippers
+        Builds or decommissions cargo ships as suggested by the FleetPlanner.
+        The mothership builds only when it has nothing else to do this tick.
 
         :param commands:
         :return:
         """
 
-        shipper_target = 10
-        shipper_count = len(self._get_ships("3").keys())
+        counts = {class_id: len(self._get_ships(class_id).keys()) for class_id in self.fleet_planner.cargo_classes}
+        self.fleet_planner.set_markets(len(self.opportunities.best))
+        change = self.fleet_planner.plan(counts, self.me.net_worth.money)
 
-        repair_reserve = 1000000
+        builds = [class_id for class_id, delta in change.items() if delta > 0]
+        if builds and mothership_id not in commands:
+            "one construction per tick, the class which pays back first"
+            class_id = min(builds, key=lambda c: self.fleet_planner.payback(c, counts))
+            commands[mothership_id] = ConstructCommand(ship_class=class_id)
 
-        if self.data.players[self.player_id].net_worth.money > repair_reserve and shipper_count < shipper_target:
-            commands[mothership_id] = ConstructCommand(ship_class="3")
+        for class_id, delta in change.items():
+            if delta >= 0:
+                continue
+            "decommission the most damaged of the empty ships without orders"
+            idle = sorted((ship.life, ship_id) for ship_id, ship in self._get_ships(class_id).items()
+                          if not ship.resources and ship_id not in commands)
+            for _, ship_id in idle[:-delta]:
+                commands[ship_id] = DecommissionCommand()
 
     def trade(self, commands, shippers):
         """
         For each shipper chooses the trade with highest 'yield per tick'.
+        Buy amounts are sized by TradeSizer, so the yield accounts for how much the ship can actually carry.
+        Loaded shippers follow the route of SellPlanner and sell at its first stop.
+        Shippers on the way to buy are redirected when OpportunityDetector reports a much better spread.
+        Routes already traded are scored by the margin realized in the TradeLedger.
 
         :return:
         """
 
-        "4 neni optimalizovane"
-        min_cargo = 4
         buy_commands_issued = 0
         max_concurrent_commands = 2
 
+        self.trade_sizer.begin_tick(self.me.net_worth.money)
+        if self.data.reports is not None:
+            for entry in self.ledger.update(self.data.reports.trade, shippers):
+                ship_class = self.static_data.ship_classes[shippers[entry.ship].ship_class]
+                self.fleet_planner.observe(shippers[entry.ship].ship_class, entry.profit / (entry.amount * entry.ticks * ship_class.speed))
+        self.planet_distances.update(self.data.planets)
+        events = self.opportunities.update(self.data.planets)
+        planet_danger = self.danger.planet_danger(self.data.planets)
+
+        "find place to sell, all loaded shippers at once"
+        loaded = {ship_id: ship for ship_id, ship in shippers.items()
+                  if ship.resources and ship.position[0] == ship.prev_position[0] and ship.position[1] == ship.prev_position[1]}
+        for ship_id, plan in self.sell_planner.plan(self.data.planets, loaded, planet_danger).items():
+            planet_to_sell, sold = next(iter(plan.stops.items()))
+            sell_prices = self.data.planets[planet_to_sell].resources
+            resource_to_sell = max(sold, key=lambda resource_id: sold[resource_id] * sell_prices[resource_id].sell_price)
+            amount = sold[resource_to_sell]
+            self.trade_sizer.claim_sell(planet_to_sell, resource_to_sell, amount)
+            commands[ship_id] = TradeCommand(amount=-amount, resource=resource_to_sell, target=planet_to_sell)
+            if trace:
+                print(f"Shipper {ship_id} will sell {amount} {resource_to_sell} to planet {planet_to_sell}, route {plan}.")
+
+        "turn around shippers flying to buy when a much better spread has opened"
+        moving = {ship_id: ship for ship_id, ship in shippers.items()
+                  if ship.position[0] != ship.prev_position[0] or ship.position[1] != ship.prev_position[1]}
+        redirects = self.opportunities.preempt(moving, events, self.planet_distances, self.trade_sizer)
+        for ship_id, (opportunity, amount) in redirects.items():
+            commands[ship_id] = TradeCommand(amount=amount, resource=opportunity.resource, target=opportunity.buy_planet)
+            if trace:
+                print(f"Shipper {ship_id} redirected to buy {amount} {opportunity.resource} on planet {opportunity.buy_planet}.")
+
         for ship_id, ship in shippers.items():
             "verify if the ship is moving"
             if ship.position[0] != ship.prev_position[0] or ship.position[1] != ship.prev_position[1]:
@@ -331,78 +520,79 @@ class Game:
             "find what to buy"
             if not self.data.ships[ship_id].resources:
                 "iterate buy planets"
-                planet_count = 0
-                sell_planet_count = 0
-                resource_count = 0
                 best_ypt = 0
                 best_planet_id = 0
+                best_sell_planet_id = None
                 best_resource_id = None
+                best_amount = 0
                 for planet_id, planet in self.data.planets.items():
-                    planet_count += 1
                     "iterate resources"
-                    resource_count = 0
                     for resource_id, resource in planet.resources.items():
                         "resource can be bought"
-                        if resource.buy_price and resource.amount > min_cargo:
-                            resource_count += 1
-                            sell_planet_count = 0
-                            buy_cost = planet.resources[resource_id].buy_price
-                            buy_dist = get_dist(ship.position[0], ship.position[1], planet.position[0], planet.position[1])
-                            "iterate sell planets"
-                            for sell_planet_id, sell_planet in self.data.planets.items():
-                                "resource can be sold"
-                                if resource_id in sell_planet.resources and sell_planet.resources[resource_id].sell_price:
-                                    sell_planet_count += 1
-                                    sell_gain = sell_planet.resources[resource_id].sell_price
-                                    sell_dist = get_dist(planet.position[0], planet.position[1], sell_planet.position[0], sell_planet.position[1])
-
-                                    ypt = (sell_gain - buy_cost) / (buy_dist + sell_dist)
-                                    if not trades[resource_id]:
-                                        trades[resource_id] = (ypt, planet_id)
-                                    if ypt > trades[resource_id][0]:
-                                        trades[resource_id] = (ypt, planet_id)
-                                    if ypt > best_ypt:
-                                        best_ypt = ypt
-                                        best_planet_id = planet_id
-                                        best_resource_id = resource_id
-
-                # [resource_id, [ypt, planed_id]]
-                sorted_trades = sorted(trades.items(), key=lambda x: x[1][0])
-                # sorted_trades[1][0] - res
-                # sorted_trades[1][1][0] - ypt
-                # sorted_trades[1][1][1] - planet
+                        if not resource.buy_price or resource.amount < MIN_CARGO:
+                            continue
+                        buy_cost = resource.buy_price
+                        max_amount = self.trade_sizer.buy_amount(ship, planet_id, resource_id, resource.amount, buy_cost)
+                        if max_amount < MIN_CARGO:
+                            continue
+                        buy_dist = get_dist(ship.position[0], ship.position[1], planet.position[0], planet.position[1])
+                        "iterate sell planets"
+                        for sell_planet_id, sell_planet in self.data.planets.items():
+                            "resource can be sold"
+                            if resource_id in sell_planet.resources and sell_planet.resources[resource_id].sell_price:
+                                amount = min(max_amount, self.trade_sizer.sell_room(sell_planet_id, resource_id))
+                                if amount < MIN_CARGO:
+                                    continue
+                                sell_gain = sell_planet.resources[resource_id].sell_price
+                                sell_dist = self.planet_distances.get(planet_id, sell_planet_id)
+
+                                "prefer what the route really paid over the quoted spread"
+                                margin = self.ledger.route_margin(planet_id, sell_planet_id, resource_id)
+                                if margin is None:
+                                    margin = sell_gain - buy_cost
+                                ypt = margin * amount / max(buy_dist + sell_dist, 1)
+                                "stay away from the places where ships die"
+                                ypt /= 1 + planet_danger[planet_id] + planet_danger[sell_planet_id]
+                                if not trades[resource_id]:
+                                    trades[resource_id] = (ypt, planet_id)
+                                if ypt > trades[resource_id][0]:
+                                    trades[resource_id] = (ypt, planet_id)
+                                if ypt > best_ypt:
+                                    best_ypt = ypt
+                                    best_planet_id = planet_id
+                                    best_sell_planet_id = sell_planet_id
+                                    best_resource_id = resource_id
+                                    best_amount = amount
 
                 if best_resource_id:
-                    amount = min(self.data.planets[trades[best_resource_id][1]].resources[best_resource_id].amount, 10)
-                    commands[ship_id] = TradeCommand(amount=amount, resource=best_resource_id, target=best_planet_id)
+                    self.fleet_planner.observe(ship.ship_class, best_ypt / best_amount)
+                    buy_cost = self.data.planets[best_planet_id].resources[best_resource_id].buy_price
+                    self.trade_sizer.reserve(best_planet_id, best_resource_id, best_amount, buy_cost, best_sell_planet_id)
+                    commands[ship_id] = TradeCommand(amount=best_amount, resource=best_resource_id, target=best_planet_id)
                     buy_commands_issued += 1
                     if trace:
-                        print(f"Shipper {ship} has no cargo, goes to buy {best_resource_id} to planet {best_planet_id} for {best_ypt} YPT.")
+                        print(f"Shipper {ship} has no cargo, goes to buy {best_amount} {best_resource_id} to planet {best_planet_id} for {best_ypt} YPT.")
 
                     "fast hack to separate the shippers by at least a tick"
                     if buy_commands_issued == max_concurrent_commands:
                         return
 
+    def route_shippers(self, commands, shippers):
+        """
+        Sends shippers with a new trade order to the first turn of a safe path when flying straight is dangerous.
+        Once the ship stops at the waypoint, trade picks it up again.
 
-            else:
-                "find place to sell"
-                resource_to_sell = list(self.data.ships[ship_id].resources.keys())[0]
-                planet_to_sell = None
-                for planet_id, planet in self.data.planets.items():
-                    "4 neni optimalizovane"
-                    if resource_to_sell in planet.resources and planet.resources[resource_to_sell].sell_price:
-                        ypt = planet.resources[resource_to_sell].sell_price / get_dist(ship.position[0], ship.position[1], planet.position[0], planet.position[1])
-                        if not trades[resource_to_sell]:
-                            trades[resource_to_sell] = (ypt, planet_id)
-                            planet_to_sell = planet_id
-                        if ypt > trades[resource_to_sell][0]:
-                            trades[resource_to_sell] = (ypt, planet_id)
-                            planet_to_sell = planet_id
-
-                amount = ship.resources[resource_to_sell]["amount"]
-                commands[ship_id] = TradeCommand(amount=-amount, resource=resource_to_sell, target=planet_to_sell)
-                if trace:
-                    print(f"Shipper {ship} has will sell to planet {planet_to_sell} for {ypt*amount} total.")
+        :param commands:
+        :return:
+        """
+        for ship_id, command in list(commands.items()):
+            if ship_id not in shippers or not isinstance(command, TradeCommand):
+                continue
+            ship = shippers[ship_id]
+            target = self.data.planets[command.target]
+            waypoint = self.navigator.next_waypoint(ship.position[0], ship.position[1], target.position[0], target.position[1])
+            if waypoint is not None:
+                commands[ship_id] = MoveCommand(Destination(coordinates=[int(waypoint[0]), int(waypoint[1])]))
 
     def unblock_stuck_shippers(self, commands):
         """
@@ -423,47 +613,86 @@ class Game:
         shippers = self._get_ships(ship_class="3")
         enemy_fighters = self._get_enemy_ships(ship_class="4")
         enemy_ships = self._get_enemy_ships(ship_class=None)
-        mothership_id, mothership = self._get_our_mothership()
+        motherships = self._get_our_motherships()
+        fleets = self.fleets.update(motherships)
         commands = {}
 
         self._update_shippers_center(shippers)
+        new_wrecks = self.wreck_index.update(self.data.wrecks, self.tick)
+        self.danger.update(self.data, self.tick, new_wrecks)
+        self.profiles.update(self.data, self.tick)
+        if self.tick % SCORES_EVERY == 0:
+            self.profiles.update_scores(self.client.reports_get().season_scores, self.season)
 
         # Manually send commands
         if debugger:
             #ducks = "5"
-            ducks = "5"
+            ducks = self.profiles.most_aggressive()
             enemy_motherships = self._get_enemy_ships(ship_class="1", ship_player=ducks)
             enemy_mid = next(iter(enemy_motherships))
-            self.move_fleet_to_position(commands, mothership_id, pos=enemy_motherships[enemy_mid].position)
-
-        if mothership_id != 0:
-            need_build = self._update_active_defenders(commands, fighters, mothership_id, ship_class="4", count=3)
-            self._heal_mothership_if_damaged(commands, mothership_id, mothership)
-            #if not need_build or self.data.players[self.player_id].net_worth.money < 2000000:
-            if not need_build:
-                """
-                if get_dist(
-                        self.shippers_center[0], self.shippers_center[1], mothership.position[0], mothership.position[1]
-                ) > TRADE_CENTER_TOL:
-                    self.move_fleet_to_center(commands, mothership)
-                """
-
-                #self.move_fleet_to_center(commands, mothership_id, pos=[1000, 498])
-                #self.move_fleet_to_center(commands, mothership_id, pos=[216, -860])
-                self.hadrian_wall(commands, mothership_id, mothership, fighters, enemy_ships, exclude_players=set("4"))
-                # todo fallback if mothership is dead but fighters are not
+            for fleet in fleets.values():
+                self.move_fleet_to_position(commands, fleet, pos=enemy_motherships[enemy_mid].position)
+
+        "enemies heading to our ships are met before they get into RADIUS"
+        our_ships = dict(shippers, **motherships)
+        threats = self.threats.update(enemy_ships, our_ships, self.tick)
+
+        # ships repaired or pulled back, their commands stay whatever the stance
+        locked = set()
+        if len(motherships.keys()) > 0:
+            fleet_intruders = self.fleets.assign_intruders(
+                motherships, enemy_ships, RADIUS, exclude_classes=set("3"), exclude_players=self.profiles.peaceful(self.tick),
+                early={ship_id: enemy_ships[ship_id] for ship_id in threats}, early_radius=2 * RADIUS,
+                player_radius=lambda player: self.profiles.radius(player, RADIUS)
+            )
+            for mothership_id, fleet in fleets.items():
+                mothership = motherships[mothership_id]
+                need_build = self._update_active_defenders(commands, fleet, fighters, ship_class="4", count=3)
+                #if not need_build or self.data.players[self.player_id].net_worth.money < 2000000:
+                if not need_build:
+                    """
+                    if get_dist(
+                            self.shippers_center[0], self.shippers_center[1], mothership.position[0], mothership.position[1]
+                    ) > TRADE_CENTER_TOL:
+                        self.move_fleet_to_center(commands, mothership)
+                    """
+
+                    #self.move_fleet_to_center(commands, mothership_id, pos=[1000, 498])
+                    #self.move_fleet_to_center(commands, mothership_id, pos=[216, -860])
+                    self.hadrian_wall(commands, fleet, mothership, fighters, fleet_intruders[mothership_id], enemy_ships)
+            # todo fallback if mothership is dead but fighters are not
+
+            locked = self.repair_fleet(commands, motherships, fighters, enemy_ships)
         else:
             for ship_id, ship in shippers.items():
                 commands[ship_id] = DecommissionCommand()
 
-        #self.move_fleet_to_position(commands, mothership_id, pos=pos)
-
-        # build
-        #self.build_ships(commands, mothership_id)
+        #self.move_fleet_to_position(commands, fleet, pos=pos)
 
         # trades here
         self.trade(commands, shippers)
 
+        # build, preferably with a mothership which has nothing else to do
+        if len(motherships.keys()) > 0:
+            idle = [mothership_id for mothership_id in motherships if mothership_id not in commands]
+            self.build_ships(commands, idle[0] if idle else next(iter(motherships)))
+
+        # keep the shipment protected
+        self.escort_shippers(commands, motherships, shippers, self.threats.threatened())
+
+        # engaged fleets press on or fall back, whatever the forward model scores better
+        self.choose_stance(commands, fleets, locked)
+
+        # shippers fly around dangerous places
+        self.navigator.update({ship_id: ship for ship_id, ship in enemy_ships.items() if ship.ship_class != "3"},
+                              self.wreck_index, self.tick)
+        self.route_shippers(commands, shippers)
+
+        "trades replaced by a waypoint are issued again once the shipper gets there"
+        for ship_id, command in commands.items():
+            if isinstance(command, TradeCommand):
+                self.ledger.issue(ship_id, command, self.tick)
+
         #self.unblock_stuck_shippers(commands)
 
         """
@@ -526,17 +755,25 @@ def main():
 
     configuration.host = config["host"]
 
-    main_loop(ApiClient(configuration=configuration, cookie="SESSION_ID=1"), config)
+    if config.get("record"):
+        print(f"Recording the session to {config['record']}")
+        api_client = RecordingApiClient(config["record"], configuration=configuration, cookie="SESSION_ID=1")
+    else:
+        api_client = ApiClient(configuration=configuration, cookie="SESSION_ID=1")
+    "a stopped container gets SIGTERM, the bot leaves through the finally below"
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        main_loop(api_client, config)
+    finally:
+        "a recording gets its gzip trailer however the bot stops"
+        if isinstance(api_client, RecordingApiClient):
+            api_client.close()
 
 
 def get_dist(x1, y1, x2, y2) -> float:
     return ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
 
 
-def get_path_from_to(x1, y1, x2, y2):
-    pass
-
-
 def get_enemy_ships(ship_items, ship_class=None, ship_player=None) -> dict:
     ships: Dict[Ship] = {}
     for ship_id, ship in ship_items.items():
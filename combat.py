@@ -0,0 +1,409 @@
+import collections
+import itertools
+import math
+from typing import Dict, List, Optional
+
+from space_tycoon_client.models.ship import Ship
+from space_tycoon_client.models.static_data import StaticData
+
+from defense import SpatialIndex
+
+# enemy ships this close to the target join the fight
+SUPPORT_RADIUS = 70
+# fights longer than this are treated as lost
+MAX_TICKS = 60
+
+Engagement = collections.namedtuple("Engagement", ["target", "win", "ticks", "damage_taken", "value"])
+
+
+class EngagementSimulator:
+    """
+    Predicts the outcome of attacking enemy ships with our mothership and its defenders.
+
+    The fight is stepped tick by tick: all our ships fire at the target, the target and its supporters focus
+    our weakest ship and everyone regenerates. All candidates are simulated in one call and scored
+    by the expected value per tick, including the flight to the target.
+    """
+
+    def __init__(self, static_data: StaticData, support_radius=SUPPORT_RADIUS, max_ticks=MAX_TICKS, priorities=()):
+        self.ship_classes = static_data.ship_classes
+        self.support_radius = support_radius
+        self.max_ticks = max_ticks
+        self.priorities = list(priorities)
+
+    def _stats(self, ship: Ship):
+        ship_class = self.ship_classes[ship.ship_class]
+        return ship.life, ship_class.damage or 0, ship_class.regen or 0, ship_class.life or ship.life
+
+    def _life_price(self, ship: Ship) -> float:
+        ship_class = self.ship_classes[ship.ship_class]
+        if ship_class.repair_life:
+            return (ship_class.repair_price or 0) / ship_class.repair_life
+        return (ship_class.price or 0) / max(ship_class.life or 1, 1)
+
+    def simulate(self, attackers: List[Ship], candidates: Dict[str, Ship], enemy_ships: Dict[str, Ship],
+                 player_weight=None) -> Dict[str, Engagement]:
+        """
+        :param player_weight: function giving how much more a kill of the player's ship is worth
+        """
+        if not attackers or not candidates:
+            return {}
+
+        lead = attackers[0]
+        lead_speed = self.ship_classes[lead.ship_class].speed or 1
+        our_stats = [self._stats(ship) for ship in attackers]
+        our_life_prices = [self._life_price(ship) for ship in attackers]
+        our_prices = [self.ship_classes[ship.ship_class].price or 0 for ship in attackers]
+
+        results = {}
+        for target_id, target in candidates.items():
+            target_life, _, target_regen, target_max_life = self._stats(target)
+            "damage of the target and every enemy combat ship next to it"
+            enemy_damage = 0
+            for enemy in enemy_ships.values():
+                if enemy is target or math.hypot(enemy.position[0] - target.position[0],
+                                                 enemy.position[1] - target.position[1]) <= self.support_radius:
+                    enemy_damage += self.ship_classes[enemy.ship_class].damage or 0
+
+            lives = [stats[0] for stats in our_stats]
+            damage_taken = 0
+            lost_value = 0
+            ticks = 0
+            win = False
+            while ticks < self.max_ticks:
+                ticks += 1
+                target_life -= sum(stats[1] for life, stats in zip(lives, our_stats) if life > 0)
+                if target_life <= 0:
+                    win = True
+                    break
+                alive = [i for i, life in enumerate(lives) if life > 0]
+                weakest = min(alive, key=lambda i: lives[i])
+                hit = min(enemy_damage, lives[weakest])
+                lives[weakest] -= enemy_damage
+                damage_taken += hit * our_life_prices[weakest]
+                if lives[weakest] <= 0:
+                    lost_value += our_prices[weakest]
+                    if len(alive) == 1:
+                        break
+                target_life = min(target_max_life, target_life + target_regen)
+                for i in alive:
+                    if lives[i] > 0:
+                        lives[i] = min(our_stats[i][3], lives[i] + our_stats[i][2])
+
+            travel = math.hypot(target.position[0] - lead.position[0], target.position[1] - lead.position[1]) / lead_speed
+            gain = (self.ship_classes[target.ship_class].price or 0) if win else 0
+            if player_weight is not None:
+                gain *= player_weight(target.player)
+            value = (gain - damage_taken - lost_value) / (travel + ticks)
+            results[target_id] = Engagement(target=target_id, win=win, ticks=ticks, damage_taken=damage_taken, value=value)
+
+        return results
+
+    def _rank(self, engagement: Engagement, candidates: Dict[str, Ship]):
+        ship_class = candidates[engagement.target].ship_class
+        priority = self.priorities.index(ship_class) if ship_class in self.priorities else len(self.priorities)
+        return engagement.win, engagement.value, -priority
+
+    def best_target(self, attackers: List[Ship], candidates: Dict[str, Ship], enemy_ships: Dict[str, Ship],
+                    player_weight=None) -> Optional[Engagement]:
+        """
+        :return: engagement with the best expected value, winnable fights first
+        """
+        results = self.simulate(attackers, candidates, enemy_ships, player_weight)
+        if not results:
+            return None
+        return max(results.values(), key=lambda engagement: self._rank(engagement, candidates))
+
+
+# enemies are followed this many ticks into the future
+THREAT_HORIZON = 10
+# an enemy passing this close to our ship is going to reach it
+THREAT_RADIUS = 70
+# cosine between heading and direction to our ship above which the enemy is taken to be chasing it
+CHASE_COS = 0.95
+
+Threat = collections.namedtuple("Threat", ["enemy", "target", "ticks", "distance"])
+
+
+class TrackedShip:
+    __slots__ = ("position", "velocity", "speed", "heading", "first_seen", "last_seen", "command", "target")
+
+    def __init__(self, tick):
+        self.position = (0, 0)
+        self.velocity = (0, 0)
+        self.speed = 0
+        self.heading = 0
+        self.first_seen = tick
+        self.last_seen = tick
+        # command inferred from the motion: "stop", "move" or "attack"
+        self.command = "stop"
+        self.target = None
+
+
+class ThreatTracker:
+    """
+    Follows enemy ships across ticks and predicts which of our ships they are going to reach.
+
+    Velocity and heading come from `position` and `prev_position`, the path is extrapolated over `horizon` ticks
+    and our ships near the path are found through a spatial index, so one tick costs O(enemies).
+    """
+
+    def __init__(self, horizon=THREAT_HORIZON, radius=THREAT_RADIUS, cell_size=250):
+        self.horizon = horizon
+        self.radius = radius
+        self.ships: Dict[str, TrackedShip] = {}
+        self.threats: Dict[str, Threat] = {}
+        self.index = SpatialIndex(cell_size)
+
+    def update(self, enemy_ships: Dict[str, Ship], our_ships: Dict[str, Ship], tick) -> Dict[str, Threat]:
+        """
+        :return: enemy ship_id -> the first of our ships it reaches within the horizon
+        """
+        for ship_id in list(self.ships.keys()):
+            if ship_id not in enemy_ships:
+                del self.ships[ship_id]
+
+        self.index.build(our_ships)
+        self.threats = {}
+        for ship_id, ship in enemy_ships.items():
+            tracked = self.ships.get(ship_id)
+            if tracked is None:
+                tracked = self.ships[ship_id] = TrackedShip(tick)
+            tracked.last_seen = tick
+            x, y = ship.position[0], ship.position[1]
+            vx, vy = x - ship.prev_position[0], y - ship.prev_position[1]
+            tracked.position = (x, y)
+            tracked.velocity = (vx, vy)
+            tracked.speed = math.hypot(vx, vy)
+            if tracked.speed > 0:
+                tracked.heading = math.atan2(vy, vx)
+
+            threat = self._predict(ship_id, tracked)
+            tracked.target = threat.target if threat is not None else None
+            if tracked.speed == 0:
+                tracked.command = "stop"
+            elif threat is not None and self._chasing(tracked, our_ships[threat.target]):
+                tracked.command = "attack"
+            else:
+                tracked.command = "move"
+            if threat is not None:
+                self.threats[ship_id] = threat
+
+        return self.threats
+
+    def _predict(self, ship_id, tracked: TrackedShip) -> Optional[Threat]:
+        (x, y), (vx, vy) = tracked.position, tracked.velocity
+        reach = tracked.speed * self.horizon + self.radius
+        speed_sq = vx * vx + vy * vy
+
+        best = None
+        for target_id, target in self.index.query((x, y), reach).items():
+            dx, dy = target.position[0] - x, target.position[1] - y
+            "time of the closest approach along the extrapolated path"
+            t = 0 if speed_sq == 0 else min(max((dx * vx + dy * vy) / speed_sq, 0), self.horizon)
+            distance = math.hypot(dx - vx * t, dy - vy * t)
+            if distance > self.radius:
+                continue
+            if best is None or t < best.ticks or (t == best.ticks and distance < best.distance):
+                best = Threat(enemy=ship_id, target=target_id, ticks=t, distance=distance)
+
+        return best
+
+    @staticmethod
+    def _chasing(tracked: TrackedShip, target: Ship) -> bool:
+        dx, dy = target.position[0] - tracked.position[0], target.position[1] - tracked.position[1]
+        dist = math.hypot(dx, dy)
+        if dist == 0:
+            return True
+        return (dx * tracked.velocity[0] + dy * tracked.velocity[1]) / (dist * tracked.speed) >= CHASE_COS
+
+    def threatened(self) -> Dict[str, list]:
+        """
+        :return: our ship_id -> threats heading to it
+        """
+        targets = collections.defaultdict(list)
+        for threat in self.threats.values():
+            targets[threat.target].append(threat)
+        return targets
+
+
+# a target gets a group of attackers of its own only when the group kills it within this many ticks
+KILL_TICKS = 3
+
+
+class DamageAllocator:
+    """
+    Splits attackers between targets to kill as many ships as possible, as soon as possible.
+
+    Targets are taken from the easiest kill. Each one gets the group of free attackers whose damage covers
+    its life with the smallest overshoot, found as a bounded knapsack over the distinct damage values
+    (ships of one class deal the same damage, so there are only a few). A target out of reach this tick may take
+    up to `kill_ticks` ticks, regenerating after every tick it survives, and damage other ships already deal to it,
+    like the mothership, is subtracted first. Attackers which cannot finish anything more join the primary target.
+    """
+
+    def __init__(self, static_data: StaticData, priorities=(), kill_ticks=KILL_TICKS):
+        self.ship_classes = static_data.ship_classes
+        self.priorities = list(priorities)
+        self.kill_ticks = kill_ticks
+
+    def _damage(self, ship: Ship) -> int:
+        return self.ship_classes[ship.ship_class].damage or 0
+
+    def _needed(self, target: Ship, ticks, support) -> int:
+        """
+        Damage per tick of the attackers which kills the target within `ticks` ticks.
+        """
+        regen = self.ship_classes[target.ship_class].regen or 0
+        return math.ceil((target.life + regen * (ticks - 1)) / ticks) - support
+
+    @staticmethod
+    def _cheapest_kill(life, available: Dict[int, int]) -> Optional[Dict[int, int]]:
+        """
+        :param available: damage -> number of free attackers dealing it
+        :return: damage -> number of attackers to send, None if the target cannot be killed
+        """
+        damages = [damage for damage, count in available.items() if damage > 0 and count > 0]
+        if not damages:
+            return None
+        *others, last = damages
+
+        best = None
+        best_key = None
+        for counts in itertools.product(*(range(available[damage] + 1) for damage in others)):
+            dealt = sum(damage * count for damage, count in zip(others, counts))
+            needed = max(0, math.ceil((life - dealt) / last))
+            if needed > available[last]:
+                continue
+            total = dealt + needed * last
+            key = (total - life, sum(counts) + needed)
+            if best_key is None or key < best_key:
+                best_key = key
+                best = dict(zip(others, counts))
+                best[last] = needed
+
+        return best
+
+    def allocate(self, attackers: Dict[str, Ship], targets: Dict[str, Ship], primary=None,
+                 support: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+        """
+        :param support: target ship_id -> damage ships which are not allocated here deal to it every tick
+        :return: attacker ship_id -> target ship_id
+        """
+        if not attackers or not targets:
+            return {}
+        support = support or {}
+
+        by_damage: Dict[int, list] = collections.defaultdict(list)
+        for attacker_id, attacker in attackers.items():
+            by_damage[self._damage(attacker)].append(attacker_id)
+
+        def order(target_id):
+            ship_class = targets[target_id].ship_class
+            priority = self.priorities.index(ship_class) if ship_class in self.priorities else len(self.priorities)
+            return self._needed(targets[target_id], 1, support.get(target_id, 0)), priority
+
+        allocation = {}
+        for target_id in sorted(targets, key=order):
+            available = {damage: len(ids) for damage, ids in by_damage.items()}
+            for ticks in range(1, self.kill_ticks + 1):
+                kill = self._cheapest_kill(self._needed(targets[target_id], ticks, support.get(target_id, 0)), available)
+                if kill is not None:
+                    break
+            if kill is None:
+                continue
+            for damage, count in kill.items():
+                for _ in range(count):
+                    allocation[by_damage[damage].pop()] = target_id
+
+        if primary is None or primary not in targets:
+            primary = min(targets, key=order)
+        for attacker_ids in by_damage.values():
+            for attacker_id in attacker_ids:
+                allocation[attacker_id] = primary
+
+        return allocation
+
+
+# ticks over which the survival of a ship is judged
+REPAIR_HORIZON = 10
+# ticks between two repairs of the same ship
+REPAIR_COOLDOWN = 3
+# a ship which would not survive even after the repair with at least this chance runs away
+RETREAT_SURVIVAL = 0.5
+
+RepairDecision = collections.namedtuple("RepairDecision", ["ship", "action", "survival", "cost"])
+
+
+class RepairPlanner:
+    """
+    Decides for each of our combat ships whether to repair, retreat or keep fighting.
+
+    Incoming damage is the damage of enemies within `radius` plus the ones ThreatTracker sees heading to the ship,
+    less its regen. Survival is the part of the horizon the ship lives through. A repair is worth it when the value
+    of the ship saved exceeds the repair price, repairs are paid in the order of survival bought per credit.
+    Safe ships are topped up once they miss a full `repair_life`.
+    """
+
+    def __init__(self, static_data: StaticData, radius=SUPPORT_RADIUS, horizon=REPAIR_HORIZON, cooldown=REPAIR_COOLDOWN):
+        self.ship_classes = static_data.ship_classes
+        self.radius = radius
+        self.horizon = horizon
+        self.cooldown = cooldown
+        # ship_id -> tick of the last repair
+        self.last_repair: Dict[str, int] = {}
+
+    def _survival(self, life, incoming) -> float:
+        if incoming <= 0:
+            return 1
+        return min(1, life / incoming / self.horizon)
+
+    def plan(self, ships: Dict[str, Ship], enemy_index: SpatialIndex, threatened: Dict[str, list],
+             enemy_ships: Dict[str, Ship], money, tick) -> Dict[str, RepairDecision]:
+        """
+        :param threatened: our ship_id -> threats heading to it
+        :return: ship_id -> decision, ships which keep fighting included
+        """
+        for ship_id in list(self.last_repair.keys()):
+            if ship_id not in ships:
+                del self.last_repair[ship_id]
+
+        decisions = {}
+        repairs = []
+        for ship_id, ship in ships.items():
+            ship_class = self.ship_classes[ship.ship_class]
+            attackers = dict(enemy_index.query(ship.position, self.radius))
+            for threat in threatened.get(ship_id, ()):
+                if threat.enemy in enemy_ships:
+                    attackers[threat.enemy] = enemy_ships[threat.enemy]
+            incoming = sum(self.ship_classes[enemy.ship_class].damage or 0 for enemy in attackers.values()) - (ship_class.regen or 0)
+
+            survival = self._survival(ship.life, incoming)
+            missing = (ship_class.life or ship.life) - ship.life
+            repair_life = min(missing, ship_class.repair_life or 0)
+            repaired = self._survival(ship.life + repair_life, incoming)
+            cost = ship_class.repair_price or 0
+            ready = tick - self.last_repair.get(ship_id, -self.cooldown) >= self.cooldown and repair_life > 0
+
+            decision = RepairDecision(ship=ship_id, action="fight", survival=survival, cost=0)
+            if incoming <= 0:
+                if ready and missing >= (ship_class.repair_life or 0):
+                    repairs.append((0, RepairDecision(ship=ship_id, action="repair", survival=1, cost=cost)))
+            elif repaired < RETREAT_SURVIVAL:
+                decision = RepairDecision(ship=ship_id, action="retreat", survival=survival, cost=0)
+            elif ready:
+                saved = (repaired - survival) * (ship_class.price or 0)
+                if saved > cost:
+                    repairs.append((saved / max(cost, 1), RepairDecision(ship=ship_id, action="repair", survival=repaired, cost=cost)))
+            decisions[ship_id] = decision
+
+        "threatened ships first, then top ups"
+        repairs.sort(key=lambda repair: repair[0], reverse=True)
+        for _, decision in repairs:
+            if decision.cost > money:
+                continue
+            money -= decision.cost
+            self.last_repair[decision.ship] = tick
+            decisions[decision.ship] = decision
+
+        return decisions
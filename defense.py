@@ -0,0 +1,215 @@
+import collections
+import itertools
+import math
+from typing import Dict, Optional, Tuple
+
+from space_tycoon_client.models.ship import Ship
+
+
+class SpatialIndex:
+    """
+    Uniform grid over ship positions. Radius queries only look at the cells around the point.
+    """
+
+    def __init__(self, cell_size=250):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], list] = collections.defaultdict(list)
+
+    def _cell(self, x, y) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def build(self, ships: Dict[str, Ship]):
+        self.cells.clear()
+        for ship_id, ship in ships.items():
+            self.cells[self._cell(ship.position[0], ship.position[1])].append((ship_id, ship))
+
+    def query(self, pos, radius, exclude_classes=set(), exclude_players=set()) -> Dict[str, Ship]:
+        found_ships = {}
+        min_x, min_y = self._cell(pos[0] - radius, pos[1] - radius)
+        max_x, max_y = self._cell(pos[0] + radius, pos[1] + radius)
+        for cx in range(min_x, max_x + 1):
+            for cy in range(min_y, max_y + 1):
+                for ship_id, ship in self.cells.get((cx, cy), ()):
+                    if ship.ship_class in exclude_classes or ship.player in exclude_players:
+                        continue
+                    if math.hypot(pos[0] - ship.position[0], pos[1] - ship.position[1]) <= radius:
+                        found_ships[ship_id] = ship
+
+        return found_ships
+
+
+class DefenseFleet:
+    """
+    Defense state of one mothership and the fighters guarding it.
+    """
+
+    def __init__(self, mothership_id):
+        self.mothership_id = mothership_id
+        self.active_defenders = {}
+        self.target_active: Optional[Tuple] = None
+
+
+class FleetCoordinator:
+    """
+    Runs one DefenseFleet per mothership.
+
+    Enemy ships are indexed once per tick and every intruder is handed to the closest fleet which sees it,
+    so two fleets never chase the same ship and the work grows linearly with the number of motherships.
+    """
+
+    def __init__(self, cell_size=250):
+        self.fleets: Dict[str, DefenseFleet] = {}
+        self.index = SpatialIndex(cell_size)
+
+    def update(self, motherships: Dict[str, Ship]) -> Dict[str, DefenseFleet]:
+        for mothership_id in list(self.fleets.keys()):
+            if mothership_id not in motherships:
+                "defenders of a lost mothership are free to join another fleet"
+                del self.fleets[mothership_id]
+        for mothership_id in motherships:
+            if mothership_id not in self.fleets:
+                self.fleets[mothership_id] = DefenseFleet(mothership_id)
+
+        return self.fleets
+
+    def owner(self, fighter_id) -> Optional[DefenseFleet]:
+        for fleet in self.fleets.values():
+            if fighter_id in fleet.active_defenders:
+                return fleet
+        return None
+
+    def assign_intruders(self, motherships: Dict[str, Ship], enemy_ships: Dict[str, Ship], radius,
+                         exclude_classes=set(), exclude_players=set(), early: Dict[str, Ship] = None,
+                         early_radius=None, player_radius=None) -> Dict[str, Dict[str, Ship]]:
+        """
+        :param early: ships predicted to reach us soon, fleets see them already within `early_radius`
+        :param player_radius: function giving the radius per player owning the ship, at most twice `radius`
+        :return: mothership_id -> intruders this fleet is responsible for
+        """
+        self.index.build(enemy_ships)
+        early = {ship_id: ship for ship_id, ship in (early or {}).items()
+                 if ship.ship_class not in exclude_classes and ship.player not in exclude_players}
+        early_radius = early_radius or radius
+
+        closest: Dict[str, Tuple[float, str]] = {}
+        seen: Dict[str, Dict[str, Ship]] = {}
+        for mothership_id, mothership in motherships.items():
+            if player_radius is None:
+                seen[mothership_id] = self.index.query(mothership.position, radius, exclude_classes, exclude_players)
+            else:
+                seen[mothership_id] = {
+                    ship_id: ship for ship_id, ship in
+                    self.index.query(mothership.position, 2 * radius, exclude_classes, exclude_players).items()
+                    if math.hypot(mothership.position[0] - ship.position[0], mothership.position[1] - ship.position[1])
+                    <= player_radius(ship.player)
+                }
+            for ship_id, ship in early.items():
+                if math.hypot(mothership.position[0] - ship.position[0], mothership.position[1] - ship.position[1]) <= early_radius:
+                    seen[mothership_id][ship_id] = ship
+            for ship_id, ship in seen[mothership_id].items():
+                dist = math.hypot(mothership.position[0] - ship.position[0], mothership.position[1] - ship.position[1])
+                "a fleet keeps the ship it is already fighting"
+                if self.fleets[mothership_id].target_active is not None and self.fleets[mothership_id].target_active[0] == ship_id:
+                    dist = -1
+                if ship_id not in closest or dist < closest[ship_id][0]:
+                    closest[ship_id] = (dist, mothership_id)
+
+        return {
+            mothership_id: {ship_id: ship for ship_id, ship in intruders.items() if closest[ship_id][1] == mothership_id}
+            for mothership_id, intruders in seen.items()
+        }
+
+
+class EscortPlanner:
+    """
+    Keeps idle defense fleets next to our shippers.
+
+    Shippers are placed where their trade orders take them in `lookahead` ticks and grouped by an incremental
+    k-means with one cluster per fleet. Centroids of the previous tick seed the next one, so a couple of iterations
+    are enough. Fleets are matched to clusters to minimize the worst exposure, the distance a fleet has to fly
+    to reach the farthest shipper of its cluster.
+    """
+
+    def __init__(self, static_data, lookahead=10, iterations=3):
+        self.ship_classes = static_data.ship_classes
+        self.lookahead = lookahead
+        self.iterations = iterations
+        self.centroids = []
+
+    def predict(self, ship: Ship, command, planets) -> Tuple[float, float]:
+        x, y = ship.position[0], ship.position[1]
+        target = getattr(command, "target", None)
+        if command is None or command.type != "trade" or target not in planets:
+            return x, y
+        tx, ty = planets[target].position[0], planets[target].position[1]
+        dist = math.hypot(tx - x, ty - y)
+        step = (self.ship_classes[ship.ship_class].speed or 0) * self.lookahead
+        if dist <= step:
+            return tx, ty
+        return x + (tx - x) * step / dist, y + (ty - y) * step / dist
+
+    def _cluster(self, points, weights, k):
+        if len(self.centroids) != k:
+            "farthest point seeding"
+            self.centroids = [points[0]]
+            while len(self.centroids) < k:
+                self.centroids.append(max(points, key=lambda p: min(math.hypot(p[0] - c[0], p[1] - c[1]) for c in self.centroids)))
+
+        members = [[] for _ in range(k)]
+        for _ in range(self.iterations):
+            members = [[] for _ in range(k)]
+            for i, p in enumerate(points):
+                nearest = min(range(k), key=lambda c: math.hypot(p[0] - self.centroids[c][0], p[1] - self.centroids[c][1]))
+                members[nearest].append(i)
+            for c in range(k):
+                total = sum(weights[i] for i in members[c])
+                if total > 0:
+                    self.centroids[c] = (sum(points[i][0] * weights[i] for i in members[c]) / total,
+                                         sum(points[i][1] * weights[i] for i in members[c]) / total)
+
+        return members
+
+    def plan(self, motherships: Dict[str, Ship], shippers: Dict[str, Ship], commands, planets, threatened=None,
+             danger=None) -> Dict[str, Tuple[float, float]]:
+        """
+        :param commands: commands of this tick, they win over the ones the ships already follow
+        :param threatened: our ship_id -> threats heading to it, such ships weigh more
+        :param danger: DangerMap, shippers heading to dangerous places weigh more
+        :return: mothership_id -> position to hold
+        """
+        if not motherships or not shippers:
+            return {}
+        threatened = threatened or {}
+
+        points = []
+        weights = []
+        for ship_id, ship in shippers.items():
+            command = commands.get(ship_id, ship.command)
+            point = self.predict(ship, command, planets)
+            points.append(point)
+            weights.append(1 + len(threatened.get(ship_id, ())) + (danger.query(point[0], point[1]) if danger is not None else 0))
+
+        k = min(len(motherships), len(points))
+        members = self._cluster(points, weights, k)
+        spreads = [
+            max((math.hypot(points[i][0] - self.centroids[c][0], points[i][1] - self.centroids[c][1]) for i in members[c]), default=0)
+            for c in range(k)
+        ]
+
+        mothership_ids = list(motherships.keys())
+
+        def exposure(mothership_id, c):
+            position = motherships[mothership_id].position
+            return math.hypot(position[0] - self.centroids[c][0], position[1] - self.centroids[c][1]) + spreads[c]
+
+        if len(mothership_ids) <= 6:
+            best = min(itertools.permutations(mothership_ids, k),
+                       key=lambda ids: max(exposure(mothership_id, c) for c, mothership_id in enumerate(ids)))
+            return {mothership_id: self.centroids[c] for c, mothership_id in enumerate(best)}
+
+        "too many fleets to try every matching, the most exposed cluster picks first"
+        positions = {}
+        for c in sorted(range(k), key=lambda c: spreads[c], reverse=True):
+            mothership_id = min((m for m in mothership_ids if m not in positions), key=lambda m: exposure(m, c))
+            positions[mothership_id] = self.centroids[c]
+        return positions
@@ -0,0 +1,666 @@
+"""
+Deterministic simulation core with the game rules as plug-ins.
+
+A State keeps the ships in columns, one array per field, so the rules run tight loops over arrays instead of walking
+thousands of small dicts. A tick applies the rules of the rule set in order. The random stream of a rule is seeded
+from the engine seed, the season, the tick and the name of the rule, so a tick plays the same from any starting
+point and adding a rule does not change what the others draw.
+
+    engine = Engine(seed=7)
+    state = State.from_data(data, static)
+    engine.load(state)
+    engine.command(state, player_id, {"12": {"type": "move", "destination": {"coordinates": [0, 0]}}})
+    engine.step(state)
+    state.to_data(player_id)
+
+The default rules restate the stages of `LocalGame.step` in columns, the local server keeps its own readable version
+as the reference. tests/test_engine.py steps both from the same snapshot with every kind of command and requires
+the same tick, so a rule changed on one side fails the test until the other one follows. `replay` runs the engine over a session recorded by RecordingApiClient
+and measures how far every predicted tick is from the one the server sent.
+
+    python engine.py session.jsonl.gz
+"""
+import argparse
+import collections
+import itertools
+import json
+import math
+import random
+import statistics
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from local_server import ATTACK_RANGE, PRODUCTION, REFERENCE_STOCK, WRECK_TICKS
+from recording import read_log
+
+
+class Ships:
+    """
+    Columns of the ships, a ship is an index into them. Killed ships stay in the columns until `compact`, which keeps
+    the order the ships were added in, the order the server resolves them in.
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        # ship_id -> index
+        self.index: Dict[str, int] = {}
+        self.ship_class: List[str] = []
+        self.player: List[str] = []
+        self.name: List[str] = []
+        self.x = array("d")
+        self.y = array("d")
+        self.prev_x = array("d")
+        self.prev_y = array("d")
+        self.life = array("q")
+        # resource_id -> amount
+        self.resources: List[Dict[str, int]] = []
+        # commands in the wire format, None when idle
+        self.command: List[Optional[dict]] = []
+        self.alive = bytearray()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, ship_id, ship_class, player, name, position, life, resources=None, command=None,
+            prev_position=None) -> int:
+        i = len(self.ids)
+        self.ids.append(ship_id)
+        self.index[ship_id] = i
+        self.ship_class.append(ship_class)
+        self.player.append(player)
+        self.name.append(name)
+        self.x.append(position[0])
+        self.y.append(position[1])
+        prev_position = prev_position or position
+        self.prev_x.append(prev_position[0])
+        self.prev_y.append(prev_position[1])
+        self.life.append(life)
+        self.resources.append(resources or {})
+        self.command.append(command)
+        self.alive.append(1)
+        return i
+
+    def commanded(self, *kinds) -> List[int]:
+        """
+        :return: indices of the ships with a command of one of the kinds
+        """
+        return [i for i, command in enumerate(self.command) if command is not None and command["type"] in kinds]
+
+    def kill(self, i):
+        self.alive[i] = 0
+        del self.index[self.ids[i]]
+
+    def compact(self):
+        if all(self.alive):
+            return
+        alive = self.alive
+        for column in ("ids", "ship_class", "player", "name", "resources", "command"):
+            setattr(self, column, list(itertools.compress(getattr(self, column), alive)))
+        for column in ("x", "y", "prev_x", "prev_y", "life"):
+            values = getattr(self, column)
+            setattr(self, column, array(values.typecode, itertools.compress(values, alive)))
+        self.alive = bytearray(b"\x01" * len(self.ids))
+        self.index = {ship_id: i for i, ship_id in enumerate(self.ids)}
+
+
+class State:
+    """
+    Everything a tick changes. Planets, players and wrecks stay in the wire format, there are few of them.
+    """
+
+    def __init__(self, ship_classes: Dict[str, dict], tick=0, season=1):
+        self.ship_classes = ship_classes
+        self.tick = tick
+        self.season = season
+        self.ships = Ships()
+        self.planets: Dict[str, dict] = {}
+        self.players: Dict[str, dict] = {}
+        self.money: Dict[str, int] = {}
+        self.wrecks: Dict[str, dict] = {}
+        # constructions waiting for their ship, (ready at tick, ship_class, player_id, position)
+        self.constructions: List[Tuple[int, str, str, Tuple[float, float]]] = []
+        self.combat_reports = []
+        self.trade_reports = []
+        self.next_ship_id = 1
+
+    @classmethod
+    def from_data(cls, data: dict, static: dict) -> "State":
+        """
+        :param data: /data payload
+        :param static: /static-data payload
+        """
+        state = cls(static["shipClasses"], data["currentTick"]["tick"], data["currentTick"]["season"])
+        ids = []
+        for ship_id, ship in data["ships"].items():
+            state.ships.add(ship_id, ship["shipClass"], ship["player"], ship.get("name"), ship["position"],
+                            ship["life"], {resource_id: resource["amount"]
+                                           for resource_id, resource in (ship.get("resources") or {}).items()},
+                            ship.get("command"), ship.get("prevPosition"))
+            ids.append(ship_id)
+        state.planets = {planet_id: dict(planet, resources={resource_id: dict(offer)
+                                                            for resource_id, offer in planet["resources"].items()})
+                         for planet_id, planet in data["planets"].items()}
+        state.players = {player_id: dict(player, netWorth=dict(player["netWorth"]))
+                         for player_id, player in data["players"].items()}
+        state.money = {player_id: player["netWorth"]["money"] for player_id, player in data["players"].items()}
+        state.wrecks = {wreck_id: dict(wreck) for wreck_id, wreck in (data.get("wrecks") or {}).items()}
+        ids.extend(state.wrecks)
+        state.next_ship_id = max((int(ship_id) for ship_id in ids if ship_id.isdigit()), default=0) + 1
+        return state
+
+    def to_data(self, player_id=None) -> dict:
+        """
+        :return: the /data payload of this state
+        """
+        ships = self.ships
+        return {
+            "currentTick": {"tick": self.tick, "season": self.season, "minTimeLeftMs": 0}, "playerId": player_id,
+            "planets": self.planets, "players": self.players, "wrecks": self.wrecks,
+            "ships": {ships.ids[i]: {
+                "shipClass": ships.ship_class[i], "life": ships.life[i], "name": ships.name[i],
+                "player": ships.player[i], "position": [ships.x[i], ships.y[i]],
+                "prevPosition": [ships.prev_x[i], ships.prev_y[i]],
+                "resources": {resource_id: {"amount": amount} for resource_id, amount in ships.resources[i].items()},
+                "command": ships.command[i],
+            } for i in range(len(ships)) if ships.alive[i]},
+            "reports": {"combat": self.combat_reports, "trade": self.trade_reports},
+        }
+
+    def add_ship(self, ship_class, player_id, position) -> str:
+        ship_id = str(self.next_ship_id)
+        self.next_ship_id += 1
+        self.ships.add(ship_id, ship_class, player_id, f"{self.ship_classes[ship_class]['name']} {ship_id}", position,
+                       self.ship_classes[ship_class]["life"])
+        return ship_id
+
+    def position(self, target) -> Optional[Tuple[float, float]]:
+        planet = self.planets.get(target)
+        if planet is not None:
+            return planet["position"][0], planet["position"][1]
+        i = self.ships.index.get(target)
+        if i is not None:
+            return self.ships.x[i], self.ships.y[i]
+        return None
+
+
+class Rule:
+    """
+    One stage of a tick. Subclasses set `name` and implement `apply`.
+    """
+
+    name = "rule"
+
+    def load(self, state: State):
+        """
+        Called with every state the engine starts from, to pick up what the rule keeps between ticks.
+        """
+
+    def apply(self, state: State, rand: random.Random):
+        """
+        Changes the state in place.
+
+        :param rand: random stream of this rule for this tick
+        """
+        raise NotImplementedError
+
+
+class Constructions(Rule):
+    """
+    Builds ships, repairs and decommissions them, paid from the money of the player. A ship is built after `ticks`
+    ticks, the local server builds at once. A decommissioned ship is gone without a wreck.
+    """
+
+    name = "constructions"
+
+    def __init__(self, ticks=0):
+        self.ticks = ticks
+
+    def apply(self, state, rand):
+        ships = state.ships
+        for i in ships.commanded("construct", "repair", "decommission"):
+            command = ships.command[i]
+            player_id = ships.player[i]
+            if command["type"] == "decommission":
+                ships.kill(i)
+                continue
+            if command["type"] == "construct":
+                price = state.ship_classes[command["shipClass"]]["price"]
+                if state.money[player_id] >= price:
+                    state.money[player_id] -= price
+                    state.constructions.append((state.tick + self.ticks, command["shipClass"], player_id,
+                                                (ships.x[i], ships.y[i])))
+            else:
+                ship_class = state.ship_classes[ships.ship_class[i]]
+                if state.money[player_id] >= ship_class["repairPrice"]:
+                    state.money[player_id] -= ship_class["repairPrice"]
+                    ships.life[i] = min(ship_class["life"], ships.life[i] + ship_class["repairLife"])
+            ships.command[i] = None
+        ships.compact()
+
+        if state.constructions:
+            waiting = []
+            for construction in state.constructions:
+                ready, ship_class, player_id, position = construction
+                if ready <= state.tick:
+                    state.add_ship(ship_class, player_id, position)
+                else:
+                    waiting.append(construction)
+            state.constructions = waiting
+
+
+class Movement(Rule):
+    """
+    Ships fly straight at the speed of their class, attackers stop `attack_range` short of the target. Ships move
+    in order and chase where their target is after its own move, as on the server.
+    """
+
+    name = "movement"
+
+    def __init__(self, attack_range=ATTACK_RANGE):
+        self.attack_range = attack_range
+
+    def apply(self, state, rand):
+        ships = state.ships
+        ships.prev_x[:] = ships.x
+        ships.prev_y[:] = ships.y
+        xs, ys, commands, classes, index = ships.x, ships.y, ships.command, ships.ship_class, ships.index
+        speeds = {ship_class: values["speed"] for ship_class, values in state.ship_classes.items()}
+        planets = {planet_id: planet["position"] for planet_id, planet in state.planets.items()}
+        for i in ships.commanded("move", "trade", "attack"):
+            command = commands[i]
+            kind = command["type"]
+            stop_at = 0
+            if kind == "move":
+                destination = command["destination"]
+                target = destination.get("coordinates") or None
+                target_id = destination.get("target")
+            else:
+                target = None
+                target_id = command["target"]
+                if kind == "attack":
+                    stop_at = self.attack_range
+            if target is None:
+                "targets which already moved this tick are chased where they are now"
+                target = planets.get(target_id)
+                if target is None:
+                    j = index.get(target_id)
+                    if j is None:
+                        commands[i] = None
+                        continue
+                    target = (xs[j], ys[j])
+
+            x, y = xs[i], ys[i]
+            tx, ty = target[0], target[1]
+            dist = math.hypot(tx - x, ty - y)
+            step = dist - stop_at
+            speed = speeds[classes[i]]
+            if step > speed:
+                step = speed
+            if step >= dist:
+                xs[i], ys[i] = tx, ty
+                if kind == "move":
+                    commands[i] = None
+            elif step > 0:
+                xs[i] = x + (tx - x) * step / dist
+                ys[i] = y + (ty - y) * step / dist
+
+
+class Combat(Rule):
+    """
+    Attackers within `attack_range` of their target hit it with the damage of their class, all hits of a tick land
+    together and a ship without life left becomes a wreck.
+    """
+
+    name = "combat"
+
+    def __init__(self, attack_range=ATTACK_RANGE):
+        self.attack_range = attack_range
+
+    def apply(self, state, rand):
+        ships = state.ships
+        damages = {ship_class: values["damage"] for ship_class, values in state.ship_classes.items()}
+        # target index -> damage and attacker indices
+        damage: Dict[int, int] = {}
+        attackers: Dict[int, List[int]] = collections.defaultdict(list)
+        for i in ships.commanded("attack"):
+            command = ships.command[i]
+            target = ships.index.get(command["target"])
+            if target is None:
+                ships.command[i] = None
+                continue
+            if math.hypot(ships.x[target] - ships.x[i], ships.y[target] - ships.y[i]) <= self.attack_range:
+                damage[target] = damage.get(target, 0) + damages[ships.ship_class[i]]
+                attackers[target].append(i)
+
+        for target, hit in damage.items():
+            ships.life[target] -= hit
+            killed = ships.life[target] <= 0
+            for i in attackers[target]:
+                state.combat_reports.append({"tick": state.tick, "attacker": ships.ids[i],
+                                             "defender": ships.ids[target], "killed": killed})
+            if killed:
+                state.wrecks[ships.ids[target]] = {
+                    "shipClass": ships.ship_class[target], "name": ships.name[target], "player": ships.player[target],
+                    "killTick": state.tick, "position": [ships.x[target], ships.y[target]]}
+                ships.kill(target)
+        ships.compact()
+
+
+class Regeneration(Rule):
+    """
+    Every ship gets back the regen of its class, up to its full life.
+    """
+
+    name = "regeneration"
+
+    def apply(self, state, rand):
+        regen = {ship_class: values["regen"] for ship_class, values in state.ship_classes.items()}
+        life = {ship_class: values["life"] for ship_class, values in state.ship_classes.items()}
+        ships = state.ships
+        ships.life = array("q", [min(life[ship_class], current + regen[ship_class])
+                                 for current, ship_class in zip(ships.life, ships.ship_class)])
+
+
+class Wrecks(Rule):
+    """
+    Wrecks disappear `ticks` ticks after the kill.
+    """
+
+    name = "wrecks"
+
+    def __init__(self, ticks=WRECK_TICKS):
+        self.ticks = ticks
+
+    def apply(self, state, rand):
+        for wreck_id in [wreck_id for wreck_id, wreck in state.wrecks.items() if state.tick - wreck["killTick"] >= self.ticks]:
+            del state.wrecks[wreck_id]
+
+
+class Trades(Rule):
+    """
+    Ships at the planet of their trade command buy for `buyPrice` or sell for `sellPrice`, limited by stock,
+    cargo space, money and cargo.
+    """
+
+    name = "trades"
+
+    def apply(self, state, rand):
+        ships = state.ships
+        for i in ships.commanded("trade"):
+            command = ships.command[i]
+            planet_id = command["target"]
+            planet = state.planets.get(planet_id)
+            if planet is None or (ships.x[i], ships.y[i]) != (planet["position"][0], planet["position"][1]):
+                continue
+            ships.command[i] = None
+            resource_id = command["resource"]
+            offer = planet["resources"].get(resource_id)
+            if offer is None:
+                continue
+            player_id = ships.player[i]
+            cargo = ships.resources[i]
+            held = cargo.get(resource_id, 0)
+            if command["amount"] > 0:
+                if not offer["buyPrice"]:
+                    continue
+                free = state.ship_classes[ships.ship_class[i]]["cargoCapacity"] - sum(cargo.values())
+                amount = min(command["amount"], offer["amount"], free, state.money[player_id] // offer["buyPrice"])
+                if amount <= 0:
+                    continue
+                state.money[player_id] -= amount * offer["buyPrice"]
+                offer["amount"] -= amount
+                cargo[resource_id] = held + amount
+                state.trade_reports.append({"tick": state.tick, "buyer": ships.ids[i], "seller": planet_id,
+                                            "resource": resource_id, "amount": amount, "price": offer["buyPrice"]})
+            else:
+                if not offer["sellPrice"]:
+                    continue
+                amount = min(-command["amount"], held)
+                if amount <= 0:
+                    continue
+                state.money[player_id] += amount * offer["sellPrice"]
+                offer["amount"] += amount
+                if held == amount:
+                    del cargo[resource_id]
+                else:
+                    cargo[resource_id] = held - amount
+                state.trade_reports.append({"tick": state.tick, "buyer": planet_id, "seller": ships.ids[i],
+                                            "resource": resource_id, "amount": amount, "price": offer["sellPrice"]})
+
+
+class Prices(Rule):
+    """
+    Producers add `production` to their stock and consumers use it up, the price falls as the stock grows.
+
+    The server does not send the base prices. Unless given, they are estimated from the first state loaded,
+    which is exact at tick 0 and within a unit of price later.
+
+    :param base_prices: (planet_id, resource_id) -> base price
+    """
+
+    name = "prices"
+
+    def __init__(self, base_prices=None, reference_stock=REFERENCE_STOCK, production=PRODUCTION):
+        self.base_prices: Dict[Tuple[str, str], float] = dict(base_prices or {})
+        self.reference_stock = reference_stock
+        self.production = production
+
+    def load(self, state):
+        for planet_id, planet in state.planets.items():
+            for resource_id, offer in planet["resources"].items():
+                if (planet_id, resource_id) in self.base_prices:
+                    continue
+                producer = offer["buyPrice"] is not None
+                price = offer["buyPrice"] if producer else offer["sellPrice"]
+                if state.tick == 0:
+                    self.base_prices[planet_id, resource_id] = price
+                    continue
+                "the price was set from the stock before this tick's production, halfway into its rounding"
+                stock = offer["amount"] - self.production if producer else offer["amount"] + self.production
+                self.base_prices[planet_id, resource_id] = \
+                    (price + 0.5) * (self.reference_stock + max(0, stock)) / (2 * self.reference_stock)
+
+    def apply(self, state, rand):
+        for (planet_id, resource_id), base in self.base_prices.items():
+            planet = state.planets.get(planet_id)
+            if planet is None or resource_id not in planet["resources"]:
+                continue
+            offer = planet["resources"][resource_id]
+            price = max(1, int(base * 2 * self.reference_stock / (self.reference_stock + offer["amount"])))
+            if offer["buyPrice"] is not None:
+                offer["amount"] = min(4 * self.reference_stock, offer["amount"] + self.production)
+                offer["buyPrice"] = price
+            else:
+                offer["amount"] = max(0, offer["amount"] - self.production)
+                offer["sellPrice"] = price
+
+
+class NetWorth(Rule):
+    """
+    Money, ships at their price and cargo at the best price a planet pays for it.
+    """
+
+    name = "net_worth"
+
+    def apply(self, state, rand):
+        sell_prices = {}
+        for planet in state.planets.values():
+            for resource_id, offer in planet["resources"].items():
+                if offer["buyPrice"] is None:
+                    sell_prices[resource_id] = max(sell_prices.get(resource_id, 0), offer["sellPrice"] or 0)
+        values = {player_id: [0, 0] for player_id in state.players}
+        ships = state.ships
+        for (player_id, ship_class), count in collections.Counter(zip(ships.player, ships.ship_class)).items():
+            if player_id in values:
+                values[player_id][0] += count * state.ship_classes[ship_class]["price"]
+        for player_id, cargo in zip(ships.player, ships.resources):
+            if cargo and player_id in values:
+                values[player_id][1] += sum(amount * sell_prices.get(resource_id, 0) for resource_id, amount in cargo.items())
+        for player_id, (ship_value, resource_value) in values.items():
+            money = state.money[player_id]
+            state.players[player_id]["netWorth"] = {"money": money, "resources": resource_value, "ships": ship_value,
+                                                    "total": money + resource_value + ship_value}
+
+
+def default_rules() -> List[Rule]:
+    """
+    The rules of the local server in its order of a tick.
+    """
+    return [Constructions(), Movement(), Combat(), Regeneration(), Wrecks(), Trades(), Prices(), NetWorth()]
+
+
+class Engine:
+    """
+    :param rules: the rule set, applied in order every tick
+    :param seed: seeds the random streams of the rules
+    """
+
+    def __init__(self, rules: Optional[List[Rule]] = None, seed=0):
+        self.rules = list(rules) if rules is not None else default_rules()
+        self.seed = seed
+
+    def load(self, state: State):
+        for rule in self.rules:
+            rule.load(state)
+
+    def command(self, state: State, player_id, commands: Dict[str, dict]) -> Dict[str, str]:
+        """
+        Gives commands in the wire format to the ships of a player. Only the owner is checked, the rules skip
+        what they can not do.
+
+        :return: ship_id -> error message
+        """
+        errors = {}
+        for ship_id, command in commands.items():
+            i = state.ships.index.get(ship_id)
+            if i is None or state.ships.player[i] != player_id:
+                errors[ship_id] = "not your ship"
+            elif command["type"] == "stop":
+                state.ships.command[i] = None
+            elif command["type"] == "rename":
+                state.ships.name[i] = command["name"]
+            else:
+                state.ships.command[i] = command
+        return errors
+
+    def step(self, state: State):
+        state.combat_reports = []
+        state.trade_reports = []
+        for rule in self.rules:
+            rule.apply(state, random.Random(f"{self.seed}:{state.season}:{state.tick}:{rule.name}"))
+        state.tick += 1
+
+
+# how far a predicted tick is from the actual one, ships are compared when present in both
+Divergence = collections.namedtuple("Divergence", [
+    "tick", "ships", "missing", "extra", "position_mean", "position_max", "life_max", "money_max", "amount_max",
+    "price_max",
+])
+
+
+def compare(predicted: dict, actual: dict) -> Divergence:
+    """
+    :param predicted: /data payload of the engine
+    :param actual: /data payload of the server for the same tick
+    :return: missing counts ships predicted but not there, extra ones there but not predicted
+    """
+    predicted_ships, actual_ships = predicted["ships"], actual["ships"]
+    common = [ship_id for ship_id in actual_ships if ship_id in predicted_ships]
+    errors = [math.hypot(predicted_ships[ship_id]["position"][0] - actual_ships[ship_id]["position"][0],
+                         predicted_ships[ship_id]["position"][1] - actual_ships[ship_id]["position"][1])
+              for ship_id in common]
+    life = [abs(predicted_ships[ship_id]["life"] - actual_ships[ship_id]["life"]) for ship_id in common]
+    money = [abs(player["netWorth"]["money"] - predicted["players"][player_id]["netWorth"]["money"])
+             for player_id, player in actual["players"].items() if player_id in predicted["players"]]
+    amounts, prices = [0], [0]
+    for planet_id, planet in actual["planets"].items():
+        for resource_id, offer in planet["resources"].items():
+            guess = predicted["planets"].get(planet_id, {}).get("resources", {}).get(resource_id)
+            if guess is None:
+                continue
+            amounts.append(abs(guess["amount"] - offer["amount"]))
+            for key in ("buyPrice", "sellPrice"):
+                if offer[key] is not None and guess[key] is not None:
+                    prices.append(abs(guess[key] - offer[key]))
+    return Divergence(
+        tick=actual["currentTick"]["tick"], ships=len(common),
+        missing=sum(1 for ship_id in predicted_ships if ship_id not in actual_ships),
+        extra=len(actual_ships) - len(common),
+        position_mean=statistics.mean(errors) if errors else 0.0, position_max=max(errors, default=0.0),
+        life_max=max(life, default=0), money_max=max(money, default=0), amount_max=max(amounts),
+        price_max=max(prices),
+    )
+
+
+def replay(path, rules: Optional[List[Rule]] = None, seed=0) -> List[Divergence]:
+    """
+    Predicts every recorded tick from the one before and the commands the bot posted in between.
+
+    Other players' commands are not in the log, the ships they give new orders to diverge.
+
+    :param path: log of RecordingApiClient
+    :return: divergence of every tick following a recorded one
+    """
+    engine = Engine(rules, seed)
+    static = None
+    previous = None
+    commands = []
+    divergences = []
+    for record in read_log(path):
+        key = (record["method"], record["path"])
+        if key == ("GET", "/static-data") and record["status"] == 200:
+            static = json.loads(record["response"])
+        elif key == ("POST", "/commands") and record["status"] in (200, 400) and record["request"]:
+            "commands failing on the server are left out"
+            errors = json.loads(record["response"] or "{}") if record["status"] == 400 else {}
+            commands.append({ship_id: command for ship_id, command in record["request"].items()
+                             if ship_id not in errors})
+        elif key == ("GET", "/data") and record["status"] == 200:
+            data = json.loads(record["response"])
+            if previous is not None and static is not None and \
+                    data["currentTick"]["season"] == previous["currentTick"]["season"] and \
+                    data["currentTick"]["tick"] == previous["currentTick"]["tick"] + 1:
+                state = State.from_data(previous, static)
+                engine.load(state)
+                for posted in commands:
+                    engine.command(state, previous["playerId"], posted)
+                engine.step(state)
+                divergences.append(compare(state.to_data(previous["playerId"]), data))
+            previous = data
+            commands = []
+    return divergences
+
+
+def summarize(divergences: List[Divergence]) -> Dict[str, float]:
+    """
+    :return: mean and worst value of every measure, and the share of ticks predicted exactly
+    """
+    summary = {"ticks": len(divergences)}
+    if not divergences:
+        return summary
+    for field in Divergence._fields[1:]:
+        values = [getattr(divergence, field) for divergence in divergences]
+        summary[f"{field}_mean"] = statistics.mean(values)
+        summary[f"{field}_max"] = max(values)
+    summary["exact"] = sum(1 for divergence in divergences
+                           if not (divergence.missing or divergence.extra or divergence.position_max > 1e-6
+                                   or divergence.life_max or divergence.money_max or divergence.amount_max
+                                   or divergence.price_max)) / len(divergences)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays a recorded session through the engine and measures how "
+                                                 "far it is from the server.")
+    parser.add_argument("log")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    summary = summarize(replay(args.log, seed=args.seed))
+    print(f"{summary.pop('ticks')} ticks predicted, {summary.pop('exact', 0):.0%} exactly")
+    for name, value in summary.items():
+        print(f"{name:>20}: {value:12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import itertools
+from typing import Dict
+
+from space_tycoon_client.models.static_data import StaticData
+
+# how many ticks ahead the fleet is judged, roughly the rest of a season
+HORIZON = 1000
+# money kept for repairs, fleet changes never dip below it
+REPAIR_RESERVE = 1000000
+# part of the price returned by a decommission
+DECOMMISSION_REFUND = 0.0
+# weight of a new observation in the moving average of route yields
+YIELD_SMOOTHING = 0.1
+
+
+class FleetPlanner:
+    """
+    Decides how many cargo ships of each class to build or decommission.
+
+    Every candidate fleet composition is simulated over HORIZON ticks: income of each class is its cargo capacity
+    times speed times the observed profit per cargo unit and distance, with diminishing returns once the fleet
+    outgrows the number of profitable markets. The composition with the highest final net worth wins.
+    Ships are worth nothing at the end of the horizon, so a new ship has to pay back its price within it.
+    """
+
+    def __init__(self, static_data: StaticData, horizon=HORIZON, reserve=REPAIR_RESERVE, max_change=3):
+        self.horizon = horizon
+        self.reserve = reserve
+        self.max_change = max_change
+        self.cargo_classes = {
+            class_id: ship_class for class_id, ship_class in static_data.ship_classes.items()
+            if ship_class.cargo_capacity and not ship_class.shipyard
+        }
+        # ship_class -> moving average of profit per cargo unit and distance unit
+        self.rates: Dict[str, float] = {}
+        self.markets = 1
+
+    def observe(self, ship_class, rate):
+        """
+        Records a route yield, either planned by trade or realized.
+
+        :param rate: profit per cargo unit per distance unit
+        """
+        if ship_class not in self.cargo_classes:
+            return
+        if ship_class not in self.rates:
+            self.rates[ship_class] = rate
+        else:
+            self.rates[ship_class] += YIELD_SMOOTHING * (rate - self.rates[ship_class])
+
+    def set_markets(self, count):
+        self.markets = max(1, count)
+
+    def ship_income(self, class_id) -> float:
+        ship_class = self.cargo_classes[class_id]
+        rate = self.rates.get(class_id)
+        if rate is None:
+            "no route seen for this class yet, borrow the best one"
+            rate = max(self.rates.values(), default=0)
+        return rate * ship_class.cargo_capacity * ship_class.speed
+
+    def payback(self, class_id, counts: Dict[str, int]) -> float:
+        """
+        Ticks until one more ship of the class pays for itself given the current fleet.
+        """
+        gain = self.fleet_income(dict(counts, **{class_id: counts.get(class_id, 0) + 1})) - self.fleet_income(counts)
+        if gain <= 0:
+            return float("inf")
+        return self.cargo_classes[class_id].price / gain
+
+    def fleet_income(self, counts: Dict[str, int]) -> float:
+        total_ships = sum(counts.values())
+        if total_ships == 0:
+            return 0
+        "every extra ship beyond the number of markets competes for the same spreads"
+        saturation = 1 / (1 + total_ships / self.markets)
+        return sum(self.ship_income(class_id) * count for class_id, count in counts.items()) * saturation
+
+    def plan(self, counts: Dict[str, int], money) -> Dict[str, int]:
+        """
+        :param counts: current number of our ships per class
+        :return: ship_class -> change of ship count, positive to build, negative to decommission
+        """
+        class_ids = list(self.cargo_classes.keys())
+        if not class_ids or not self.rates:
+            return {}
+
+        budget = money - self.reserve
+        ranges = [range(-min(self.max_change, counts.get(class_id, 0)), self.max_change + 1) for class_id in class_ids]
+
+        "keep the fleet unless some change is strictly better"
+        best_worth = self.fleet_income(counts) * self.horizon
+        best_change = {}
+        for change in itertools.product(*ranges):
+            cost = 0
+            fleet = {}
+            for class_id, delta in zip(class_ids, change):
+                price = self.cargo_classes[class_id].price
+                cost += price * delta if delta > 0 else price * delta * DECOMMISSION_REFUND
+                fleet[class_id] = counts.get(class_id, 0) + delta
+            if cost > 0 and cost > budget:
+                continue
+            worth = self.fleet_income(fleet) * self.horizon - cost
+            if worth > best_worth:
+                best_worth = worth
+                best_change = {class_id: delta for class_id, delta in zip(class_ids, change) if delta}
+
+        return best_change
@@ -0,0 +1,124 @@
+"""
+Synthetic galaxies in the wire format of the API.
+
+`generate` returns /static-data and /data payloads with any number of planets, resources, players, ships and wrecks,
+for benchmarks and for the local server. Only the standard library is needed.
+"""
+import math
+import random
+from typing import Dict, Tuple
+
+# ship_class -> static parameters, close to the ones of the real server
+SHIP_CLASSES = {
+    "1": {"name": "mothership", "shipyard": True, "speed": 8, "cargoCapacity": 0, "life": 2000, "damage": 25,
+          "price": 2500000, "regen": 5, "repairPrice": 20000, "repairLife": 200},
+    "2": {"name": "hauler", "shipyard": False, "speed": 9, "cargoCapacity": 300, "life": 200, "damage": 0,
+          "price": 1000000, "regen": 1, "repairPrice": 5000, "repairLife": 50},
+    "3": {"name": "shipper", "shipyard": False, "speed": 17, "cargoCapacity": 100, "life": 100, "damage": 0,
+          "price": 150000, "regen": 1, "repairPrice": 2000, "repairLife": 50},
+    "4": {"name": "fighter", "shipyard": False, "speed": 20, "cargoCapacity": 0, "life": 300, "damage": 20,
+          "price": 200000, "regen": 2, "repairPrice": 3000, "repairLife": 100},
+    "5": {"name": "bomber", "shipyard": False, "speed": 9, "cargoCapacity": 0, "life": 500, "damage": 90,
+          "price": 800000, "regen": 3, "repairPrice": 8000, "repairLife": 150},
+}
+# share of every ship class in a generated fleet, motherships are added one per player
+FLEET_MIX = {"2": 1, "3": 4, "4": 3, "5": 1}
+# half width of the square the galaxy fits in
+GALAXY_SIZE = 1500
+# resources traded on one planet, the first one is produced, the others are consumed
+PLANET_RESOURCES = 3
+
+
+def resource_names(count) -> Dict[str, str]:
+    return {str(r): f"resource {r}" for r in range(1, count + 1)}
+
+
+def static_data(resources=8) -> dict:
+    return {"shipClasses": SHIP_CLASSES, "resourceNames": resource_names(resources)}
+
+
+def generate_planets(rand: random.Random, count, resource_ids, stock=500) -> Dict[str, dict]:
+    """
+    Planets sell the resource they produce for `buyPrice` and pay `sellPrice` for the ones they consume.
+    """
+    planets = {}
+    for p in range(1, count + 1):
+        position = [rand.uniform(-GALAXY_SIZE, GALAXY_SIZE), rand.uniform(-GALAXY_SIZE, GALAXY_SIZE)]
+        resources = {}
+        for i, resource_id in enumerate(rand.sample(list(resource_ids), min(PLANET_RESOURCES, len(resource_ids)))):
+            price = rand.randint(50, 150) * (1 if i else 2)
+            resources[resource_id] = {"amount": stock, "buyPrice": None if i else price,
+                                      "sellPrice": price if i else None}
+        planets[f"p{p}"] = {"name": f"planet {p}", "resources": resources, "position": position,
+                            "prevPosition": list(position)}
+    return planets
+
+
+def new_ship(ship_id, ship_class, player_id, position) -> dict:
+    return {
+        "shipClass": ship_class, "life": SHIP_CLASSES[ship_class]["life"],
+        "name": f"{SHIP_CLASSES[ship_class]['name']} {ship_id}", "player": player_id,
+        "position": list(position), "prevPosition": list(position), "resources": {}, "command": None,
+    }
+
+
+def generate(seed=0, planets=30, resources=8, players=5, ships=200, wrecks=20, player_id="1",
+             tick=100) -> Tuple[dict, dict]:
+    """
+    Ships are spread over the players, half of them fly somewhere and shippers carry some cargo, so every
+    branch of the bot has something to do.
+
+    :param ships: ships of all players together, motherships included
+    :return: /static-data and /data payloads
+    """
+    rand = random.Random(seed)
+    static = static_data(resources)
+    planet_payload = generate_planets(rand, planets, static["resourceNames"])
+    planet_ids = list(planet_payload)
+    player_ids = [str(p) for p in range(1, players + 1)]
+    if player_id not in player_ids:
+        player_ids[0] = player_id
+
+    homes = {p: [rand.uniform(-GALAXY_SIZE, GALAXY_SIZE), rand.uniform(-GALAXY_SIZE, GALAXY_SIZE)] for p in player_ids}
+    classes = [ship_class for ship_class, share in FLEET_MIX.items() for _ in range(share)]
+    ship_payload = {}
+    for i in range(ships):
+        ship_id = str(i + 1)
+        owner = player_ids[i % len(player_ids)]
+        ship_class = "1" if i < len(player_ids) else rand.choice(classes)
+        home = homes[owner]
+        spread = 20 if ship_class == "1" else 400
+        position = [home[0] + rand.uniform(-spread, spread), home[1] + rand.uniform(-spread, spread)]
+        ship = new_ship(ship_id, ship_class, owner, position)
+        ship["life"] = rand.randint(SHIP_CLASSES[ship_class]["life"] // 2, SHIP_CLASSES[ship_class]["life"])
+        if rand.random() < 0.5:
+            target = planet_payload[rand.choice(planet_ids)]
+            dist = math.hypot(target["position"][0] - position[0], target["position"][1] - position[1]) or 1
+            step = SHIP_CLASSES[ship_class]["speed"]
+            ship["prevPosition"] = [position[0] - (target["position"][0] - position[0]) * step / dist,
+                                    position[1] - (target["position"][1] - position[1]) * step / dist]
+            ship["command"] = {"type": "move", "destination": {"coordinates": target["position"]}}
+        if SHIP_CLASSES[ship_class]["cargoCapacity"] and rand.random() < 0.3:
+            ship["resources"] = {rand.choice(list(static["resourceNames"])): {"amount": rand.randint(1, SHIP_CLASSES[ship_class]["cargoCapacity"])}}
+        ship_payload[ship_id] = ship
+
+    wreck_payload = {}
+    for w in range(wrecks):
+        ship_class = rand.choice(classes)
+        wreck_payload[str(ships + w + 1)] = {
+            "shipClass": ship_class, "name": f"wreck {w}", "player": rand.choice(player_ids),
+            "killTick": tick - rand.randint(0, 50),
+            "position": [rand.uniform(-GALAXY_SIZE, GALAXY_SIZE), rand.uniform(-GALAXY_SIZE, GALAXY_SIZE)],
+        }
+
+    player_payload = {
+        p: {"name": f"player {p}", "color": [rand.randint(0, 255) for _ in range(3)],
+            "netWorth": {"money": 5000000, "resources": 0, "ships": 0, "total": 5000000}}
+        for p in player_ids
+    }
+    data = {
+        "currentTick": {"tick": tick, "season": 1, "minTimeLeftMs": 1000}, "planets": planet_payload,
+        "playerId": player_id, "players": player_payload, "ships": ship_payload, "wrecks": wreck_payload,
+        "reports": {"combat": [], "trade": []},
+    }
+    return static, data
@@ -0,0 +1,277 @@
+"""
+Load generator for the game server protocol.
+
+    python loadgen.py --clients 50 100 200 --ticks 20 --tick-time 0.5
+
+starts the local server in its own process for every client count and lets that many simulated bots play on it.
+A bot is an asyncio task driving the real GameApi: it logs in, gets /data, posts move commands for a few of its
+ships to /commands and ends its turn, every tick. The blocking calls run on a thread pool, the clients share one
+connection pool.
+
+Per client count the report shows requests per second, latency percentiles per endpoint, the CPU time the client
+side spends per request and the share of ticks the bots missed, the point where one host stops keeping up.
+With --host the bots play on a server already running instead. A bot whose /data keeps failing backs off, logs in
+again and finally gives up, it is counted as failed.
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+import urllib3
+from space_tycoon_client import ApiClient, Configuration, GameApi, rest
+from space_tycoon_client.models.credentials import Credentials
+from space_tycoon_client.models.destination import Destination
+from space_tycoon_client.models.end_turn import EndTurn
+from space_tycoon_client.models.move_command import MoveCommand
+from space_tycoon_client.rest import ApiException
+
+# ships a simulated bot gives a new command every tick
+COMMANDS_PER_TICK = 5
+# failed /data calls in a row after which a bot logs in again
+DATA_RETRIES = 5
+# seconds before the first retry, doubled after every failure up to MAX_RETRY_DELAY
+RETRY_DELAY = 0.1
+MAX_RETRY_DELAY = 2.0
+# logins after the first one before a bot gives up
+RELOGINS = 1
+ENDPOINTS = ["login", "data", "commands", "end_turn"]
+
+
+class LoadApiClient(ApiClient):
+    """
+    ApiClient on a shared connection pool. ApiClient starts a thread pool of its own for `async_req`, which hundreds
+    of clients do not need, so its constructor is not run.
+    """
+
+    def __init__(self, rest_client: rest.RESTClientObject, configuration: Configuration):
+        self.configuration = configuration
+        self.rest_client = rest_client
+        self.default_headers = {}
+        self.cookie = None
+        self.user_agent = "Swagger-Codegen/1.0.0/python"
+
+    def __del__(self):
+        pass
+
+
+class Stats:
+    """
+    Latency and client CPU time of every request, in seconds, per endpoint. The lists are only appended to,
+    which is safe from the worker threads.
+    """
+
+    def __init__(self):
+        self.latency: Dict[str, List[float]] = collections.defaultdict(list)
+        self.cpu: Dict[str, List[float]] = collections.defaultdict(list)
+        self.errors: Dict[str, int] = collections.defaultdict(int)
+        self.ticks = 0
+        self.missed = 0
+        # bots which gave up
+        self.failed = 0
+
+    def timed(self, endpoint, call, *args, **kwargs):
+        "runs on a worker thread, the CPU time is the one of that thread"
+        started = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            return call(*args, **kwargs)
+        except (ApiException, urllib3.exceptions.HTTPError):
+            self.errors[endpoint] += 1
+            raise
+        finally:
+            self.cpu[endpoint].append(time.thread_time() - cpu)
+            self.latency[endpoint].append(time.perf_counter() - started)
+
+
+async def play(n, host, rest_client, executor, stats: Stats, ticks, seed=0, raw=False, retries=DATA_RETRIES,
+               retry_delay=RETRY_DELAY):
+    """
+    One simulated bot, plays until the server is `ticks` ticks past the one it joined in.
+
+    :param raw: decode /data as plain JSON instead of building the models, to tell the cost of the generated
+                client from the one of the server
+    :param retries: failed /data calls in a row before logging in again, after RELOGINS logins the bot gives up
+    """
+    loop = asyncio.get_running_loop()
+    rand = random.Random(f"{seed}:{n}")
+    configuration = Configuration()
+    configuration.host = host
+    api_client = LoadApiClient(rest_client, configuration)
+    client = GameApi(api_client=api_client)
+
+    async def call(endpoint, method, *args, **kwargs):
+        return await loop.run_in_executor(executor, lambda: stats.timed(endpoint, method, *args, **kwargs))
+
+    async def login():
+        try:
+            player, _, headers = await call("login", client.login_post_with_http_info,
+                                            Credentials(username=f"load {n}", password="load"),
+                                            _return_http_data_only=False)
+        except (ApiException, urllib3.exceptions.HTTPError):
+            return None
+        api_client.cookie = headers["Set-Cookie"]
+        return player
+
+    player = await login()
+    if player is None:
+        stats.failed += 1
+        return
+    first_tick = previous_tick = None
+    failures = logins = 0
+    while True:
+        try:
+            if raw:
+                response = await call("data", client.data_get, _preload_content=False)
+                data = json.loads(response.data)
+                tick, season = data["currentTick"]["tick"], data["currentTick"]["season"]
+                ours = [ship_id for ship_id, ship in data["ships"].items() if ship["player"] == player.id]
+            else:
+                data = await call("data", client.data_get)
+                tick, season = data.current_tick.tick, data.current_tick.season
+                ours = [ship_id for ship_id, ship in data.ships.items() if ship.player == player.id]
+        except (ApiException, urllib3.exceptions.HTTPError):
+            failures += 1
+            if failures < retries:
+                await asyncio.sleep(min(retry_delay * 2 ** (failures - 1), MAX_RETRY_DELAY))
+                continue
+            "the session may be gone, a new one or the bot is lost"
+            player = await login() if logins < RELOGINS else None
+            if player is None:
+                stats.failed += 1
+                return
+            failures = 0
+            logins += 1
+            continue
+        failures = 0
+        if first_tick is None:
+            first_tick = previous_tick = tick
+        elif tick > previous_tick:
+            stats.ticks += 1
+            stats.missed += tick - previous_tick - 1
+            previous_tick = tick
+        if tick - first_tick >= ticks:
+            return
+
+        commands = {ship_id: MoveCommand(destination=Destination(coordinates=[rand.randint(-1500, 1500),
+                                                                              rand.randint(-1500, 1500)]))
+                    for ship_id in rand.sample(ours, min(COMMANDS_PER_TICK, len(ours)))}
+        try:
+            await call("commands", client.commands_post, commands)
+            await call("end_turn", client.end_turn_post, EndTurn(tick=tick, season=season))
+        except (ApiException, urllib3.exceptions.HTTPError):
+            "counted in the stats, the next tick goes on"
+            pass
+
+
+async def run_clients(clients, host, ticks, seed=0, raw=False) -> (Stats, float, float):
+    """
+    :return: the stats, the wall time and the CPU time of this process
+    """
+    stats = Stats()
+    configuration = Configuration()
+    configuration.host = host
+    rest_client = rest.RESTClientObject(configuration, maxsize=clients)
+    "end-turn blocks until the tick is over, every client needs a thread to wait in"
+    with concurrent.futures.ThreadPoolExecutor(max_workers=clients) as executor:
+        started, cpu = time.perf_counter(), time.process_time()
+        await asyncio.gather(*(play(n, host, rest_client, executor, stats, ticks, seed, raw) for n in range(clients)))
+        return stats, time.perf_counter() - started, time.process_time() - cpu
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, tick_time, ships, seed) -> subprocess.Popen:
+    """
+    Runs the local server in its own process, so it does not share the interpreter with the clients.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen([sys.executable, os.path.join(here, "local_server.py"), "--port", str(port),
+                               "--tick-time", str(tick_time), "--ships", str(ships), "--seed", str(seed)],
+                              stdout=subprocess.DEVNULL, cwd=here)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://localhost:{port}/current-tick", timeout=1).read()
+            return server
+        except OSError:
+            if server.poll() is not None:
+                raise RuntimeError("local server did not start")
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("local server did not start")
+
+
+def percentile(values, q) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+def report(clients, stats: Stats, wall, cpu) -> dict:
+    """
+    :return: requests per second, missed tick share, cores the clients used, errors, bots which gave up and
+             per endpoint the count, latency percentiles and mean client CPU per request in ms
+    """
+    requests = sum(len(latency) for latency in stats.latency.values())
+    row = {"clients": clients, "requests": requests, "rps": requests / wall if wall else 0.0,
+           "missed": stats.missed / (stats.ticks + stats.missed) if stats.ticks + stats.missed else 0.0,
+           "cores": cpu / wall if wall else 0.0, "errors": sum(stats.errors.values()), "failed": stats.failed,
+           "endpoints": {}}
+    for endpoint in ENDPOINTS:
+        latency = stats.latency.get(endpoint, [])
+        row["endpoints"][endpoint] = {
+            "count": len(latency), "p50": percentile(latency, 0.5) * 1000, "p95": percentile(latency, 0.95) * 1000,
+            "p99": percentile(latency, 0.99) * 1000, "max": max(latency, default=0) * 1000,
+            "cpu": sum(stats.cpu.get(endpoint, [])) / len(latency) * 1000 if latency else 0.0,
+        }
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drives many simulated bots against the game server.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[100], help="client counts to run one after another")
+    parser.add_argument("--ticks", type=int, default=20, help="ticks every client count plays")
+    parser.add_argument("--tick-time", type=float, default=1.0, help="seconds per tick of the local server")
+    parser.add_argument("--ships", type=int, default=200, help="NPC ships of the local server")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", help="server to play on instead of starting the local one")
+    parser.add_argument("--raw", action="store_true", help="decode /data as JSON instead of building the models")
+    args = parser.parse_args()
+
+    print(f"{'clients':>8}{'req/s':>9}{'missed':>8}{'cores':>7}{'errors':>7}{'failed':>7}  "
+          + "  ".join(f"{endpoint + ' p50/p95/p99 ms, cpu ms':>34}" for endpoint in ENDPOINTS[1:]))
+    for clients in args.clients:
+        server = None
+        host = args.host
+        if host is None:
+            port = free_port()
+            server = start_server(port, args.tick_time, args.ships, args.seed)
+            host = f"http://localhost:{port}"
+        try:
+            stats, wall, cpu = asyncio.run(run_clients(clients, host, args.ticks, args.seed, args.raw))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        row = report(clients, stats, wall, cpu)
+        print(f"{clients:>8}{row['rps']:>9.0f}{row['missed']:>8.1%}{row['cores']:>7.2f}{row['errors']:>7}"
+              f"{row['failed']:>7}  " + "  ".join(
+            "{p50:>8.1f}{p95:>8.1f}{p99:>8.1f}{cpu:>10.2f}".format(**row["endpoints"][endpoint])
+            for endpoint in ENDPOINTS[1:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,676 @@
+"""
+Local stand-in for the game server, for offline development and load tests of the bot.
+
+Implements /login, /logout, /static-data, /data, /commands, /end-turn, /current-tick and /reports with the JSON
+schema of the generated client. The rules are simplified: planets stand still, prices follow planet stock, ships fly
+straight at their class speed, trades happen on arrival and attacks hit within ATTACK_RANGE. engine.py restates
+the same rules in columns for fast simulation, tests/test_engine.py checks both play every tick alike.
+
+A tick ends after `tick_time` seconds or as soon as every logged in player ended its turn, with `tick_time` 0 the
+server runs in lockstep with the bots. The galaxy is filled with NPC players trading and fighting, so thousands
+of ships can be simulated without the real server.
+
+    python local_server.py --port 8000 --ships 2000 --tick-time 0.2
+
+and point the bot at it with `host: "http://localhost:8000"` in the config.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from galaxy import GALAXY_SIZE, SHIP_CLASSES, generate_planets, new_ship, resource_names
+
+# ships every player starts a season with
+START_FLEET = {"1": 1, "3": 5, "4": 3}
+START_MONEY = 5000000
+# attacks only hit ships this close
+ATTACK_RANGE = 50
+# wrecks disappear after this many ticks
+WRECK_TICKS = 100
+# planet stock at which the price equals the base price, more stock makes it cheaper
+REFERENCE_STOCK = 500
+# stock produced or consumed by a planet per tick and resource
+PRODUCTION = 5
+# chance per tick that an idle NPC fighter looks for a victim
+NPC_AGGRESSION = 0.02
+NPC_HUNT_RADIUS = 300
+
+
+def distance(a, b) -> float:
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+class CommandError(Exception):
+    pass
+
+
+class LocalGame:
+    """
+    Game state in the wire format of the API, so responses are a json.dumps away.
+
+    Every public method takes the lock, the HTTP handler threads and the tick thread share one instance.
+    """
+
+    def __init__(self, seed=0, planets=30, resources=8, npc_players=4, npc_ships=200, tick_time=1.0,
+                 season_ticks=0, min_players=0):
+        """
+        :param min_players: a season does not start before this many players logged in to it
+        """
+        self.seed = seed
+        self.planet_count = planets
+        self.resource_count = resources
+        self.npc_players = npc_players
+        self.npc_ships = npc_ships
+        self.tick_time = tick_time
+        self.season_ticks = season_ticks
+        self.min_players = min_players
+
+        self.cond = threading.Condition()
+        self.stopped = False
+        self.season = 1
+        self.tick = 0
+        # username -> [password, player_id], kept over seasons so scores stay comparable
+        self.users: Dict[str, list] = {}
+        # session token -> player_id
+        self.sessions: Dict[str, str] = {}
+        self.ended = set()
+        # season -> player -> score
+        self.season_scores: Dict[str, Dict[str, int]] = {}
+        self.profiling = []
+        self._new_season()
+
+    def _new_season(self):
+        self.random = random.Random(f"{self.seed}:{self.season}")
+        self.tick = 0
+        self.next_ship_id = 1
+        self.ships: Dict[str, dict] = {}
+        self.wrecks: Dict[str, dict] = {}
+        self.players: Dict[str, dict] = {}
+        self.money: Dict[str, int] = {}
+        # player_id -> position the player started at
+        self.homes: Dict[str, list] = {}
+        self.combat_reports = []
+        self.trade_reports = []
+        self.sessions.clear()
+        self.ended.clear()
+        self._data_cache: Optional[str] = None
+        self.next_tick_at = time.monotonic() + self.tick_time
+
+        self.resource_names = resource_names(self.resource_count)
+        self.planets: Dict[str, dict] = generate_planets(self.random, self.planet_count, self.resource_names,
+                                                         REFERENCE_STOCK)
+        # (planet_id, resource_id) -> base price
+        self.base_prices = {}
+        # (planet_id, resource_id) -> True for producers, False for consumers
+        self.producers = {}
+        for planet_id, planet in self.planets.items():
+            for resource_id, offer in planet["resources"].items():
+                self.producers[planet_id, resource_id] = offer["buyPrice"] is not None
+                self.base_prices[planet_id, resource_id] = offer["buyPrice"] or offer["sellPrice"]
+
+        "NPC ids stay clear of the ones handed out at login"
+        self.npc_ids = [str(1001 + n) for n in range(self.npc_players)]
+        for n, player_id in enumerate(self.npc_ids):
+            self._spawn_player(f"npc {n + 1}", player_id, START_FLEET)
+        classes = ["3", "3", "3", "2", "4", "4", "5"]
+        for i in range(self.npc_ships if self.npc_ids else 0):
+            player_id = self.npc_ids[i % len(self.npc_ids)]
+            home = self.homes[player_id]
+            self._add_ship(self.random.choice(classes), player_id,
+                           [home[0] + self.random.uniform(-200, 200), home[1] + self.random.uniform(-200, 200)])
+
+    def _add_ship(self, ship_class, player_id, position) -> str:
+        ship_id = str(self.next_ship_id)
+        self.next_ship_id += 1
+        self.ships[ship_id] = new_ship(ship_id, ship_class, player_id, position)
+        return ship_id
+
+    def _spawn_player(self, name, player_id, fleet):
+        self.players[player_id] = {"name": name, "color": [self.random.randint(0, 255) for _ in range(3)],
+                                   "netWorth": {"money": START_MONEY, "resources": 0, "ships": 0, "total": START_MONEY}}
+        self.money[player_id] = START_MONEY
+        home = [self.random.uniform(-GALAXY_SIZE, GALAXY_SIZE), self.random.uniform(-GALAXY_SIZE, GALAXY_SIZE)]
+        self.homes[player_id] = home
+        for ship_class, count in fleet.items():
+            for _ in range(count):
+                self._add_ship(ship_class, player_id, [home[0] + self.random.uniform(-20, 20),
+                                                       home[1] + self.random.uniform(-20, 20)])
+
+    def _current_tick(self):
+        left = max(0, self.next_tick_at - time.monotonic()) if self.tick_time else 0
+        return {"tick": self.tick, "season": self.season, "minTimeLeftMs": int(left * 1000)}
+
+    # -- API ---------------------------------------------------------------------------------------------------
+
+    def login(self, username, password) -> (str, str):
+        """
+        :return: player_id and a session token, players join the running season on their first login
+        """
+        with self.cond:
+            if username not in self.users:
+                self.users[username] = [password, str(len(self.users) + 1)]
+            if self.users[username][0] != password:
+                raise PermissionError("wrong password")
+            player_id = self.users[username][1]
+            if player_id not in self.players:
+                self._spawn_player(username, player_id, START_FLEET)
+                self._data_cache = None
+            token = uuid.uuid4().hex
+            self.sessions[token] = player_id
+            self.cond.notify_all()
+            return player_id, token
+
+    def logout(self, token):
+        with self.cond:
+            self.sessions.pop(token, None)
+            self.cond.notify_all()
+
+    def player(self, token) -> str:
+        player_id = self.sessions.get(token)
+        if player_id is None:
+            raise PermissionError("not logged in")
+        return player_id
+
+    def static_data(self) -> dict:
+        return {"shipClasses": SHIP_CLASSES, "resourceNames": self.resource_names}
+
+    def data(self, token) -> str:
+        with self.cond:
+            player_id = self.player(token)
+            if self._data_cache is None:
+                self._data_cache = json.dumps({
+                    "currentTick": self._current_tick(), "planets": self.planets, "players": self.players,
+                    "ships": self.ships, "wrecks": self.wrecks,
+                    "reports": {"combat": self.combat_reports, "trade": self.trade_reports},
+                })
+            "the payload is the same for everybody except for the player id"
+            return '{"playerId": %s, %s' % (json.dumps(player_id), self._data_cache[1:])
+
+    def commands(self, token, commands: dict) -> dict:
+        """
+        Valid commands are applied even when some others fail.
+
+        :return: ship_id -> error message
+        """
+        with self.cond:
+            player_id = self.player(token)
+            errors = {}
+            for ship_id, command in commands.items():
+                try:
+                    self._check_command(player_id, ship_id, command)
+                except CommandError as e:
+                    errors[ship_id] = str(e)
+                    continue
+                if command["type"] == "stop":
+                    self.ships[ship_id]["command"] = None
+                elif command["type"] == "rename":
+                    self.ships[ship_id]["name"] = command["name"]
+                else:
+                    self.ships[ship_id]["command"] = command
+            self._data_cache = None
+            return errors
+
+    def _check_command(self, player_id, ship_id, command):
+        ship = self.ships.get(ship_id)
+        if ship is None or ship["player"] != player_id:
+            raise CommandError("not your ship")
+        kind = command.get("type")
+        if kind == "move":
+            destination = command.get("destination") or {}
+            if destination.get("coordinates") is None and self._position(destination.get("target")) is None:
+                raise CommandError("unknown destination")
+        elif kind == "trade":
+            if command.get("target") not in self.planets:
+                raise CommandError("only planets trade on the local server")
+            if command.get("resource") not in self.planets[command["target"]]["resources"]:
+                raise CommandError("resource not traded on the planet")
+            if not command.get("amount"):
+                raise CommandError("nothing to trade")
+        elif kind == "attack":
+            if command.get("target") not in self.ships:
+                raise CommandError("unknown target")
+            if self.ships[command["target"]]["player"] == player_id:
+                raise CommandError("can not attack own ship")
+            if not SHIP_CLASSES[ship["shipClass"]]["damage"]:
+                raise CommandError("ship can not attack")
+        elif kind == "construct":
+            if not SHIP_CLASSES[ship["shipClass"]]["shipyard"]:
+                raise CommandError("ship is not a shipyard")
+            if command.get("shipClass") not in SHIP_CLASSES or SHIP_CLASSES[command["shipClass"]]["shipyard"]:
+                raise CommandError("ship class can not be built")
+        elif kind == "rename":
+            if not command.get("name"):
+                raise CommandError("empty name")
+        elif kind not in ("repair", "decommission", "stop"):
+            raise CommandError(f"unknown command {kind}")
+
+    def end_turn(self, token, tick, season) -> dict:
+        """
+        Blocks until the tick after `tick` starts.
+        """
+        with self.cond:
+            player_id = self.player(token)
+            if season == self.season and tick == self.tick:
+                self.ended.add(player_id)
+                self.cond.notify_all()
+                while season == self.season and tick == self.tick and not self.stopped:
+                    self.cond.wait()
+            return self._current_tick()
+
+    def current_tick(self) -> dict:
+        with self.cond:
+            return self._current_tick()
+
+    def reports(self, token) -> dict:
+        with self.cond:
+            self.player(token)
+            season_scores = dict(self.season_scores)
+            season_scores[str(self.season)] = {
+                player_id: player["netWorth"]["total"] for player_id, player in self.players.items()
+            }
+            return {"combat": self.combat_reports, "trade": self.trade_reports, "profiling": self.profiling[-100:],
+                    "prices": {}, "resourceAmounts": {}, "scores": {}, "seasonScores": season_scores,
+                    "season": self.season, "tick": self.tick}
+
+    # -- simulation --------------------------------------------------------------------------------------------
+
+    def run(self):
+        """
+        Tick loop, run it in its own thread.
+        """
+        with self.cond:
+            while not self.stopped:
+                logged_in = set(self.sessions.values())
+                if self.tick == 0 and len(logged_in) < self.min_players:
+                    self.cond.wait()
+                    self.next_tick_at = time.monotonic() + self.tick_time
+                    continue
+                if logged_in and logged_in <= self.ended:
+                    self.step()
+                    continue
+                if self.tick_time:
+                    left = self.next_tick_at - time.monotonic()
+                    if left <= 0:
+                        self.step()
+                        continue
+                    self.cond.wait(left)
+                else:
+                    self.cond.wait()
+
+    def stop(self):
+        with self.cond:
+            self.stopped = True
+            self.cond.notify_all()
+
+    def step(self):
+        """
+        Advances the game by one tick, the caller holds the lock.
+        """
+        stages = {}
+        started = time.perf_counter()
+        self.combat_reports = []
+        self.trade_reports = []
+        self._npc_commands()
+        for stage in (self._constructions, self._movement, self._attacks, self._trades, self._update_prices):
+            stage_started = time.perf_counter()
+            stage()
+            stages[stage.__name__] = int((time.perf_counter() - stage_started) * 1000000)
+        self._update_net_worth()
+
+        self.tick += 1
+        self.ended.clear()
+        self.next_tick_at = time.monotonic() + self.tick_time
+        self._data_cache = None
+        total = int((time.perf_counter() - started) * 1000000)
+        "durations in microseconds"
+        self.profiling.append({
+            "tick": self.tick, "movement": stages["_movement"], "attacks": stages["_attacks"],
+            "trades": stages["_trades"], "recipes": 0, "prices": stages["_update_prices"],
+            "constructions": stages["_constructions"], "report": 0, "total": total, "overall": total,
+            "at": int(time.time() * 1000),
+        })
+        del self.profiling[:-1000]
+
+        if self.season_ticks and self.tick >= self.season_ticks:
+            self.season_scores[str(self.season)] = {
+                player_id: player["netWorth"]["total"] for player_id, player in self.players.items()
+            }
+            self.season += 1
+            self._new_season()
+        self.cond.notify_all()
+
+    def _position(self, target) -> Optional[list]:
+        if target in self.planets:
+            return self.planets[target]["position"]
+        if target in self.ships:
+            return self.ships[target]["position"]
+        return None
+
+    def _constructions(self):
+        for ship_id, ship in list(self.ships.items()):
+            command = ship["command"]
+            if command is None:
+                continue
+            kind = command["type"]
+            player_id = ship["player"]
+            if kind == "construct":
+                price = SHIP_CLASSES[command["shipClass"]]["price"]
+                if self.money[player_id] >= price:
+                    self.money[player_id] -= price
+                    self._add_ship(command["shipClass"], player_id, ship["position"])
+                ship["command"] = None
+            elif kind == "repair":
+                ship_class = SHIP_CLASSES[ship["shipClass"]]
+                if self.money[player_id] >= ship_class["repairPrice"]:
+                    self.money[player_id] -= ship_class["repairPrice"]
+                    ship["life"] = min(ship_class["life"], ship["life"] + ship_class["repairLife"])
+                ship["command"] = None
+            elif kind == "decommission":
+                del self.ships[ship_id]
+
+    def _movement(self):
+        for ship in self.ships.values():
+            ship["prevPosition"] = ship["position"]
+            command = ship["command"]
+            if command is None:
+                continue
+            kind = command["type"]
+            stop_at = 0
+            if kind == "move":
+                destination = command["destination"]
+                target = destination.get("coordinates") or self._position(destination.get("target"))
+            elif kind == "trade":
+                target = self._position(command["target"])
+            elif kind == "attack":
+                target = self._position(command["target"])
+                stop_at = ATTACK_RANGE
+            else:
+                continue
+            if target is None:
+                ship["command"] = None
+                continue
+
+            x, y = ship["position"]
+            dist = math.hypot(target[0] - x, target[1] - y)
+            step = min(SHIP_CLASSES[ship["shipClass"]]["speed"], max(0, dist - stop_at))
+            if step >= dist:
+                ship["position"] = list(target)
+                if kind == "move":
+                    ship["command"] = None
+            elif step > 0:
+                ship["position"] = [x + (target[0] - x) * step / dist, y + (target[1] - y) * step / dist]
+
+    def _attacks(self):
+        damage = {}
+        attackers = {}
+        for ship_id, ship in self.ships.items():
+            command = ship["command"]
+            if command is None or command["type"] != "attack":
+                continue
+            target = self.ships.get(command["target"])
+            if target is None:
+                ship["command"] = None
+                continue
+            if distance(ship["position"], target["position"]) <= ATTACK_RANGE:
+                damage[command["target"]] = damage.get(command["target"], 0) + SHIP_CLASSES[ship["shipClass"]]["damage"]
+                attackers.setdefault(command["target"], []).append(ship_id)
+
+        for target_id, hit in damage.items():
+            target = self.ships[target_id]
+            target["life"] -= hit
+            killed = target["life"] <= 0
+            for attacker_id in attackers[target_id]:
+                self.combat_reports.append({"tick": self.tick, "attacker": attacker_id, "defender": target_id,
+                                            "killed": killed})
+            if killed:
+                self.wrecks[target_id] = {"shipClass": target["shipClass"], "name": target["name"],
+                                          "player": target["player"], "killTick": self.tick,
+                                          "position": target["position"]}
+                del self.ships[target_id]
+
+        for ship in self.ships.values():
+            ship_class = SHIP_CLASSES[ship["shipClass"]]
+            ship["life"] = min(ship_class["life"], ship["life"] + ship_class["regen"])
+        for wreck_id in [wreck_id for wreck_id, wreck in self.wrecks.items() if self.tick - wreck["killTick"] >= WRECK_TICKS]:
+            del self.wrecks[wreck_id]
+
+    def _trades(self):
+        for ship_id, ship in self.ships.items():
+            command = ship["command"]
+            if command is None or command["type"] != "trade":
+                continue
+            planet_id = command["target"]
+            planet = self.planets[planet_id]
+            if ship["position"] != planet["position"]:
+                continue
+            ship["command"] = None
+            resource_id = command["resource"]
+            offer = planet["resources"][resource_id]
+            player_id = ship["player"]
+            held = ship["resources"].get(resource_id, {}).get("amount", 0)
+            "buyPrice is what the ship pays, sellPrice what it gets"
+            if command["amount"] > 0:
+                if not offer["buyPrice"]:
+                    continue
+                free = SHIP_CLASSES[ship["shipClass"]]["cargoCapacity"] - sum(r["amount"] for r in ship["resources"].values())
+                amount = min(command["amount"], offer["amount"], free, self.money[player_id] // offer["buyPrice"])
+                if amount <= 0:
+                    continue
+                self.money[player_id] -= amount * offer["buyPrice"]
+                offer["amount"] -= amount
+                ship["resources"][resource_id] = {"amount": held + amount}
+                self.trade_reports.append({"tick": self.tick, "buyer": ship_id, "seller": planet_id,
+                                           "resource": resource_id, "amount": amount, "price": offer["buyPrice"]})
+            else:
+                if not offer["sellPrice"]:
+                    continue
+                amount = min(-command["amount"], held)
+                if amount <= 0:
+                    continue
+                self.money[player_id] += amount * offer["sellPrice"]
+                offer["amount"] += amount
+                if held == amount:
+                    del ship["resources"][resource_id]
+                else:
+                    ship["resources"][resource_id] = {"amount": held - amount}
+                self.trade_reports.append({"tick": self.tick, "buyer": planet_id, "seller": ship_id,
+                                           "resource": resource_id, "amount": amount, "price": offer["sellPrice"]})
+
+    def _update_prices(self):
+        for (planet_id, resource_id), base in self.base_prices.items():
+            offer = self.planets[planet_id]["resources"][resource_id]
+            price = max(1, int(base * 2 * REFERENCE_STOCK / (REFERENCE_STOCK + offer["amount"])))
+            if self.producers[planet_id, resource_id]:
+                offer["amount"] = min(4 * REFERENCE_STOCK, offer["amount"] + PRODUCTION)
+                offer["buyPrice"] = price
+            else:
+                offer["amount"] = max(0, offer["amount"] - PRODUCTION)
+                offer["sellPrice"] = price
+
+    def _update_net_worth(self):
+        values = {player_id: [0, 0] for player_id in self.players}
+        sell_prices = {}
+        for (planet_id, resource_id), producer in self.producers.items():
+            if not producer:
+                price = self.planets[planet_id]["resources"][resource_id]["sellPrice"] or 0
+                sell_prices[resource_id] = max(sell_prices.get(resource_id, 0), price)
+        for ship in self.ships.values():
+            value = values.get(ship["player"])
+            if value is None:
+                continue
+            value[0] += SHIP_CLASSES[ship["shipClass"]]["price"]
+            for resource_id, resource in ship["resources"].items():
+                value[1] += resource["amount"] * sell_prices.get(resource_id, 0)
+        for player_id, (ships, resources) in values.items():
+            money = self.money[player_id]
+            self.players[player_id]["netWorth"] = {"money": money, "resources": resources, "ships": ships,
+                                                   "total": money + resources + ships}
+
+    def _npc_commands(self):
+        producers = [key for key, producer in self.producers.items() if producer]
+        consumers = {}
+        for (planet_id, resource_id), producer in self.producers.items():
+            if not producer:
+                consumers.setdefault(resource_id, []).append(planet_id)
+        npc_ids = set(self.npc_ids)
+        ship_ids = list(self.ships.keys())
+        for ship_id, ship in self.ships.items():
+            if ship["command"] is not None or ship["player"] not in npc_ids:
+                continue
+            ship_class = SHIP_CLASSES[ship["shipClass"]]
+            if ship_class["cargoCapacity"]:
+                if ship["resources"]:
+                    resource_id = next(iter(ship["resources"]))
+                    planets = consumers.get(resource_id)
+                    if not planets:
+                        ship["resources"].clear()
+                        continue
+                    planet_id = min(planets, key=lambda p: distance(self.planets[p]["position"], ship["position"]))
+                    ship["command"] = {"type": "trade", "target": planet_id, "resource": resource_id,
+                                       "amount": -ship["resources"][resource_id]["amount"]}
+                elif producers:
+                    planet_id, resource_id = self.random.choice(producers)
+                    ship["command"] = {"type": "trade", "target": planet_id, "resource": resource_id,
+                                       "amount": ship_class["cargoCapacity"]}
+            elif ship_class["damage"] and not ship_class["shipyard"] and self.random.random() < NPC_AGGRESSION:
+                "a few random ships are enough to find someone nearby most of the time"
+                for target_id in self.random.sample(ship_ids, min(20, len(ship_ids))):
+                    target = self.ships.get(target_id)
+                    if target is not None and target["player"] != ship["player"] and \
+                            distance(target["position"], ship["position"]) <= NPC_HUNT_RADIUS:
+                        ship["command"] = {"type": "attack", "target": target_id}
+                        break
+
+
+def session_token(cookie) -> Optional[str]:
+    """
+    :param cookie: value of the Cookie header
+    """
+    for part in (cookie or "").split(";"):
+        name, _, value = part.strip().partition("=")
+        if name == "SESSION_ID":
+            return value
+    return None
+
+
+class GameRequestHandler(BaseHTTPRequestHandler):
+    game: LocalGame = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = (body if isinstance(body, str) else json.dumps(body)).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method):
+        try:
+            body = self._body() if method == "POST" else None
+        except ValueError as e:
+            self._send(400, {"message": f"bad request: {e}"})
+            return
+        self._send(*dispatch(self.game, method, self.path, session_token(self.headers.get("Cookie")), body))
+
+
+def dispatch(game: LocalGame, method, path, token, body) -> (int, object, dict):
+    """
+    Routes one API call to the game.
+
+    :param body: parsed JSON body of a POST
+    :return: status, response payload, either JSON text or something to dump, and headers
+    """
+    try:
+        if method == "POST" and path == "/login":
+            player_id, token = game.login(body["username"], body["password"])
+            return 200, {"id": player_id}, {"Set-Cookie": f"SESSION_ID={token}; Path=/"}
+        elif method == "GET" and path == "/logout":
+            game.logout(token)
+            return 200, {}, {}
+        elif method == "GET" and path == "/static-data":
+            return 200, game.static_data(), {}
+        elif method == "GET" and path == "/data":
+            return 200, game.data(token), {}
+        elif method == "GET" and path == "/current-tick":
+            return 200, game.current_tick(), {}
+        elif method == "GET" and path == "/reports":
+            return 200, game.reports(token), {}
+        elif method == "POST" and path == "/commands":
+            errors = game.commands(token, body)
+            return 400 if errors else 200, errors, {}
+        elif method == "POST" and path == "/end-turn":
+            return 200, game.end_turn(token, body["tick"], body["season"]), {}
+        return 404, {"message": f"unknown endpoint {method} {path}"}, {}
+    except PermissionError as e:
+        return 403, {"message": str(e)}, {}
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        return 400, {"message": f"bad request: {e}"}, {}
+
+
+class GameServer(ThreadingHTTPServer):
+    "the default backlog of 5 resets connections when hundreds of bots connect at the start of a season"
+    request_queue_size = 1024
+
+
+def serve(game: LocalGame, host="localhost", port=8000) -> ThreadingHTTPServer:
+    """
+    Starts the tick thread and returns the HTTP server, call `serve_forever` on it.
+    """
+    handler = type("Handler", (GameRequestHandler,), {"game": game})
+    server = GameServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=game.run, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--planets", type=int, default=30)
+    parser.add_argument("--resources", type=int, default=8)
+    parser.add_argument("--npc-players", type=int, default=4)
+    parser.add_argument("--ships", type=int, default=200, help="ships of the NPC players")
+    parser.add_argument("--tick-time", type=float, default=1.0, help="seconds per tick, 0 for lockstep with the bots")
+    parser.add_argument("--season-ticks", type=int, default=0, help="ticks per season, 0 for an endless season")
+    parser.add_argument("--min-players", type=int, default=0, help="players a season waits for before it starts")
+    args = parser.parse_args()
+
+    game = LocalGame(seed=args.seed, planets=args.planets, resources=args.resources, npc_players=args.npc_players,
+                     npc_ships=args.ships, tick_time=args.tick_time, season_ticks=args.season_ticks,
+                     min_players=args.min_players)
+    server = serve(game, args.host, args.port)
+    print(f"local server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        game.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
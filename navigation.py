@@ -0,0 +1,382 @@
+import collections
+import heapq
+import math
+from typing import Dict, List, Optional, Tuple
+
+from space_tycoon_client.models.data import Data
+
+# danger added by a ship destroyed in a cell, combat without a kill adds a fraction of it
+KILL_DANGER = 1.0
+COMBAT_DANGER = 0.2
+# ticks after which the danger of an event halves
+DANGER_HALF_LIFE = 50
+# danger below which a cell is forgotten
+MIN_DANGER = 0.01
+
+
+class DangerMap:
+    """
+    Rolling grid of how dangerous each part of the map is.
+
+    New wrecks and combat reports are added to their cell and its neighbours, old events fade with time.
+    Decay is applied lazily when a cell is touched, so both updates and queries are O(1) per cell. Cells faded
+    below MIN_DANGER are dropped whenever all of them are read, so the map only holds the recent fights.
+    """
+
+    def __init__(self, cell_size=100, half_life=DANGER_HALF_LIFE):
+        self.cell_size = cell_size
+        self.decay = 0.5 ** (1 / half_life)
+        # (cx, cy) -> [danger, tick of the danger]
+        self.cells: Dict[Tuple[int, int], list] = {}
+        self.tick = 0
+
+    def _cell(self, x, y) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def _value(self, cell, tick) -> float:
+        entry = self.cells.get(cell)
+        if entry is None:
+            return 0
+        return entry[0] * self.decay ** max(0, tick - entry[1])
+
+    def add(self, x, y, weight, tick):
+        cx, cy = self._cell(x, y)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                cell = (cx + dx, cy + dy)
+                share = weight if dx == 0 and dy == 0 else weight / 2
+                "an event reported late starts already faded"
+                self.cells[cell] = [self._value(cell, self.tick) + share * self.decay ** max(0, self.tick - tick), self.tick]
+
+    def query(self, x, y) -> float:
+        return self._value(self._cell(x, y), self.tick)
+
+    def values(self) -> List[Tuple[Tuple[int, int], float]]:
+        """
+        :return: cells with their danger, the faded ones are forgotten
+        """
+        values = []
+        for cell in list(self.cells):
+            value = self._value(cell, self.tick)
+            if value < MIN_DANGER:
+                del self.cells[cell]
+            else:
+                values.append((cell, value))
+        return values
+
+    def update(self, data: Data, tick, new_wrecks=()):
+        """
+        :param new_wrecks: wrecks which appeared since the last tick, as given by WreckIndex.update
+        """
+        self.tick = tick
+
+        for wreck in new_wrecks:
+            self.add(wreck.x, wreck.y, KILL_DANGER, wreck.kill_tick)
+
+        if data.reports is None:
+            return
+        for combat in data.reports.combat or []:
+            if combat.killed:
+                "the wreck has been counted already"
+                continue
+            ship = data.ships.get(combat.defender)
+            if ship is not None:
+                self.add(ship.position[0], ship.position[1], COMBAT_DANGER, combat.tick or tick)
+
+    def planet_danger(self, planets) -> Dict[str, float]:
+        return {planet_id: self.query(planet.position[0], planet.position[1]) for planet_id, planet in planets.items()}
+
+
+WreckEntry = collections.namedtuple("WreckEntry", ["id", "x", "y", "kill_tick", "ship_class", "player"])
+
+
+class WreckIndex:
+    """
+    Wrecks on the map, kept in a grid for nearest-wreck queries.
+
+    Only wrecks that appeared or vanished since the last tick are touched, the new ones are handed to the DangerMap
+    once. The lifetime of a wreck is learned from the ones which have disappeared, a wreck with much of it left
+    marks a fight which has just happened.
+    """
+
+    def __init__(self, cell_size=100):
+        self.cell_size = cell_size
+        self.wrecks: Dict[str, WreckEntry] = {}
+        self.cells: Dict[Tuple[int, int], set] = collections.defaultdict(set)
+        # average ticks between kill and disappearance of a wreck, None until some wreck vanished
+        self.lifetime: Optional[float] = None
+        self.vanished = 0
+        # largest |cell coordinate| ever used, bounds the ring search
+        self.extent = 0
+
+    def _cell(self, x, y) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def update(self, wrecks, tick) -> list:
+        """
+        :param wrecks: `Data.wrecks`
+        :return: entries of the wrecks which appeared since the last update
+        """
+        wrecks = wrecks or {}
+        for wreck_id in self.wrecks.keys() - wrecks.keys():
+            entry = self.wrecks.pop(wreck_id)
+            cell = self._cell(entry.x, entry.y)
+            self.cells[cell].discard(wreck_id)
+            if not self.cells[cell]:
+                del self.cells[cell]
+            age = tick - entry.kill_tick
+            self.vanished += 1
+            self.lifetime = age if self.lifetime is None else self.lifetime + (age - self.lifetime) / self.vanished
+
+        new = []
+        for wreck_id in wrecks.keys() - self.wrecks.keys():
+            wreck = wrecks[wreck_id]
+            entry = WreckEntry(id=wreck_id, x=wreck.position[0], y=wreck.position[1],
+                               kill_tick=wreck.kill_tick if wreck.kill_tick is not None else tick,
+                               ship_class=wreck.ship_class, player=wreck.player)
+            self.wrecks[wreck_id] = entry
+            cell = self._cell(entry.x, entry.y)
+            self.cells[cell].add(wreck_id)
+            self.extent = max(self.extent, abs(cell[0]), abs(cell[1]))
+            new.append(entry)
+
+        return new
+
+    def expires_in(self, wreck_id, tick) -> Optional[float]:
+        """
+        :return: ticks the wreck is expected to stay, None while no lifetime is known or for an unknown wreck
+        """
+        if self.lifetime is None or wreck_id not in self.wrecks:
+            return None
+        return self.lifetime - (tick - self.wrecks[wreck_id].kill_tick)
+
+    def nearest(self, x, y, max_dist=None) -> Optional[Tuple[WreckEntry, float]]:
+        """
+        Searches rings of cells around the point until no closer wreck is possible.
+
+        :return: wreck and its distance, None if there is none within `max_dist`
+        """
+        if not self.wrecks:
+            return None
+        cx, cy = self._cell(x, y)
+        max_ring = max(abs(cx), abs(cy)) + self.extent
+        if max_dist is not None:
+            max_ring = min(max_ring, int(max_dist // self.cell_size) + 1)
+        best = None
+        ring = 0
+        while True:
+            for cell in self._ring(cx, cy, ring):
+                for wreck_id in self.cells.get(cell, ()):
+                    entry = self.wrecks[wreck_id]
+                    dist = math.hypot(entry.x - x, entry.y - y)
+                    if best is None or dist < best[1]:
+                        best = (entry, dist)
+            "every wreck further out is at least ring cells away"
+            if best is not None and best[1] <= ring * self.cell_size:
+                break
+            if ring >= max_ring:
+                break
+            ring += 1
+
+        if best is None or (max_dist is not None and best[1] > max_dist):
+            return None
+        return best
+
+    @staticmethod
+    def _ring(cx, cy, ring):
+        if ring == 0:
+            yield cx, cy
+            return
+        for dx in range(-ring, ring + 1):
+            yield cx + dx, cy - ring
+            yield cx + dx, cy + ring
+        for dy in range(-ring + 1, ring):
+            yield cx - ring, cy + dy
+            yield cx + ring, cy + dy
+
+
+    def freshness(self, wreck_id, tick) -> float:
+        """
+        :return: share of its lifetime the wreck has left, 1 while no lifetime is known
+        """
+        left = self.expires_in(wreck_id, tick)
+        if left is None:
+            return 1.0 if wreck_id in self.wrecks else 0.0
+        return min(1.0, max(0.0, left / self.lifetime)) if self.lifetime > 0 else 0.0
+
+
+# extra cost of a cell per unit of danger and per enemy combat ship in it
+DANGER_COST = 5
+ENEMY_COST = 3
+# extra cost of a cell with a fresh wreck, scaled by the share of its lifetime left
+WRECK_COST = 3
+# an enemy combat ship this close to a fresh wreck is taken to be the one who made it and costs twice
+HUNTER_RADIUS = 100
+# cost change of a cell which invalidates the paths through it
+COST_TOLERANCE = 0.5
+# a path is followed only when it is this much cheaper than the straight line
+DETOUR_GAIN = 0.8
+MAX_PATHS = 5000
+
+# waypoint cells, cost of the path, cost of the straight line and the cells around the path
+CachedPath = collections.namedtuple("CachedPath", ["waypoints", "cost", "straight", "corridor"])
+
+
+class Navigator:
+    """
+    Safe paths for shippers on a coarse grid.
+
+    Each cell costs its length plus the danger of the DangerMap, fresh wrecks and known enemy combat ships in it,
+    enemies next to a fresh wreck count twice. Paths are found
+    with A* and cached as waypoints with the cells of their corridor. When the cost of a cell changes, only the paths
+    whose corridor contains it are dropped, so most ships reuse their path from the previous tick.
+    """
+
+    def __init__(self, danger: DangerMap, margin=5):
+        self.danger = danger
+        self.cell_size = danger.cell_size
+        self.margin = margin
+        # cell -> extra cost, only cells with some cost are kept
+        self.costs: Dict[Tuple[int, int], float] = {}
+        # (start cell, goal cell) -> path
+        self.paths: Dict[Tuple, CachedPath] = {}
+        # cell -> keys of the paths going through it
+        self.corridors: Dict[Tuple[int, int], set] = collections.defaultdict(set)
+
+    def _cell(self, x, y) -> Tuple[int, int]:
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def _center(self, cell) -> Tuple[float, float]:
+        return (cell[0] + 0.5) * self.cell_size, (cell[1] + 0.5) * self.cell_size
+
+    def update(self, enemy_ships, wrecks: Optional[WreckIndex] = None, tick=0):
+        """
+        :param enemy_ships: enemy combat ships
+        :param wrecks: wrecks on the map, their cells and the enemies next to them cost more while they are fresh
+        """
+        costs = collections.defaultdict(float)
+        for cell, value in self.danger.values():
+            costs[cell] += DANGER_COST * value
+        if wrecks is not None:
+            for wreck in wrecks.wrecks.values():
+                costs[self._cell(wreck.x, wreck.y)] += WRECK_COST * wrecks.freshness(wreck.id, tick)
+        for ship in enemy_ships.values():
+            x, y = ship.position[0], ship.position[1]
+            cost = ENEMY_COST
+            found = wrecks.nearest(x, y, max_dist=HUNTER_RADIUS) if wrecks is not None else None
+            if found is not None:
+                cost += ENEMY_COST * wrecks.freshness(found[0].id, tick)
+            costs[self._cell(x, y)] += cost
+
+        changed = [cell for cell in costs.keys() | self.costs.keys()
+                   if abs(costs.get(cell, 0) - self.costs.get(cell, 0)) > COST_TOLERANCE]
+        self.costs = dict(costs)
+        for cell in changed:
+            for key in self.corridors.pop(cell, ()):
+                self._drop(key)
+
+    def _drop(self, key):
+        path = self.paths.pop(key, None)
+        if path is None:
+            return
+        for cell in path.corridor:
+            keys = self.corridors.get(cell)
+            if keys is not None:
+                keys.discard(key)
+
+    def cost(self, cell) -> float:
+        return 1 + self.costs.get(cell, 0)
+
+    def path(self, x1, y1, x2, y2) -> Tuple[list, float, float]:
+        """
+        :return: waypoints ending with the goal, cost of the path and cost of the straight line, both in cells
+        """
+        start, goal = self._cell(x1, y1), self._cell(x2, y2)
+        key = (start, goal)
+        if key not in self.paths:
+            if len(self.paths) > MAX_PATHS:
+                self.paths.clear()
+                self.corridors.clear()
+            cells, cost = self._astar(start, goal)
+            straight = self._line_cost(start, goal)
+            if not cells:
+                cost = straight
+            corridor = {(cx + dx, cy + dy) for cx, cy in cells for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+            self.paths[key] = CachedPath(self._waypoints(cells), cost, straight, corridor)
+            for cell in corridor:
+                self.corridors[cell].add(key)
+
+        path = self.paths[key]
+        return [self._center(cell) for cell in path.waypoints[:-1]] + [(x2, y2)], path.cost, path.straight
+
+    def next_waypoint(self, x1, y1, x2, y2) -> Optional[Tuple[float, float]]:
+        """
+        :return: first turn of the safe path, None when flying straight is good enough
+        """
+        waypoints, cost, straight = self.path(x1, y1, x2, y2)
+        if len(waypoints) < 2 or cost > straight * DETOUR_GAIN:
+            return None
+        return waypoints[0]
+
+    def _line_cost(self, start, goal) -> float:
+        steps = max(abs(goal[0] - start[0]), abs(goal[1] - start[1]))
+        if steps == 0:
+            return 0
+        length = math.hypot(goal[0] - start[0], goal[1] - start[1])
+        total = 0
+        for i in range(1, steps + 1):
+            cell = (round(start[0] + (goal[0] - start[0]) * i / steps), round(start[1] + (goal[1] - start[1]) * i / steps))
+            total += self.cost(cell)
+        return total * length / steps
+
+    def _astar(self, start, goal) -> Tuple[list, float]:
+        """
+        :return: cells from start to goal and the cost of the path, diagonal steps weigh their length
+        """
+        min_x, max_x = min(start[0], goal[0]) - self.margin, max(start[0], goal[0]) + self.margin
+        min_y, max_y = min(start[1], goal[1]) - self.margin, max(start[1], goal[1]) + self.margin
+
+        def h(cell):
+            return math.hypot(goal[0] - cell[0], goal[1] - cell[1])
+
+        came_from = {start: None}
+        best = {start: 0}
+        heap = [(h(start), 0, start)]
+        while heap:
+            _, g, cell = heapq.heappop(heap)
+            if cell == goal:
+                break
+            if g > best[cell]:
+                continue
+            for dx, dy in NEIGHBOURS:
+                nxt = (cell[0] + dx, cell[1] + dy)
+                if not (min_x <= nxt[0] <= max_x and min_y <= nxt[1] <= max_y):
+                    continue
+                ng = g + self.cost(nxt) * (1.4142135623730951 if dx and dy else 1)
+                if ng < best.get(nxt, float("inf")):
+                    best[nxt] = ng
+                    came_from[nxt] = cell
+                    heapq.heappush(heap, (ng + h(nxt), ng, nxt))
+
+        if goal not in came_from:
+            return [], 0
+        cells = [goal]
+        while cells[-1] != start:
+            cells.append(came_from[cells[-1]])
+        cells.reverse()
+        return cells, best[goal]
+
+    @staticmethod
+    def _waypoints(cells) -> list:
+        "keep only the cells where the path turns"
+        if len(cells) <= 2:
+            return cells[1:]
+        waypoints = []
+        for prev, cell, nxt in zip(cells, cells[1:], cells[2:]):
+            if (cell[0] - prev[0], cell[1] - prev[1]) != (nxt[0] - cell[0], nxt[1] - cell[1]):
+                waypoints.append(cell)
+        waypoints.append(cells[-1])
+        return waypoints
+
+
+NEIGHBOURS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
@@ -0,0 +1,246 @@
+import collections
+import math
+from typing import Dict, List, Optional, Tuple
+
+from space_tycoon_client.models.data import Data
+from space_tycoon_client.models.static_data import StaticData
+
+from world import WorldState
+
+# weight of an enemy combat ship in range which does not attack the ship yet
+THREAT_WEIGHT = 0.5
+# cargo is worth this part of the best price it sells for anywhere
+LIQUIDATION = 0.8
+
+# positions after each tick of the horizon and the tick the ship gets where its command takes it
+Path = collections.namedtuple("Path", ["positions", "arrival"])
+
+
+class CommandEvaluator:
+    """
+    Ranks alternative command sets by their gain over the plan in the next few ticks, with a forward model
+    of movement, trade and combat.
+
+    Ships fly straight at their class speed, trades happen on arrival, attacks hit within `attack_range`
+    and enemies keep their current commands. A plan is worth the value won in trades and damage dealt
+    minus the value of the damage our ships are expected to take, damage is valued at the repair price of life
+    and a kill at the price of the ship.
+
+    The snapshot is never copied. `prepare` plans the ships under the commands of this tick once, a candidate
+    replans only the ships it commands differently and sums up how their contributions change, so ranking tens
+    of candidates costs little more than scoring one. Every candidate books the stock its trades buy on a fork
+    of the WorldState, so two of its ships never count on the same units and the next candidate starts clean.
+    """
+
+    def __init__(self, static_data: StaticData, attack_range, horizon=3):
+        self.ship_classes = static_data.ship_classes
+        self.attack_range = attack_range
+        self.horizon = horizon
+        self.data: Optional[Data] = None
+        self.world: Optional[WorldState] = None
+        self.player_id = None
+        self.commands = {}
+        self.paths: Dict[str, Path] = {}
+        # per tick of the horizon, grid cell -> (x, y, damage, ship_id) of enemy combat ships
+        self.enemy_grid: List[Dict[Tuple[int, int], list]] = []
+        # our ship_id -> enemy ships with an attack command on it
+        self.attacked_by: Dict[str, set] = collections.defaultdict(set)
+        # resource_id -> best price a planet pays for it
+        self.best_sell: Dict[str, float] = {}
+        # our ship_id -> value of its trade and risk under the base commands, filled as candidates need them
+        self.base_values: Dict[str, float] = {}
+        # our ship_id -> (target_id, damage) it deals under the base commands
+        self.base_hits: Dict[str, Tuple[str, int]] = {}
+        # enemy ship_id -> damage all our ships deal to it
+        self.base_damage: Dict[str, int] = collections.defaultdict(int)
+
+    def prepare(self, data: Data, player_id, commands):
+        """
+        :param commands: commands of this tick, the other ships keep following the ones they have
+        """
+        self.data = data
+        self.world = WorldState(data)
+        self.player_id = player_id
+        self.commands = commands
+        self.paths = {}
+        self.base_values = {}
+
+        self.best_sell = {}
+        for planet in data.planets.values():
+            for resource_id, resource in planet.resources.items():
+                if resource.sell_price and resource.sell_price > self.best_sell.get(resource_id, 0):
+                    self.best_sell[resource_id] = resource.sell_price
+
+        self.enemy_grid = [collections.defaultdict(list) for _ in range(self.horizon)]
+        self.attacked_by = collections.defaultdict(set)
+        self.base_hits = {}
+        self.base_damage = collections.defaultdict(int)
+        for ship_id, ship in data.ships.items():
+            command = commands.get(ship_id, ship.command)
+            if ship.player == player_id:
+                hit = self._hit(ship, command, self._base_path(ship_id)) if getattr(command, "type", None) == "attack" else None
+                if hit is not None:
+                    self.base_hits[ship_id] = hit
+                    self.base_damage[hit[0]] += hit[1]
+                continue
+            damage = self.ship_classes[ship.ship_class].damage or 0
+            if not damage:
+                continue
+            for t, (x, y) in enumerate(self._base_path(ship_id).positions):
+                self.enemy_grid[t][self._cell(x, y)].append((x, y, damage, ship_id))
+            if command is not None and command.type == "attack":
+                self.attacked_by[command.target].add(ship_id)
+
+    def evaluate(self, candidates: List[Dict[str, object]]) -> List[float]:
+        """
+        :param candidates: ship_id -> command replacing the one of the plan given to `prepare`
+        :return: gain of every candidate over the plan
+        """
+        return [self.gain(candidate) for candidate in candidates]
+
+    def gain(self, overrides: Dict[str, object]) -> float:
+        gain = 0.0
+        # target_id -> damage dealt to it under this candidate, only for the targets the candidate changes
+        damage = {}
+        branch = self.world.fork()
+        for ship_id, command in overrides.items():
+            ship = self.data.ships.get(ship_id)
+            if ship is None or ship.player != self.player_id:
+                continue
+            path = self._path(ship, command)
+            gain += self._value(ship_id, ship, command, path, branch) - self._base_value(ship_id)
+            old = self.base_hits.get(ship_id)
+            if old is not None:
+                damage[old[0]] = damage.get(old[0], self.base_damage[old[0]]) - old[1]
+            new = self._hit(ship, command, path)
+            if new is not None:
+                damage[new[0]] = damage.get(new[0], self.base_damage.get(new[0], 0)) + new[1]
+
+        for target_id, dealt in damage.items():
+            gain += self._damage_value(target_id, dealt) - self._damage_value(target_id, self.base_damage.get(target_id, 0))
+        return gain
+
+    def _base_path(self, ship_id) -> Path:
+        """
+        Ships are planned on first use, most of them never are.
+        """
+        path = self.paths.get(ship_id)
+        if path is None:
+            ship = self.data.ships[ship_id]
+            "ships chasing each other see the other one standing still"
+            self.paths[ship_id] = Path([(ship.position[0], ship.position[1])] * self.horizon, None)
+            path = self.paths[ship_id] = self._path(ship, self.commands.get(ship_id, ship.command))
+        return path
+
+    def _base_value(self, ship_id) -> float:
+        if ship_id not in self.base_values:
+            ship = self.data.ships[ship_id]
+            self.base_values[ship_id] = self._value(ship_id, ship, self.commands.get(ship_id, ship.command),
+                                                    self._base_path(ship_id), self.world.fork())
+        return self.base_values[ship_id]
+
+    def _cell(self, x, y) -> Tuple[int, int]:
+        return int(x // self.attack_range), int(y // self.attack_range)
+
+    def _target_position(self, target, t) -> Optional[list]:
+        if target in self.data.planets:
+            return self.data.planets[target].position
+        if target in self.data.ships:
+            return self._base_path(target).positions[t] if t >= 0 else self.data.ships[target].position
+        return None
+
+    def _path(self, ship, command) -> Path:
+        x, y = ship.position[0], ship.position[1]
+        kind = getattr(command, "type", None)
+        if kind not in ("move", "trade", "attack"):
+            return Path([(x, y)] * self.horizon, None)
+
+        speed = self.ship_classes[ship.ship_class].speed or 0
+        stop_at = self.attack_range if kind == "attack" else 0
+        positions = []
+        arrival = None
+        for t in range(self.horizon):
+            if kind == "move":
+                destination = command.destination
+                target = destination.coordinates if destination.coordinates is not None else \
+                    self._target_position(destination.target, t - 1)
+            else:
+                "chase where the target was at the end of the previous tick"
+                target = self._target_position(command.target, t - 1)
+            if target is None:
+                positions.append((x, y))
+                continue
+            dist = math.hypot(target[0] - x, target[1] - y)
+            step = min(speed, max(0, dist - stop_at))
+            if step >= dist:
+                x, y = target[0], target[1]
+            elif step > 0:
+                x, y = x + (target[0] - x) * step / dist, y + (target[1] - y) * step / dist
+            if arrival is None and math.hypot(target[0] - x, target[1] - y) <= stop_at:
+                arrival = t
+            positions.append((x, y))
+        return Path(positions, arrival)
+
+    def _value(self, ship_id, ship, command, path: Path, world: WorldState) -> float:
+        return self._trade_value(ship, command, path, world) - self._risk(ship_id, ship, path)
+
+    def _trade_value(self, ship, command, path: Path, world: WorldState) -> float:
+        """
+        :param world: branch the stock bought is taken from
+        """
+        if getattr(command, "type", None) != "trade" or path.arrival is None:
+            return 0
+        planet = world.planets.get(command.target)
+        if planet is None or command.resource not in planet.resources:
+            return 0
+        offer = planet.resources[command.resource]
+        worth = LIQUIDATION * self.best_sell.get(command.resource, 0)
+        held = (ship.resources or {}).get(command.resource, {}).get("amount", 0)
+        if command.amount > 0:
+            if not offer.buy_price:
+                return 0
+            free = (self.ship_classes[ship.ship_class].cargo_capacity or 0) - sum(
+                resource["amount"] for resource in (ship.resources or {}).values())
+            amount = max(0, min(command.amount, offer.amount or 0, free))
+            resources = dict(planet.resources)
+            resources[command.resource] = offer._replace(amount=(offer.amount or 0) - amount)
+            world.update("planets", command.target, resources=resources)
+            return amount * (worth - offer.buy_price)
+        if not offer.sell_price:
+            return 0
+        return min(-command.amount, held) * (offer.sell_price - worth)
+
+    def _risk(self, ship_id, ship, path: Path) -> float:
+        attackers = self.attacked_by.get(ship_id, ())
+        expected = 0.0
+        for t, (x, y) in enumerate(path.positions):
+            cx, cy = self._cell(x, y)
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for ex, ey, damage, enemy_id in self.enemy_grid[t].get((cx + dx, cy + dy), ()):
+                        if math.hypot(ex - x, ey - y) <= self.attack_range:
+                            expected += damage * (1 if enemy_id in attackers else THREAT_WEIGHT)
+        return self._ship_damage_value(ship, expected)
+
+    def _hit(self, ship, command, path: Path) -> Optional[Tuple[str, int]]:
+        if getattr(command, "type", None) != "attack" or command.target not in self.data.ships:
+            return None
+        target = self.data.ships[command.target]
+        if target.player == self.player_id:
+            return None
+        damage = self.ship_classes[ship.ship_class].damage or 0
+        target_path = self._base_path(command.target).positions
+        hits = sum(1 for t, (x, y) in enumerate(path.positions)
+                   if math.hypot(target_path[t][0] - x, target_path[t][1] - y) <= self.attack_range)
+        return (command.target, damage * hits) if hits else None
+
+    def _damage_value(self, ship_id, damage) -> float:
+        ship = self.data.ships.get(ship_id)
+        return self._ship_damage_value(ship, damage) if ship is not None else 0
+
+    def _ship_damage_value(self, ship, damage) -> float:
+        ship_class = self.ship_classes[ship.ship_class]
+        value = min(damage, ship.life) * (ship_class.repair_price or 0) / max(ship_class.repair_life or 1, 1)
+        if damage >= ship.life:
+            value += ship_class.price or 0
+        return value
@@ -0,0 +1,136 @@
+import collections
+from typing import Dict, Optional
+
+from space_tycoon_client.models.data import Data
+from space_tycoon_client.models.static_data import StaticData
+
+# weight of the current tick in the rolling statistics
+PROFILE_SMOOTHING = 0.05
+# a player seen this long without ever attacking anybody is left alone
+PEACE_TICKS = 100
+
+
+class PlayerProfile:
+    __slots__ = ("aggression", "hostility", "strength", "trade", "score", "ships", "attacks", "first_seen")
+
+    def __init__(self, tick):
+        # rolling attacks per tick on anybody and on us
+        self.aggression = 0.0
+        self.hostility = 0.0
+        # sum of damage times life of the combat ships
+        self.strength = 0
+        # rolling traded money per tick
+        self.trade = 0.0
+        self.score = 0
+        # ship_class -> count
+        self.ships = collections.Counter()
+        self.attacks = 0
+        self.first_seen = tick
+
+
+class PlayerProfiles:
+    """
+    Rolling statistics about the other players, built from combat and trade reports, season scores and their fleets.
+
+    Every lookup is a dict access, so strategy code can ask per ship.
+    """
+
+    def __init__(self, static_data: StaticData, player_id, smoothing=PROFILE_SMOOTHING, allies=()):
+        """
+        :param allies: players never attacked, known before any of them has been observed
+        """
+        self.ship_classes = static_data.ship_classes
+        self.player_id = player_id
+        self.smoothing = smoothing
+        self.allies = set(allies)
+        self.profiles: Dict[str, PlayerProfile] = {}
+        # ship_id -> player, kept for ships which died since
+        self.owners: Dict[str, str] = {}
+
+    def get(self, player) -> Optional[PlayerProfile]:
+        return self.profiles.get(player)
+
+    def update(self, data: Data, tick):
+        for player in data.players:
+            if player != self.player_id and player not in self.profiles:
+                self.profiles[player] = PlayerProfile(tick)
+
+        for profile in self.profiles.values():
+            profile.ships.clear()
+            profile.strength = 0
+        for ship_id, ship in data.ships.items():
+            self.owners[ship_id] = ship.player
+            profile = self.profiles.get(ship.player)
+            if profile is None:
+                continue
+            profile.ships[ship.ship_class] += 1
+            ship_class = self.ship_classes.get(ship.ship_class)
+            if ship_class is not None:
+                profile.strength += (ship_class.damage or 0) * ship.life
+
+        attacks = collections.Counter()
+        hostile = collections.Counter()
+        traded = collections.Counter()
+        if data.reports is not None:
+            for combat in data.reports.combat or []:
+                attacker = self.owners.get(combat.attacker)
+                attacks[attacker] += 1
+                if self.owners.get(combat.defender) == self.player_id:
+                    hostile[attacker] += 1
+            for trade in data.reports.trade or []:
+                for ship_id in (trade.buyer, trade.seller):
+                    traded[self.owners.get(ship_id)] += (trade.amount or 0) * (trade.price or 0)
+
+        rate = self.smoothing
+        for player, profile in self.profiles.items():
+            profile.attacks += attacks[player]
+            profile.aggression += rate * (attacks[player] - profile.aggression)
+            profile.hostility += rate * (hostile[player] - profile.hostility)
+            profile.trade += rate * (traded[player] - profile.trade)
+
+        "owners of ships which are long gone are not needed"
+        if len(self.owners) > 2 * len(data.ships) + 1000:
+            self.owners = {ship_id: ship.player for ship_id, ship in data.ships.items()}
+
+    def update_scores(self, season_scores, season=None):
+        """
+        :param season_scores: `Reports.season_scores`, season -> player -> score
+        :param season: season the scores are taken from, the latest one when not given
+        """
+        if not season_scores:
+            return
+        key = str(season) if season is not None else max(season_scores, key=int)
+        for player, score in season_scores.get(key, {}).items():
+            if player in self.profiles:
+                self.profiles[player].score = score
+
+    def peaceful(self, tick) -> set:
+        """
+        The allies and the players which have been around for PEACE_TICKS and have never attacked anybody.
+        Profiles start over with every login, the allies are left alone from the first tick.
+        """
+        return self.allies | {
+            player for player, profile in self.profiles.items()
+            if profile.attacks == 0 and tick - profile.first_seen >= PEACE_TICKS
+        }
+
+    def radius(self, player, base) -> float:
+        """
+        Defensive radius against the player, wider for the ones attacking us, narrower for traders.
+        """
+        profile = self.profiles.get(player)
+        if profile is None:
+            return base
+        return base * min(2.0, max(0.5, 1 + profile.hostility * 5 - (0.5 if profile.attacks == 0 else 0)))
+
+    def weight(self, player) -> float:
+        profile = self.profiles.get(player)
+        if profile is None:
+            return 1
+        return 1 + profile.hostility * 5
+
+    def most_aggressive(self) -> Optional[str]:
+        players = [player for player in self.profiles if player not in self.allies]
+        if not players:
+            return None
+        return max(players, key=lambda player: (self.profiles[player].hostility, self.profiles[player].aggression))
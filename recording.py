@@ -0,0 +1,232 @@
+"""
+Record and replay of server sessions.
+
+RecordingApiClient writes every request and the raw response body with its timing to a gzipped JSON lines log,
+ReplayApiClient feeds the logged responses back without any network. Replaying a log runs `Game` on real
+production snapshots at full speed, so game_logic and deserialization can be benchmarked deterministically.
+
+    python recording.py session.jsonl.gz
+
+Recording is switched on by `record: session.jsonl.gz` in the bot config.
+"""
+import argparse
+import collections
+import contextlib
+import gzip
+import io
+import json
+import os
+import statistics
+import time
+from typing import Deque, Dict, Iterator, Tuple
+
+from space_tycoon_client import ApiClient
+from space_tycoon_client.rest import ApiException
+
+# request fields never written to a log
+REDACTED_FIELDS = ("password",)
+# session cookie of every replayed login, logs keep no cookies
+REPLAY_COOKIE = "SESSION_ID=replay"
+# endpoints whose log marks the end of a replayed session once exhausted, the others repeat their last response
+SESSION_ENDPOINTS = {("GET", "/data"), ("POST", "/end-turn")}
+
+
+def _path(configuration, url) -> str:
+    return url[len(configuration.host):] if url.startswith(configuration.host) else url
+
+
+def _redact(body):
+    if isinstance(body, dict) and any(field in body for field in REDACTED_FIELDS):
+        return {key: "<redacted>" if key in REDACTED_FIELDS else value for key, value in body.items()}
+    return body
+
+
+def read_log(path) -> Iterator[dict]:
+    """
+    Records of a log in order. A log of a bot killed before `close` has no gzip trailer and may end in the middle
+    of a record, it is read up to its last complete record.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as log:
+        try:
+            for line in log:
+                if not line.endswith("\n"):
+                    return
+                yield json.loads(line)
+        except EOFError:
+            return
+
+
+class RecordingApiClient(ApiClient):
+    """
+    ApiClient which logs every call, one JSON object per line:
+    method, path, request body, status, response body, start in ms since the first call and duration in ms.
+    Passwords are redacted and no headers are kept, so a log holds no credentials or session cookies.
+    """
+
+    def __init__(self, path, configuration=None, cookie=None, compresslevel=1):
+        super().__init__(configuration=configuration, cookie=cookie)
+        "a low compression level keeps recording cheap, the bodies are very repetitive anyway"
+        self.log = gzip.open(path, "wt", encoding="utf-8", compresslevel=compresslevel)
+        self.started = time.perf_counter()
+
+    def request(self, method, url, query_params=None, headers=None, post_params=None, body=None,
+                _preload_content=True, _request_timeout=None):
+        started = time.perf_counter()
+        try:
+            response = super().request(method, url, query_params=query_params, headers=headers,
+                                       post_params=post_params, body=body, _preload_content=_preload_content,
+                                       _request_timeout=_request_timeout)
+        except ApiException as e:
+            self._write(method, url, body, e.status, e.reason, e.body, started)
+            raise
+        self._write(method, url, body, response.status, response.reason, response.data, started)
+        return response
+
+    def _write(self, method, url, body, status, reason, data, started):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        self.log.write(json.dumps({
+            "method": method, "path": _path(self.configuration, url), "request": _redact(body), "status": status,
+            "reason": reason, "response": data, "headers": {},
+            "at": round((started - self.started) * 1000, 3), "ms": round((time.perf_counter() - started) * 1000, 3),
+        }, separators=(",", ":")))
+        self.log.write("\n")
+        if url.endswith("/end-turn"):
+            self.log.flush()
+
+    def close(self):
+        self.log.close()
+
+
+class RecordedResponse(io.IOBase):
+    """
+    Stands in for RESTResponse.
+    """
+
+    def __init__(self, record):
+        self.status = record["status"]
+        self.reason = record["reason"]
+        self.data = (record["response"] or "").encode("utf-8")
+        self.headers = record.get("headers") or {}
+
+    def getheaders(self):
+        return self.headers
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class ReplayApiClient(ApiClient):
+    """
+    ApiClient answering from a recorded log instead of the server.
+
+    Responses are queued per endpoint, so a bot asking for /reports more or less often than the recorded one still
+    gets the /data of the right tick. Once /data or /end-turn runs out, every call fails with 403, the way a season
+    ends on the real server. Any credentials log in, with REPLAY_COOKIE as the session.
+    """
+
+    def __init__(self, path, configuration=None, cookie=None):
+        super().__init__(configuration=configuration, cookie=cookie)
+        self.responses: Dict[Tuple[str, str], Deque[dict]] = collections.defaultdict(collections.deque)
+        self.last: Dict[Tuple[str, str], dict] = {}
+        # requests the bot made, method, path and body, to compare decisions of two bot versions
+        self.requests = []
+        self.finished = False
+        for record in read_log(path):
+            self.responses[record["method"], record["path"]].append(record)
+
+    def ticks(self) -> int:
+        return len(self.responses["GET", "/data"])
+
+    def request(self, method, url, query_params=None, headers=None, post_params=None, body=None,
+                _preload_content=True, _request_timeout=None):
+        key = (method, _path(self.configuration, url))
+        self.requests.append((method, key[1], body))
+        queue = self.responses.get(key)
+        if queue:
+            record = self.last[key] = queue.popleft()
+        elif key in SESSION_ENDPOINTS or key not in self.last:
+            self.finished = True
+            raise ApiException(status=403, reason="replay finished")
+        else:
+            record = self.last[key]
+
+        response = RecordedResponse(record)
+        if not 200 <= response.status <= 299:
+            raise ApiException(http_resp=response)
+        if key == ("POST", "/login"):
+            response.headers = dict(response.headers, **{"Set-Cookie": REPLAY_COOKIE})
+        return response
+
+
+def replay_benchmark(path, config=None, ticks=None, quiet=True) -> Dict[str, list]:
+    """
+    Plays a recorded session through `Game` as fast as possible.
+
+    :param config: bot config, only user and password are used to log in
+    :param quiet: drop what the bot prints, printing costs more than some of the logic
+    :return: stage -> duration of every tick in seconds, `data` is the deserialization of /data
+    """
+    "bot imports this module to record, so it is imported only when replaying"
+    import bot
+    from space_tycoon_client import GameApi
+    from space_tycoon_client.models.end_turn import EndTurn
+
+    client = GameApi(api_client=ReplayApiClient(path))
+    timings = {"data": [], "game_logic": [], "tick": []}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext():
+        game = bot.Game(client, config or {"user": "replay", "password": "replay"})
+        while ticks is None or len(timings["tick"]) < ticks:
+            try:
+                started = time.perf_counter()
+                game.data = client.data_get()
+                deserialized = time.perf_counter()
+                game.game_logic()
+                done = time.perf_counter()
+                current_tick = client.end_turn_post(EndTurn(tick=game.tick, season=game.season))
+            except ApiException as e:
+                if e.status == 403:
+                    break
+                raise
+            game.tick = current_tick.tick
+            game.season = current_tick.season
+            timings["data"].append(deserialized - started)
+            timings["game_logic"].append(done - deserialized)
+            timings["tick"].append(done - started)
+
+    return timings
+
+
+def summarize(timings: Dict[str, list]) -> Dict[str, Dict[str, float]]:
+    """
+    :return: stage -> mean, median, p95 and max in milliseconds
+    """
+    summary = {}
+    for stage, durations in timings.items():
+        if not durations:
+            continue
+        ordered = sorted(durations)
+        summary[stage] = {
+            "mean": statistics.mean(ordered) * 1000,
+            "median": statistics.median(ordered) * 1000,
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            "max": ordered[-1] * 1000,
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays a recorded session through the bot and times it.")
+    parser.add_argument("log")
+    parser.add_argument("--ticks", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="keep the output of the bot")
+    args = parser.parse_args()
+
+    timings = replay_benchmark(args.log, ticks=args.ticks, quiet=not args.verbose)
+    print(f"replayed {len(timings['tick'])} ticks")
+    for stage, stats in summarize(timings).items():
+        print(f"{stage:>12}: " + "  ".join(f"{name} {value:8.2f} ms" for name, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
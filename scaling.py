@@ -0,0 +1,191 @@
+"""
+Measures how the bot scales with the size of the galaxy.
+
+    python scaling.py --sizes 10 100 1000 10000 --csv scaling.csv
+
+generates a galaxy per ship count, runs `Game.game_logic` on it and prints the median time of every stage and the
+peak memory of a tick, with the growth exponent between the smallest and the largest galaxy. The CSV holds one row
+per size and stage, the scaling curves.
+"""
+import argparse
+import contextlib
+import csv
+import gc
+import json
+import math
+import os
+import statistics
+import time
+import tracemalloc
+from typing import Dict, List
+
+from space_tycoon_client import ApiClient, Configuration, GameApi
+from space_tycoon_client.models.end_turn import EndTurn
+
+import bot
+from galaxy import generate
+from recording import RecordedResponse
+
+# methods of Game and of its planners timed by the benchmark, the times are inclusive of nested calls
+STAGES = [
+    "_get_ships", "_get_fighters", "_get_enemy_ships", "_get_our_motherships", "_update_active_defenders",
+    "hadrian_wall", "repair_fleet", "trade", "build_ships", "escort_shippers", "route_shippers",
+    "wreck_index.update", "danger.update", "profiles.update", "threats.update", "fleets.assign_intruders",
+    "navigator.update",
+]
+
+
+class GalaxyApiClient(ApiClient):
+    """
+    ApiClient serving a generated galaxy, every tick sees the same /data.
+    """
+
+    def __init__(self, static, data, configuration=None, cookie=None):
+        super().__init__(configuration=configuration, cookie=cookie)
+        self.tick = data["currentTick"]["tick"]
+        self.season = data["currentTick"]["season"]
+        self.bodies = {
+            ("POST", "/login"): json.dumps({"id": data["playerId"]}),
+            ("GET", "/static-data"): json.dumps(static),
+            ("GET", "/data"): json.dumps(data),
+            ("GET", "/reports"): json.dumps({"combat": [], "trade": [], "profiling": [], "prices": {},
+                                             "resourceAmounts": {}, "scores": {}, "seasonScores": {},
+                                             "season": self.season, "tick": self.tick}),
+            ("POST", "/commands"): "{}",
+        }
+
+    def request(self, method, url, query_params=None, headers=None, post_params=None, body=None,
+                _preload_content=True, _request_timeout=None):
+        path = url[len(self.configuration.host):]
+        if (method, path) == ("POST", "/end-turn"):
+            self.tick += 1
+            response = json.dumps({"tick": self.tick, "season": self.season, "minTimeLeftMs": 1000})
+        else:
+            response = self.bodies[method, path]
+        return RecordedResponse({"status": 200, "reason": "OK", "response": response,
+                                 "headers": {"Set-Cookie": "SESSION_ID=galaxy"}})
+
+
+class StageTimer:
+    """
+    Wraps methods of a game to sum up the time spent in each of them per tick.
+    """
+
+    def __init__(self, game, stages=STAGES):
+        self.times: Dict[str, float] = {stage: 0.0 for stage in stages}
+        for stage in stages:
+            *path, name = stage.split(".")
+            owner = game
+            for attribute in path:
+                owner = getattr(owner, attribute)
+            setattr(owner, name, self._timed(stage, getattr(owner, name)))
+
+    def _timed(self, stage, method):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.times[stage] += time.perf_counter() - started
+        return timed
+
+    def reset(self):
+        for stage in self.times:
+            self.times[stage] = 0.0
+
+
+def measure(size, ticks=5, seed=0, **galaxy) -> Dict[str, float]:
+    """
+    :param galaxy: arguments of `generate` besides the ship count
+    :return: stage -> median time per tick in ms, plus `data`, `game_logic`, `tick` and the peak memory of a tick
+             in KB as `memory_kb`
+    """
+    static, data = generate(seed=seed, ships=size, **galaxy)
+    configuration = Configuration()
+    configuration.host = "http://galaxy"
+    client = GameApi(api_client=GalaxyApiClient(static, data, configuration=configuration))
+    game = bot.Game(client, {"user": "galaxy", "password": "galaxy"})
+    timer = StageTimer(game)
+
+    samples: Dict[str, List[float]] = {stage: [] for stage in ["data", "game_logic", "tick"] + list(timer.times)}
+    "the first tick fills the caches of the planners and is not measured"
+    for tick in range(ticks + 1):
+        timer.reset()
+        started = time.perf_counter()
+        game.data = client.data_get()
+        deserialized = time.perf_counter()
+        game.game_logic()
+        done = time.perf_counter()
+        current_tick = client.end_turn_post(EndTurn(tick=game.tick, season=game.season))
+        game.tick = current_tick.tick
+        if tick == 0:
+            continue
+        samples["data"].append(deserialized - started)
+        samples["game_logic"].append(done - deserialized)
+        samples["tick"].append(done - started)
+        for stage, spent in timer.times.items():
+            samples[stage].append(spent)
+
+    result = {stage: statistics.median(values) * 1000 for stage, values in samples.items()}
+
+    tracemalloc.start()
+    game.data = client.data_get()
+    game.game_logic()
+    result["memory_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    "the thread pool of the client has to be closed before the interpreter shuts down"
+    del game, client
+    gc.collect()
+    return result
+
+
+def growth(sizes, values) -> float:
+    """
+    Slope of the log-log curve between the smallest and the largest size, 1 is linear, 2 quadratic.
+    """
+    points = [(size, value) for size, value in zip(sizes, values) if value > 0]
+    if len(points) < 2:
+        return 0.0
+    (s0, v0), (s1, v1) = points[0], points[-1]
+    return math.log(v1 / v0) / math.log(s1 / s0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures how the bot scales with the size of the galaxy.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="ship counts")
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--planets", type=int, default=30)
+    parser.add_argument("--resources", type=int, default=8)
+    parser.add_argument("--players", type=int, default=5)
+    parser.add_argument("--wrecks", type=float, default=0.1, help="wrecks per ship")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="file to write the curves to")
+    parser.add_argument("--verbose", action="store_true", help="keep the output of the bot")
+    args = parser.parse_args()
+
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull) if not args.verbose else contextlib.nullcontext():
+        for size in args.sizes:
+            results[size] = measure(size, ticks=args.ticks, seed=args.seed, planets=args.planets,
+                                    resources=args.resources, players=args.players, wrecks=int(size * args.wrecks))
+
+    stages = list(next(iter(results.values())))
+    print(f"{'stage':>26}" + "".join(f"{size:>12}" for size in args.sizes) + f"{'growth':>9}")
+    for stage in stages:
+        values = [results[size][stage] for size in args.sizes]
+        unit = "KB" if stage == "memory_kb" else "ms"
+        print(f"{stage:>26}" + "".join(f"{value:>10.2f}{unit}" for value in values)
+              + f"{growth(args.sizes, values):>9.2f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["ships", "stage", "value"])
+            for size, result in results.items():
+                for stage, value in result.items():
+                    writer.writerow([size, stage, round(value, 4)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Headless simulator playing the bot under the rules of the local server without HTTP, and a parameter sweep over it.
+
+    python simulator.py --ticks 1000 --seeds 4 --param "RADIUS=[150, 250, 350]" --param "MIN_CARGO=[2, 4, 8]"
+
+plays every combination of the parameters on every seed, spread over a process per CPU core, and prints the final
+net worth of each combination, best first. Parameters are module constants of `bot`. Opponents are the NPC players
+of the local server and, with --opponent bot_pl2, other bot versions playing in the same simulation.
+"""
+import argparse
+import contextlib
+import csv
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import statistics
+import time
+from typing import Callable, Dict, List
+
+import space_tycoon_client.models
+from space_tycoon_client import ApiClient, Configuration, GameApi
+from space_tycoon_client.rest import ApiException
+
+import bot
+from local_server import LocalGame, dispatch, session_token
+from recording import RecordedResponse
+
+
+class ModelDecoder:
+    """
+    Builds the generated models from parsed JSON without running their constructors and property setters, which
+    are most of the cost of ApiClient.deserialize. The objects are the same as the ones it gives for valid data.
+    """
+
+    def __init__(self):
+        self.decoders: Dict[str, Callable] = {}
+
+    def decode(self, data, klass: str):
+        return self.decoder(klass)(data)
+
+    def decoder(self, klass: str) -> Callable:
+        if klass not in self.decoders:
+            self.decoders[klass] = self._build(klass)
+        return self.decoders[klass]
+
+    def _build(self, klass: str) -> Callable:
+        if klass.startswith("list["):
+            item = self.decoder(klass[5:-1])
+            return lambda data: None if data is None else [item(value) for value in data]
+        if klass.startswith("dict("):
+            item = self.decoder(re.match(r"dict\(([^,]*), (.*)\)", klass).group(2))
+            return lambda data: None if data is None else {key: item(value) for key, value in data.items()}
+        if klass in ApiClient.NATIVE_TYPES_MAPPING:
+            native = ApiClient.NATIVE_TYPES_MAPPING[klass]
+            if native not in ApiClient.PRIMITIVE_TYPES:
+                return lambda data: data
+            return lambda data: None if data is None else native(data)
+
+        model = getattr(space_tycoon_client.models, klass)
+        if not model.swagger_types:
+            "free form models like Coordinates and Resources stay plain JSON, as in ApiClient"
+            return lambda data: data
+        "the fields are resolved on the first call, models may refer to each other"
+        fields = []
+
+        def decode(data):
+            if data is None:
+                return None
+            if not fields:
+                fields.extend(("_" + attr, model.attribute_map[attr], self.decoder(attr_type))
+                              for attr, attr_type in model.swagger_types.items())
+            instance = model.__new__(model)
+            state = instance.__dict__
+            for private, key, decode_field in fields:
+                value = data.get(key)
+                state[private] = None if value is None else decode_field(value)
+            state["discriminator"] = None
+            return instance
+
+        return decode
+
+
+class InProcessApiClient(ApiClient):
+    """
+    ApiClient calling a LocalGame directly. Responses still go through JSON, the models are built by ModelDecoder.
+
+    The simulation drives the ticks, /end-turn only reports the current one.
+    """
+
+    def __init__(self, game: LocalGame, configuration=None, cookie=None):
+        if configuration is None:
+            configuration = Configuration()
+            configuration.host = "http://local"
+        super().__init__(configuration=configuration, cookie=cookie)
+        self.game = game
+        self.decoder = ModelDecoder()
+
+    def deserialize(self, response, response_type):
+        return self.decoder.decode(json.loads(response.data), response_type)
+
+    def request(self, method, url, query_params=None, headers=None, post_params=None, body=None,
+                _preload_content=True, _request_timeout=None):
+        path = url[len(self.configuration.host):]
+        if (method, path) == ("POST", "/end-turn"):
+            status, payload, response_headers = 200, self.game.current_tick(), {}
+        else:
+            status, payload, response_headers = dispatch(self.game, method, path,
+                                                         session_token((headers or {}).get("Cookie")), body)
+        response = RecordedResponse({"status": status, "reason": "", "headers": response_headers,
+                                     "response": payload if isinstance(payload, str) else json.dumps(payload)})
+        if not 200 <= status <= 299:
+            raise ApiException(http_resp=response)
+        return response
+
+
+def apply(params: Dict[str, object]) -> Dict[str, object]:
+    """
+    Sets module constants of bot.
+
+    :return: the previous values
+    """
+    previous = {}
+    for name, value in params.items():
+        if not hasattr(bot, name):
+            raise ValueError(f"bot has no parameter {name}")
+        previous[name] = getattr(bot, name)
+        setattr(bot, name, value)
+    return previous
+
+
+def simulate(params=None, seed=0, ticks=1000, opponents=(), planets=30, npc_players=4, npc_ships=200,
+             quiet=True) -> dict:
+    """
+    Plays one season of `ticks` ticks.
+
+    :param params: bot module constant -> value for this run
+    :param opponents: modules with a Game class playing against us, like bot_pl2
+    :return: net worth, money and ship count of our player at the end, the net worth of every opponent
+             and of the best NPC, game logic errors and the simulation speed
+    """
+    params = params or {}
+    previous = apply(params)
+    game = LocalGame(seed=seed, planets=planets, npc_players=npc_players, npc_ships=npc_ships, tick_time=0)
+    errors = 0
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext():
+            players = [bot.Game(GameApi(InProcessApiClient(game)), {"user": "bot", "password": "simulator"})]
+            for opponent in opponents:
+                module = importlib.import_module(opponent)
+                players.append(module.Game(GameApi(InProcessApiClient(game)), {"user": opponent, "password": "simulator"}))
+
+            started = time.perf_counter()
+            for _ in range(ticks):
+                for player in players:
+                    try:
+                        player.data = player.client.data_get()
+                        player.game_logic()
+                    except Exception:
+                        "the bot survives its own errors in game_loop, so does the simulation"
+                        errors += 1
+                with game.cond:
+                    game.step()
+                for player in players:
+                    player.tick = game.tick
+                    player.season = game.season
+            elapsed = time.perf_counter() - started
+    finally:
+        apply(previous)
+
+    worth = {player.player_id: game.players[player.player_id]["netWorth"] for player in players}
+    us = players[0].player_id
+    return {
+        "params": params, "seed": seed, "ticks": ticks,
+        "net_worth": worth[us]["total"], "money": worth[us]["money"],
+        "ships": sum(1 for ship in game.ships.values() if ship["player"] == us),
+        "opponents": {name: worth[player.player_id]["total"] for name, player in zip(opponents, players[1:])},
+        "best_npc": max((game.players[player_id]["netWorth"]["total"] for player_id in game.npc_ids), default=0),
+        "errors": errors, "ticks_per_second": ticks / elapsed if elapsed else 0,
+    }
+
+
+def _simulate_case(case) -> dict:
+    params, seed, kwargs = case
+    return simulate(params, seed, **kwargs)
+
+
+def sweep(grid: Dict[str, list], seeds=1, processes=None, **kwargs) -> List[dict]:
+    """
+    Simulates every combination of the grid values on seeds 0 to `seeds` - 1.
+
+    :param grid: bot module constant -> candidate values
+    :param kwargs: arguments of `simulate`
+    """
+    names = list(grid)
+    cases = [(dict(zip(names, values)), seed, kwargs)
+             for values in itertools.product(*(grid[name] for name in names)) for seed in range(seeds)]
+    with multiprocessing.Pool(processes) as pool:
+        return list(pool.imap_unordered(_simulate_case, cases))
+
+
+def summarize(results: List[dict]) -> List[dict]:
+    """
+    :return: one row per parameter combination with net worth statistics over the seeds, best first
+    """
+    groups = {}
+    for result in results:
+        groups.setdefault(json.dumps(result["params"], sort_keys=True), []).append(result)
+    rows = []
+    for key, group in groups.items():
+        net_worth = [result["net_worth"] for result in group]
+        rows.append({
+            "params": key, "runs": len(group), "mean": statistics.mean(net_worth), "min": min(net_worth),
+            "max": max(net_worth), "best_npc": statistics.mean(result["best_npc"] for result in group),
+            "errors": sum(result["errors"] for result in group),
+            "ticks_per_second": statistics.mean(result["ticks_per_second"] for result in group),
+        })
+    return sorted(rows, key=lambda row: row["mean"], reverse=True)
+
+
+def parse_param(text):
+    """
+    NAME=JSON list of values
+    """
+    name, _, values = text.partition("=")
+    values = json.loads(values)
+    if not isinstance(values, list):
+        raise argparse.ArgumentTypeError(f"{name} needs a JSON list of values")
+    return name.strip(), values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweeps bot parameters over simulated seasons.")
+    parser.add_argument("--param", type=parse_param, action="append", default=[],
+                        help='bot constant and a JSON list of values, like "RADIUS=[150, 250]"')
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--seeds", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=None, help="defaults to the number of CPU cores")
+    parser.add_argument("--opponent", action="append", default=[], help="module of another bot, like bot_pl2")
+    parser.add_argument("--planets", type=int, default=30)
+    parser.add_argument("--npc-players", type=int, default=4)
+    parser.add_argument("--npc-ships", type=int, default=200)
+    parser.add_argument("--csv", help="file to write every run to")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = sweep(dict(args.param), seeds=args.seeds, processes=args.processes, ticks=args.ticks,
+                    opponents=tuple(args.opponent), planets=args.planets, npc_players=args.npc_players,
+                    npc_ships=args.npc_ships)
+    print(f"{len(results)} runs of {args.ticks} ticks in {time.perf_counter() - started:.1f} s")
+    for row in summarize(results):
+        print(f"{row['mean']:>14,.0f} mean  {row['min']:>14,.0f} min  {row['max']:>14,.0f} max  "
+              f"{row['best_npc']:>14,.0f} best npc  {row['errors']:>4} errors  {row['ticks_per_second']:>7.0f} ticks/s  "
+              f"{row['params']}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["params", "seed", "net_worth", "money", "ships", "best_npc", "errors", "ticks_per_second"])
+            for result in results:
+                writer.writerow([json.dumps(result["params"], sort_keys=True), result["seed"], result["net_worth"],
+                                 result["money"], result["ships"], result["best_npc"], result["errors"],
+                                 round(result["ticks_per_second"], 1)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Hand made snapshots for the strategy tests, deserialized the way the client reads the server.
+"""
+import json
+
+from space_tycoon_client import ApiClient
+
+from galaxy import SHIP_CLASSES
+from recording import RecordedResponse
+
+_api_client = ApiClient()
+
+
+def deserialize(payload, klass):
+    return _api_client.deserialize(RecordedResponse({"status": 200, "reason": "OK", "response": json.dumps(payload),
+                                                     "headers": {}}), klass)
+
+
+def static_data():
+    return deserialize({"shipClasses": SHIP_CLASSES, "resourceNames": {"1": "gold", "2": "wood"}}, "StaticData")
+
+
+def ship(ship_class, player="2", position=(0, 0), prev_position=None, life=None, resources=None, command=None):
+    """
+    :param resources: resource_id -> amount held
+    :param command: command in the wire format, like {"type": "move", "destination": {"coordinates": [0, 0]}}
+    """
+    return deserialize({
+        "shipClass": ship_class, "player": player, "name": "ship", "life": life or SHIP_CLASSES[ship_class]["life"],
+        "position": list(position), "prevPosition": list(prev_position if prev_position is not None else position),
+        "resources": {resource_id: {"amount": amount} for resource_id, amount in (resources or {}).items()},
+        "command": command,
+    }, "Ship")
+
+
+def planet(position=(0, 0), resources=None):
+    """
+    :param resources: resource_id -> (amount, buy_price, sell_price)
+    """
+    return deserialize({
+        "name": "planet", "position": list(position), "prevPosition": list(position),
+        "resources": {resource_id: {"amount": amount, "buyPrice": buy_price, "sellPrice": sell_price}
+                      for resource_id, (amount, buy_price, sell_price) in (resources or {}).items()},
+    }, "Planet")
+
+
+def data(ships=None, planets=None, wrecks=None, combat=None, trade=None, player_id="1", tick=10):
+    """
+    :param ships: ship_id -> model from `ship`, models are serialized back to the wire format
+    :param planets: planet_id -> model from `planet`
+    """
+    return deserialize({
+        "currentTick": {"tick": tick, "season": 1, "minTimeLeftMs": 0}, "playerId": player_id,
+        "players": {player: {"name": f"player {player}", "color": [0, 0, 0],
+                             "netWorth": {"money": 1000000, "resources": 0, "ships": 0, "total": 1000000}}
+                    for player in {player_id} | {s.player for s in (ships or {}).values()}},
+        "ships": {ship_id: _api_client.sanitize_for_serialization(s) for ship_id, s in (ships or {}).items()},
+        "planets": {planet_id: _api_client.sanitize_for_serialization(p) for planet_id, p in (planets or {}).items()},
+        "wrecks": wrecks or {},
+        "reports": {"combat": combat or [], "trade": trade or []},
+    }, "Data")
@@ -0,0 +1,63 @@
+"""
+Stance of the engaged fleets.
+"""
+from space_tycoon_client.models import AttackCommand, RepairCommand
+from space_tycoon_client.models.destination import Destination
+from space_tycoon_client.models.move_command import MoveCommand
+
+import bot
+from defense import DefenseFleet
+from snapshots import data, ship
+
+
+class Scores:
+    """
+    Stands in for the CommandEvaluator, scores every candidate by the stance it names.
+    """
+
+    def __init__(self, favourite):
+        self.favourite = favourite
+
+    def prepare(self, data, player_id, commands):
+        self.plan = dict(commands)
+
+    def evaluate(self, candidates):
+        self.candidates = candidates
+        return [len(candidate) if all(self.favourite(command) for command in candidate.values()) else -1
+                for candidate in candidates]
+
+
+def engaged():
+    game = bot.Game.__new__(bot.Game)
+    game.player_id = "1"
+    game.data = data({"m": ship("1", player="1"), "f1": ship("4", player="1"), "f2": ship("4", player="1"),
+                      "f3": ship("4", player="1"), "e": ship("4"), "e2": ship("3")})
+    fleet = DefenseFleet("m")
+    fleet.active_defenders = {fighter_id: bot.Fighter(fighter_id, "4") for fighter_id in ("f1", "f2", "f3")}
+    fleet.target_active = ("e", game.data.ships["e"])
+    commands = {"m": AttackCommand("e"), "f1": AttackCommand("e2"), "f2": RepairCommand(),
+                "f3": MoveCommand(Destination(target="m"))}
+    return game, {"m": fleet}, commands
+
+
+def test_press_keeps_the_allocated_targets():
+    game, fleets, commands = engaged()
+    game.what_if = Scores(lambda command: command.type == "attack")
+    game.choose_stance(commands, fleets)
+    assert commands["f1"].target == "e2"
+    assert commands["f3"].target == "e"
+    assert commands["f2"].type == "repair"
+    assert fleets["m"].active_defenders["f3"].attack
+    assert not fleets["m"].active_defenders["f2"].attack
+
+
+def test_hold_keeps_repairs_and_retreats():
+    game, fleets, commands = engaged()
+    game.what_if = Scores(lambda command: command.type in ("stop", "move"))
+    game.choose_stance(commands, fleets, locked={"f3"})
+    assert "f2" not in game.what_if.candidates[-1] and "f3" not in game.what_if.candidates[-1]
+    assert commands["m"].type == "stop"
+    assert commands["f1"].destination.target == "m"
+    assert commands["f2"].type == "repair"
+    assert commands["f3"] is game.what_if.plan["f3"]
+    assert fleets["m"].target_active is None
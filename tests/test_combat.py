@@ -0,0 +1,138 @@
+"""
+Engagement simulation, threat tracking, damage allocation and repair planning.
+"""
+import collections
+
+from combat import DamageAllocator, EngagementSimulator, RepairPlanner, Threat, ThreatTracker
+from defense import SpatialIndex
+from snapshots import ship, static_data
+
+
+def fleet(x=0, y=0):
+    return [ship("1", player="1", position=(x, y))] + [ship("4", player="1", position=(x, y)) for _ in range(3)]
+
+
+def test_engagement_wins_against_a_lone_fighter():
+    simulator = EngagementSimulator(static_data())
+    results = simulator.simulate(fleet(), {"f": ship("4", position=(100, 0))}, {})
+    assert results["f"].win
+    assert results["f"].ticks == 4
+    assert results["f"].value > 0
+
+
+def test_engagement_avoids_a_defended_target():
+    simulator = EngagementSimulator(static_data())
+    guarded = ship("1", position=(100, 0))
+    enemies = {f"b{i}": ship("5", position=(110, 0)) for i in range(6)}
+    enemies["m"] = guarded
+    lone = ship("4", position=(600, 0))
+    results = simulator.simulate(fleet(), {"m": guarded, "f": lone}, enemies)
+    assert not results["m"].win
+    assert results["m"].value < 0
+    assert simulator.best_target(fleet(), {"m": guarded, "f": lone}, enemies).target == "f"
+
+
+def test_engagement_weighs_players_and_priorities():
+    simulator = EngagementSimulator(static_data(), priorities=["5", "4"])
+    candidates = {"a": ship("4", player="2", position=(100, 0)), "b": ship("4", player="3", position=(100, 0))}
+    weighted = simulator.simulate(fleet(), candidates, {}, player_weight=lambda player: 2 if player == "3" else 1)
+    assert weighted["b"].value > weighted["a"].value
+
+    "equal fights go to the class listed first"
+    candidates = {"fighter": ship("4", position=(100, 0)), "bomber": ship("5", position=(100, 0), life=300)}
+    results = simulator.simulate(fleet(), candidates, {})
+    assert results["fighter"].ticks == results["bomber"].ticks
+    assert simulator.best_target(fleet(), candidates, {}, player_weight=lambda player: 0).target == "bomber"
+
+
+def test_threats_follow_the_enemy_heading():
+    tracker = ThreatTracker(radius=70)
+    ours = {"s": ship("3", player="1", position=(150, 0)), "off": ship("3", player="1", position=(150, 300))}
+    enemies = {"chaser": ship("4", position=(0, 0), prev_position=(-20, 0)),
+               "idle": ship("4", position=(150, 340)),
+               "away": ship("4", position=(-100, 0), prev_position=(-80, 0))}
+    threats = tracker.update(enemies, ours, tick=1)
+    assert threats["chaser"].target == "s"
+    assert threats["chaser"].ticks == 7.5
+    assert threats["idle"].target == "off"
+    assert "away" not in threats
+    assert [tracker.ships[ship_id].command for ship_id in ("chaser", "idle", "away")] == ["attack", "stop", "move"]
+    assert {target: [threat.enemy for threat in found] for target, found in tracker.threatened().items()} == {
+        "s": ["chaser"], "off": ["idle"]}
+
+    tracker.update({"idle": enemies["idle"]}, ours, tick=2)
+    assert list(tracker.ships) == ["idle"]
+    assert tracker.ships["idle"].first_seen == 1
+
+
+def fighters(count):
+    return {f"f{i}": ship("4", player="1") for i in range(count)}
+
+
+def test_allocation_splits_damage_for_more_kills():
+    allocator = DamageAllocator(static_data())
+    allocation = allocator.allocate(fighters(4), {"a": ship("3", life=40), "b": ship("3", life=40),
+                                                  "tough": ship("4")}, primary="tough")
+    assert collections.Counter(allocation.values()) == {"a": 2, "b": 2}
+
+
+def test_allocation_counts_regen_of_the_target():
+    static = static_data()
+    allocator = DamageAllocator(static, kill_ticks=3)
+    targets = {"b": ship("5", life=100), "f": ship("4")}
+    static.ship_classes["5"].regen = 0
+    assert set(allocator.allocate(fighters(3), targets, primary="f").values()) == {"b"}
+    "60 damage a tick never kills 100 life healing 50 a tick, the group stays on the primary"
+    static.ship_classes["5"].regen = 50
+    assert set(allocator.allocate(fighters(3), targets, primary="f").values()) == {"f"}
+
+
+def test_allocation_counts_the_mothership():
+    allocator = DamageAllocator(static_data(), kill_ticks=1)
+    targets = {"m": ship("3", life=20), "e": ship("3", life=40)}
+    assert set(allocator.allocate(fighters(2), targets, primary="m").values()) == {"m"}
+    "the mothership finishes its target alone, both fighters are free for the other one"
+    assert set(allocator.allocate(fighters(2), targets, primary="m", support={"m": 25}).values()) == {"e"}
+
+
+def repair_setup():
+    ours = {"safe": ship("4", player="1", position=(0, 0), life=150),
+            "lost": ship("4", player="1", position=(1000, 0), life=20),
+            "saved": ship("4", player="1", position=(2000, 0), life=200)}
+    enemies = {"b1": ship("5", position=(1010, 0)), "b2": ship("5", position=(1010, 0)), "b3": ship("5", position=(1010, 0)),
+               "f1": ship("4", position=(2010, 0)), "f2": ship("4", position=(2010, 0))}
+    index = SpatialIndex()
+    index.build(enemies)
+    return ours, enemies, index
+
+
+def test_repair_retreat_or_fight():
+    ours, enemies, index = repair_setup()
+    planner = RepairPlanner(static_data(), radius=70)
+    decisions = planner.plan(ours, index, {}, enemies, money=10 ** 6, tick=1)
+    assert {ship_id: decision.action for ship_id, decision in decisions.items()} == {
+        "safe": "repair", "lost": "retreat", "saved": "repair"}
+    assert decisions["saved"].survival > 0.5
+
+    "a repaired ship waits for the cooldown"
+    decisions = planner.plan(ours, index, {}, enemies, money=10 ** 6, tick=2)
+    assert decisions["saved"].action == "fight"
+
+
+def test_repairs_saving_the_most_are_paid_first():
+    ours, enemies, index = repair_setup()
+    planner = RepairPlanner(static_data(), radius=70)
+    decisions = planner.plan(ours, index, {}, enemies, money=3000, tick=1)
+    assert decisions["saved"].action == "repair"
+    assert decisions["safe"].action == "fight"
+
+
+def test_threats_heading_to_a_ship_count_as_incoming():
+    ours = {"s": ship("4", player="1", life=100)}
+    enemies = {"b": ship("5", position=(500, 0))}
+    index = SpatialIndex()
+    index.build(enemies)
+    planner = RepairPlanner(static_data(), radius=70)
+    assert planner.plan(ours, index, {}, enemies, money=10 ** 6, tick=1)["s"].action == "repair"
+    threatened = {"s": [Threat(enemy="b", target="s", ticks=3, distance=0)]}
+    assert planner.plan(ours, index, threatened, enemies, money=10 ** 6, tick=10)["s"].action == "retreat"
@@ -0,0 +1,70 @@
+"""
+Fleet coordination and shipper escorts.
+"""
+from space_tycoon_client.models import TradeCommand
+
+from defense import EscortPlanner, FleetCoordinator
+from snapshots import planet, ship, static_data
+
+
+def test_intruders_go_to_the_closest_fleet():
+    coordinator = FleetCoordinator()
+    motherships = {"m1": ship("1", player="1", position=(0, 0)), "m2": ship("1", player="1", position=(300, 0))}
+    coordinator.update(motherships)
+    enemies = {"near1": ship("4", position=(100, 0)), "near2": ship("4", position=(200, 0)),
+               "trader": ship("3", position=(10, 0)), "far": ship("4", position=(2000, 0))}
+    intruders = coordinator.assign_intruders(motherships, enemies, 250, exclude_classes={"3"})
+    assert {m: set(ships) for m, ships in intruders.items()} == {"m1": {"near1"}, "m2": {"near2"}}
+
+
+def test_fleet_keeps_its_target():
+    coordinator = FleetCoordinator()
+    motherships = {"m1": ship("1", player="1", position=(0, 0)), "m2": ship("1", player="1", position=(300, 0))}
+    fleets = coordinator.update(motherships)
+    enemies = {"e": ship("4", position=(200, 0))}
+    fleets["m1"].target_active = ("e", enemies["e"])
+    assert set(coordinator.assign_intruders(motherships, enemies, 250)["m1"]) == {"e"}
+
+
+def test_fleets_follow_the_motherships():
+    coordinator = FleetCoordinator()
+    fleets = coordinator.update({"m1": ship("1", player="1"), "m2": ship("1", player="1")})
+    fleets["m1"].active_defenders["f"] = object()
+    assert coordinator.owner("f") is fleets["m1"]
+    coordinator.update({"m2": ship("1", player="1")})
+    assert list(coordinator.fleets) == ["m2"]
+    assert coordinator.owner("f") is None
+
+
+def test_early_and_per_player_radius():
+    coordinator = FleetCoordinator()
+    motherships = {"m": ship("1", player="1", position=(0, 0))}
+    coordinator.update(motherships)
+    enemies = {"hostile": ship("4", player="2", position=(400, 0)), "trader": ship("4", player="3", position=(200, 0)),
+               "coming": ship("4", player="3", position=(-450, 0))}
+    intruders = coordinator.assign_intruders(motherships, enemies, 250, early={"coming": enemies["coming"]},
+                                             early_radius=500,
+                                             player_radius=lambda player: 500 if player == "2" else 125)
+    assert set(intruders["m"]) == {"hostile", "coming"}
+
+
+def test_escort_predicts_where_trades_lead():
+    planner = EscortPlanner(static_data(), lookahead=10)
+    planets = {"p": planet((1000, 0)), "near": planet((100, 0))}
+    shipper = ship("3", player="1")
+    assert planner.predict(shipper, TradeCommand(amount=10, resource="1", target="p"), planets) == (170, 0)
+    assert planner.predict(shipper, TradeCommand(amount=10, resource="1", target="near"), planets) == (100, 0)
+    assert planner.predict(shipper, None, planets) == (0, 0)
+
+
+def test_escort_sends_every_fleet_to_the_closest_group():
+    planner = EscortPlanner(static_data())
+    motherships = {"west": ship("1", player="1", position=(-900, 0)), "east": ship("1", player="1", position=(900, 0))}
+    shippers = {"w1": ship("3", player="1", position=(-1000, 0)), "w2": ship("3", player="1", position=(-1000, 100)),
+                "e1": ship("3", player="1", position=(1000, 0)), "e2": ship("3", player="1", position=(1000, 100))}
+    positions = planner.plan(motherships, shippers, {}, {})
+    assert positions == {"west": (-1000, 50), "east": (1000, 50)}
+
+    "a threatened shipper pulls its escort closer"
+    positions = planner.plan(motherships, shippers, {}, {}, threatened={"w2": ["threat", "threat"]})
+    assert positions["west"][1] > 50
@@ -0,0 +1,143 @@
+"""
+Validation of the simulation engine against the local server, tick by tick and over a recorded session.
+"""
+import contextlib
+import json
+import os
+import threading
+
+import pytest
+from space_tycoon_client import Configuration, GameApi
+from space_tycoon_client.models.end_turn import EndTurn
+
+import bot
+from engine import Engine, Movement, Prices, Rule, State, compare, default_rules, replay, summarize
+from galaxy import generate
+from local_server import LocalGame, serve
+from recording import RecordingApiClient
+
+SEED = 49
+TICKS = 100
+
+
+@pytest.fixture(scope="module")
+def snapshot():
+    """
+    /static-data and /data payloads
+    """
+    return generate(seed=SEED, ships=300, planets=20, wrecks=30)
+
+
+def exact(divergence) -> bool:
+    return not (divergence.missing or divergence.extra or divergence.position_max > 1e-9 or divergence.life_max
+                or divergence.money_max or divergence.amount_max or divergence.price_max)
+
+
+def test_step_matches_server():
+    "with every command known and the base prices given, every tick is predicted exactly"
+    game = LocalGame(seed=3, npc_players=3, npc_ships=300, tick_time=0)
+    player_id, token = game.login("engine", "engine")
+    mothership_id = next(ship_id for ship_id, ship in game.ships.items()
+                         if ship["player"] == player_id and ship["shipClass"] == "1")
+    shipper_id = next(ship_id for ship_id, ship in game.ships.items()
+                      if ship["player"] == player_id and ship["shipClass"] == "3")
+    npc_commands = game._npc_commands
+    "the NPCs decide before the snapshot is taken, the step must not decide again"
+    game._npc_commands = lambda: None
+    static = game.static_data()
+
+    fights = trades = 0
+    for tick in range(TICKS):
+        if tick % 10 == 0:
+            game.commands(token, {mothership_id: {"type": "construct", "shipClass": "4"}})
+        if tick == 5:
+            game.commands(token, {shipper_id: {"type": "decommission"}})
+        npc_commands()
+        game._data_cache = None
+        before = json.loads(game.data(token))
+        engine = Engine([Prices(base_prices=game.base_prices) if isinstance(rule, Prices) else rule
+                         for rule in default_rules()])
+        state = State.from_data(before, static)
+        engine.load(state)
+        engine.step(state)
+        with game.cond:
+            game.step()
+
+        divergence = compare(state.to_data(player_id), json.loads(game.data(token)))
+        assert exact(divergence), divergence
+        fights += len(game.combat_reports)
+        trades += len(game.trade_reports)
+    assert fights and trades
+    assert shipper_id not in game.ships
+
+
+def test_replay_recorded_session(tmp_path):
+    "without other players the session is predicted from the log alone, prices within a unit of the estimate"
+    game = LocalGame(seed=5, npc_players=0, npc_ships=0, tick_time=0)
+    server = serve(game, "localhost", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    path = str(tmp_path / "session.jsonl.gz")
+    try:
+        configuration = Configuration()
+        configuration.host = f"http://localhost:{server.server_address[1]}"
+        api_client = RecordingApiClient(path, configuration=configuration, cookie="SESSION_ID=1")
+        client = GameApi(api_client=api_client)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            player = bot.Game(client, {"user": "engine", "password": "engine"})
+            for _ in range(TICKS // 2):
+                player.data = client.data_get()
+                player.game_logic()
+                player.tick = client.end_turn_post(EndTurn(tick=player.tick, season=player.season)).tick
+        api_client.close()
+    finally:
+        game.stop()
+        server.shutdown()
+        server.server_close()
+
+    divergences = replay(path)
+    assert len(divergences) >= TICKS // 2 - 1
+    summary = summarize(divergences)
+    assert summary["missing_max"] == summary["extra_max"] == 0
+    assert summary["position_max_max"] < 1e-9
+    assert summary["money_max_max"] == summary["amount_max_max"] == 0
+    assert summary["price_max_max"] <= 1
+
+
+class Drift(Rule):
+    name = "drift"
+
+    def apply(self, state, rand):
+        for i in range(len(state.ships)):
+            state.ships.x[i] += rand.uniform(-1, 1)
+
+
+class Noise(Rule):
+    name = "noise"
+
+    def apply(self, state, rand):
+        rand.random()
+
+
+def test_seeded_rules(snapshot):
+    static, data = snapshot
+
+    def play(seed, rules):
+        engine = Engine(rules, seed=seed)
+        state = State.from_data(data, static)
+        engine.load(state)
+        for _ in range(5):
+            engine.step(state)
+        return state.to_data()
+
+    assert play(1, [Drift(), Movement()]) == play(1, [Drift(), Movement()])
+    assert play(1, [Drift(), Movement()]) != play(2, [Drift(), Movement()])
+    "a rule draws the same numbers with other rules around it"
+    assert play(1, [Drift()])["ships"] == play(1, [Noise(), Drift()])["ships"]
+
+
+def test_snapshot_round_trip(snapshot):
+    static, data = snapshot
+    state = State.from_data(data, static)
+    assert state.to_data(data["playerId"])["ships"] == {
+        ship_id: dict(ship, resources=ship["resources"] or {}) for ship_id, ship in data["ships"].items()}
+    assert state.next_ship_id == max(int(ship_id) for ship_id in list(data["ships"]) + list(data["wrecks"])) + 1
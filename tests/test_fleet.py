@@ -0,0 +1,42 @@
+"""
+Fleet composition planning.
+"""
+from fleet import REPAIR_RESERVE, FleetPlanner
+from snapshots import static_data
+
+
+def test_no_plan_before_any_route_is_seen():
+    planner = FleetPlanner(static_data())
+    assert planner.plan({"3": 5}, 10 ** 9) == {}
+
+
+def test_builds_ships_which_pay_back():
+    planner = FleetPlanner(static_data())
+    planner.set_markets(20)
+    planner.observe("3", 1.0)
+    change = planner.plan({"3": 5}, 10 ** 9)
+    assert change.get("3", 0) > 0
+    assert planner.payback("3", {"3": 5}) < planner.horizon
+
+
+def test_keeps_the_fleet_when_ships_do_not_pay_back():
+    planner = FleetPlanner(static_data())
+    planner.observe("3", 0.001)
+    assert planner.plan({"3": 5}, 10 ** 9) == {}
+
+
+def test_never_spends_the_repair_reserve():
+    planner = FleetPlanner(static_data())
+    planner.observe("3", 1.0)
+    assert planner.plan({"3": 5}, REPAIR_RESERVE + 100000) == {}
+
+
+def test_observed_rates_are_smoothed_and_shared():
+    planner = FleetPlanner(static_data())
+    planner.observe("4", 5.0)
+    assert planner.rates == {}
+    planner.observe("3", 1.0)
+    planner.observe("3", 2.0)
+    assert 1.0 < planner.rates["3"] < 2.0
+    "a class without routes of its own borrows the best rate"
+    assert planner.ship_income("2") == planner.rates["3"] * 300 * 9
@@ -0,0 +1,51 @@
+"""
+Simulated bots of the load generator giving up on a broken server.
+"""
+import asyncio
+import concurrent.futures
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from space_tycoon_client import Configuration, rest
+
+from loadgen import RELOGINS, Stats, play
+
+
+class BrokenData(BaseHTTPRequestHandler):
+    "logs everyone in and fails every other call"
+
+    def do_POST(self):
+        body = json.dumps({"id": "1"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Set-Cookie", "SESSION_ID=load; Path=/")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.send_response(500)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_bot_gives_up_after_retries_and_relogins():
+    server = ThreadingHTTPServer(("localhost", 0), BrokenData)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        configuration = Configuration()
+        configuration.host = f"http://localhost:{server.server_address[1]}"
+        stats = Stats()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            asyncio.run(play(0, configuration.host, rest.RESTClientObject(configuration), executor, stats, ticks=5,
+                             retries=3, retry_delay=0.001))
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert stats.failed == 1
+    assert len(stats.latency["login"]) == 1 + RELOGINS
+    assert stats.errors["data"] == 3 * (1 + RELOGINS)
@@ -0,0 +1,130 @@
+"""
+Danger map, wreck index and safe paths.
+"""
+import pytest
+
+from navigation import COMBAT_DANGER, DETOUR_GAIN, ENEMY_COST, KILL_DANGER, WRECK_COST
+from navigation import DangerMap, Navigator, WreckEntry, WreckIndex
+from snapshots import data, deserialize, ship
+
+
+def test_danger_spreads_and_fades():
+    danger = DangerMap(cell_size=100, half_life=10)
+    danger.tick = 5
+    danger.add(150, 150, 1.0, tick=5)
+    assert danger.query(150, 150) == 1.0
+    assert danger.query(50, 250) == 0.5
+    assert danger.query(350, 150) == 0
+    danger.tick = 15
+    assert danger.query(150, 150) == pytest.approx(0.5)
+    "events add up, one reported late starts already faded"
+    danger.add(150, 150, 1.0, tick=5)
+    assert danger.query(150, 150) == pytest.approx(1.0)
+
+
+def test_danger_from_wrecks_and_fights():
+    danger = DangerMap(cell_size=100)
+    snapshot = data({"hit": ship("4", position=(550, 550)), "gone": ship("4", position=(950, 950))},
+                    combat=[{"tick": 10, "attacker": "x", "defender": "hit", "killed": False},
+                            {"tick": 10, "attacker": "x", "defender": "gone", "killed": True}])
+    wreck = WreckEntry(id="w", x=50, y=50, kill_tick=10, ship_class="3", player="2")
+    danger.update(snapshot, 10, new_wrecks=[wreck])
+    assert danger.query(50, 50) == KILL_DANGER
+    assert danger.query(550, 550) == COMBAT_DANGER
+    "the kill counts through its wreck only"
+    assert danger.query(950, 950) == 0
+
+
+def test_no_detour_without_danger():
+    navigator = Navigator(DangerMap())
+    navigator.update({})
+    for goal in ((1000, 900), (1000, 50), (-700, 300), (50, -950)):
+        assert navigator.next_waypoint(50, 50, *goal) is None
+        _, cost, straight = navigator.path(50, 50, *goal)
+        assert cost >= straight - 1e-9
+
+
+def test_detour_around_danger():
+    danger = DangerMap(cell_size=100)
+    danger.add(550, 550, 10, tick=0)
+    navigator = Navigator(danger)
+    navigator.update({})
+    waypoints, cost, straight = navigator.path(50, 550, 1050, 550)
+    assert navigator.next_waypoint(50, 550, 1050, 550) == waypoints[0]
+    assert waypoints[-1] == (1050, 550)
+    "the path passes the danger two cells away"
+    assert all(abs(y - 550) >= 200 for x, y in waypoints if 450 <= x <= 650)
+    assert cost < straight * DETOUR_GAIN
+
+
+def test_paths_are_dropped_only_when_their_corridor_changes():
+    navigator = Navigator(DangerMap(cell_size=100))
+    navigator.update({})
+    navigator.path(50, 50, 950, 50)
+    navigator.path(50, 2050, 950, 2050)
+    assert len(navigator.paths) == 2
+    navigator.update({"e": ship("4", position=(450, 50))})
+    assert list(navigator.paths) == [((0, 20), (9, 20))]
+
+
+def wreck(x, y, kill_tick):
+    return deserialize({"shipClass": "4", "name": "wreck", "player": "2", "killTick": kill_tick, "position": [x, y]},
+                       "Wreck")
+
+
+def test_wrecks_reach_the_danger_map_once():
+    index = WreckIndex()
+    danger = DangerMap(cell_size=100)
+    new = index.update({"w1": wreck(50, 50, 9)}, 10)
+    assert [(entry.id, entry.x, entry.y, entry.kill_tick) for entry in new] == [("w1", 50, 50, 9)]
+    danger.update(data(tick=10), 10, new)
+    assert index.update({"w1": wreck(50, 50, 9), "w2": wreck(950, 50, 10)}, 11) == [index.wrecks["w2"]]
+    assert index.update({"w2": wreck(950, 50, 10)}, 12) == []
+    assert list(index.wrecks) == ["w2"]
+    "the wreck counted once, faded by the two ticks since the kill"
+    danger.update(data(tick=11), 11)
+    assert danger.query(50, 50) == pytest.approx(KILL_DANGER * danger.decay ** 2)
+
+
+def test_nearest_wreck():
+    index = WreckIndex(cell_size=100)
+    assert index.nearest(0, 0) is None
+    index.update({"near": wreck(250, 0, 9), "far": wreck(-900, 900, 9), "close": wreck(40, 130, 9)}, 10)
+    entry, dist = index.nearest(0, 0)
+    assert entry.id == "close" and dist == pytest.approx(136.01, abs=0.01)
+    assert index.nearest(-850, 850)[0].id == "far"
+    assert index.nearest(0, 0, max_dist=100) is None
+    "a vanished wreck leaves its cell"
+    index.update({"near": wreck(250, 0, 9), "far": wreck(-900, 900, 9)}, 11)
+    assert index.nearest(0, 0)[0].id == "near"
+    assert (0, 1) not in index.cells
+
+
+def test_wreck_lifetime_is_learned():
+    index = WreckIndex()
+    index.update({"old": wreck(0, 0, 0), "new": wreck(500, 0, 8)}, 8)
+    assert index.expires_in("new", 8) is None
+    assert index.freshness("new", 8) == 1.0
+    index.update({"new": wreck(500, 0, 8)}, 10)
+    assert index.lifetime == 10
+    assert index.expires_in("new", 12) == 6
+    assert index.freshness("new", 12) == pytest.approx(0.6)
+    assert index.expires_in("old", 12) is None and index.freshness("old", 12) == 0
+
+
+def test_fresh_wrecks_and_their_hunters_cost_more():
+    index = WreckIndex(cell_size=100)
+    index.update({"w": wreck(550, 50, 10)}, 10)
+    navigator = Navigator(DangerMap(cell_size=100))
+    navigator.update({"hunter": ship("4", position=(560, 60)), "idle": ship("4", position=(950, 950))}, index, 10)
+    assert navigator.cost((5, 0)) == 1 + WRECK_COST + 2 * ENEMY_COST
+    assert navigator.cost((9, 9)) == 1 + ENEMY_COST
+
+
+def test_faded_cells_are_forgotten():
+    danger = DangerMap(cell_size=100, half_life=10)
+    danger.add(150, 150, 1.0, tick=0)
+    danger.tick = 70
+    danger.add(950, 950, 1.0, tick=70)
+    assert {cell for cell, _ in danger.values()} == {(9 + dx, 9 + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)}
+    assert len(danger.cells) == 9
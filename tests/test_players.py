@@ -0,0 +1,50 @@
+"""
+Opponent profiles.
+"""
+from players import PEACE_TICKS, PlayerProfiles
+from snapshots import data, ship, static_data
+
+
+def snapshot(tick, combat=()):
+    ships = {"ours": ship("1", player="1"), "raider": ship("4", player="2"), "trader": ship("3", player="3"),
+             "ally": ship("4", player="4")}
+    return data(ships, combat=list(combat), tick=tick)
+
+
+def test_allies_are_peaceful_from_the_start():
+    profiles = PlayerProfiles(static_data(), "1", allies=["4"])
+    profiles.update(snapshot(0), 0)
+    assert profiles.peaceful(0) == {"4"}
+
+
+def test_players_which_never_attack_become_peaceful():
+    profiles = PlayerProfiles(static_data(), "1")
+    attack = {"tick": 0, "attacker": "raider", "defender": "ours", "killed": False}
+    profiles.update(snapshot(0, [attack]), 0)
+    for tick in range(1, PEACE_TICKS + 1):
+        profiles.update(snapshot(tick), tick)
+        if tick < PEACE_TICKS:
+            assert profiles.peaceful(tick) == set()
+    assert profiles.peaceful(PEACE_TICKS) == {"3", "4"}
+
+
+def test_hostile_players_are_watched_from_further_away():
+    profiles = PlayerProfiles(static_data(), "1", allies=["2"])
+    attack = {"tick": 0, "attacker": "raider", "defender": "ours", "killed": False}
+    profiles.update(snapshot(0, [attack] * 3), 0)
+    assert profiles.get("2").attacks == 3
+    assert profiles.get("2").ships == {"4": 1}
+    assert profiles.radius("2", 100) > 100 > profiles.radius("3", 100)
+    assert profiles.weight("2") > profiles.weight("3") == 1
+    "an ally is never picked as the one to go after"
+    assert profiles.most_aggressive() != "2"
+
+
+def test_scores_of_the_current_season():
+    profiles = PlayerProfiles(static_data(), "1")
+    profiles.update(snapshot(0), 0)
+    scores = {"2": {"2": 50, "3": 7}, "10": {"2": 900}, "3": {"2": 300, "3": 20}}
+    profiles.update_scores(scores, season=3)
+    assert (profiles.get("2").score, profiles.get("3").score) == (300, 20)
+    profiles.update_scores(scores)
+    assert profiles.get("2").score == 900
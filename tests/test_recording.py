@@ -0,0 +1,80 @@
+"""
+Recording of a session against the local server and its replay.
+"""
+import contextlib
+import gzip
+import os
+import shutil
+import threading
+
+import pytest
+from space_tycoon_client import Configuration, GameApi
+from space_tycoon_client.models.end_turn import EndTurn
+
+import bot
+from engine import replay
+from local_server import LocalGame, serve
+from recording import RecordingApiClient, read_log, replay_benchmark
+
+TICKS = 3
+
+
+def record(path, ticks=TICKS, killed_at=None):
+    """
+    Plays `ticks` ticks on a local server through a RecordingApiClient.
+
+    :param killed_at: path the log is copied to as it is on disk before `close`, like the one of a killed bot
+    :return: the session cookie of the bot
+    """
+    game = LocalGame(seed=5, npc_players=0, npc_ships=0, tick_time=0)
+    server = serve(game, "localhost", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        configuration = Configuration()
+        configuration.host = f"http://localhost:{server.server_address[1]}"
+        api_client = RecordingApiClient(path, configuration=configuration, cookie="SESSION_ID=1")
+        client = GameApi(api_client=api_client)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            player = bot.Game(client, {"user": "recorder", "password": "hunter2"})
+            for _ in range(ticks):
+                player.data = client.data_get()
+                player.game_logic()
+                player.tick = client.end_turn_post(EndTurn(tick=player.tick, season=player.season)).tick
+            "a tick cut short after its /data"
+            client.data_get()
+        if killed_at is not None:
+            shutil.copyfile(path, killed_at)
+        api_client.close()
+    finally:
+        game.stop()
+        server.shutdown()
+        server.server_close()
+    return api_client.cookie
+
+
+def test_recording_keeps_no_credentials(tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+    cookie = record(path)
+
+    token = cookie.split(";")[0].split("=", 1)[1]
+    with gzip.open(path, "rt", encoding="utf-8") as log:
+        recorded = log.read()
+    assert "hunter2" not in recorded
+    assert token not in recorded
+
+    "the replay logs in with any credentials"
+    timings = replay_benchmark(path, config={"user": "replay", "password": "replay"})
+    assert len(timings["tick"]) == TICKS
+
+
+def test_log_of_a_killed_bot_replays_up_to_its_last_turn(tmp_path):
+    path, killed = str(tmp_path / "session.jsonl.gz"), str(tmp_path / "killed.jsonl.gz")
+    record(path, killed_at=killed)
+    with gzip.open(killed, "rt", encoding="utf-8") as log, pytest.raises(EOFError):
+        log.read()
+
+    records = list(read_log(killed))
+    assert records[-1]["path"] == "/end-turn"
+    assert len(records) < len(list(read_log(path)))
+    assert len(replay_benchmark(killed)["tick"]) == TICKS
+    assert len(replay(killed)) == TICKS - 1
@@ -0,0 +1,149 @@
+"""
+Trade sizing, sell routes, market watching and the trade ledger.
+"""
+from space_tycoon_client.models import TradeCommand
+
+from fleet import REPAIR_RESERVE
+from snapshots import deserialize, planet, ship, static_data
+from trading import SELL_DEPTH, OpportunityDetector, PlanetDistances, SellPlanner, TradeLedger, TradeSizer
+
+
+def test_buy_fills_free_cargo():
+    sizer = TradeSizer(static_data(), cash_reserve=0)
+    sizer.begin_tick(10 ** 9)
+    shipper = ship("3", resources={"1": 30})
+    assert sizer.buy_amount(shipper, "p1", "2", planet_amount=500, buy_price=10) == 70
+
+
+def test_cargo_never_eats_the_repair_reserve():
+    sizer = TradeSizer(static_data())
+    sizer.begin_tick(REPAIR_RESERVE + 300)
+    assert sizer.buy_amount(ship("3"), "p1", "1", planet_amount=500, buy_price=10) == 30
+
+
+def test_buy_limited_by_stock_cash_and_sell_depth():
+    sizer = TradeSizer(static_data(), cash_reserve=1000, sell_depth=40)
+    sizer.begin_tick(1000 + 25 * 10)
+    shipper = ship("3")
+    assert sizer.buy_amount(shipper, "p1", "1", planet_amount=12, buy_price=10) == 12
+    assert sizer.buy_amount(shipper, "p1", "1", planet_amount=500, buy_price=10) == 25
+    sizer.begin_tick(10 ** 9)
+    assert sizer.buy_amount(shipper, "p1", "1", planet_amount=500, buy_price=10, sell_planet_id="p2") == 40
+
+
+def test_reserve_is_shared_by_the_tick():
+    sizer = TradeSizer(static_data(), cash_reserve=0, sell_depth=150)
+    sizer.begin_tick(10 ** 9)
+    shipper = ship("3")
+    sizer.reserve("p1", "1", 80, buy_price=10, sell_planet_id="p2")
+    assert sizer.buy_amount(shipper, "p1", "1", planet_amount=100, buy_price=10) == 20
+    assert sizer.buy_amount(shipper, "p3", "1", planet_amount=500, buy_price=10, sell_planet_id="p2") == 70
+    assert sizer.budget == 10 ** 9 - 800
+
+    sizer.begin_tick(10 ** 9)
+    assert sizer.buy_amount(shipper, "p1", "1", planet_amount=100, buy_price=10) == 100
+
+
+def test_no_cargo_hold_buys_nothing():
+    sizer = TradeSizer(static_data(), cash_reserve=0)
+    sizer.begin_tick(10 ** 9)
+    assert sizer.buy_amount(ship("4"), "p1", "1", planet_amount=500, buy_price=10) == 0
+
+
+def sell_planets():
+    return {
+        "a": planet((100, 0), {"1": (0, None, 100)}),
+        "b": planet((150, 0), {"2": (0, None, 100)}),
+        "far": planet((5000, 0), {"1": (0, None, 150), "2": (0, None, 150)}),
+    }
+
+
+def test_sell_route_covers_all_cargo():
+    planner = SellPlanner(PlanetDistances())
+    plans = planner.plan(sell_planets(), {"s": ship("3", resources={"1": 50, "2": 50})})
+    assert list(plans["s"].stops.items()) == [("a", {"1": 50}), ("b", {"2": 50})]
+    assert plans["s"].value == 10000
+    assert plans["s"].distance == 150
+
+
+def test_sell_route_avoids_danger():
+    planner = SellPlanner(PlanetDistances())
+    plans = planner.plan(sell_planets(), {"s": ship("3", resources={"1": 50})}, danger={"a": 100})
+    assert list(plans["s"].stops) == ["far"]
+
+
+def test_nothing_to_sell():
+    planner = SellPlanner(PlanetDistances())
+    assert planner.plan(sell_planets(), {"empty": ship("3"), "odd": ship("3", resources={"9": 10})}) == {}
+
+
+def markets(sell_price=30):
+    return {
+        "a": planet((100, 0), {"1": (100, 10, None)}),
+        "b": planet((200, 0), {"1": (0, None, sell_price)}),
+        "c": planet((100, 10), {"2": (100, 10, None)}),
+        "d": planet((200, 10), {"2": (0, None, 200)}),
+    }
+
+
+def test_opportunities_report_changes_only():
+    detector = OpportunityDetector()
+    events = detector.update(markets())
+    assert [(o.resource, o.buy_planet, o.sell_planet, o.spread) for o in events] == [
+        ("2", "c", "d", 190), ("1", "a", "b", 20)]
+    assert detector.update(markets()) == []
+    assert [(o.resource, o.spread) for o in detector.update(markets(sell_price=50))] == [("1", 40)]
+
+
+def test_preempt_turns_around_a_shipper_for_a_better_spread():
+    planets = markets()
+    distances = PlanetDistances()
+    distances.update(planets)
+    detector = OpportunityDetector()
+    events = detector.update(planets)
+    sizer = TradeSizer(static_data(), cash_reserve=0)
+    sizer.begin_tick(10 ** 9)
+    shipper = ship("3", position=(0, 0), prev_position=(-10, 0),
+                   command={"type": "trade", "amount": 50, "resource": "1", "target": "a"})
+    loaded = ship("3", resources={"1": 10}, command={"type": "trade", "amount": -10, "resource": "1", "target": "b"})
+
+    redirects = detector.preempt({"s": shipper, "loaded": loaded}, events, distances, sizer)
+    assert list(redirects) == ["s"]
+    opportunity, amount = redirects["s"]
+    assert (opportunity.resource, opportunity.buy_planet, amount) == ("2", "c", SELL_DEPTH)
+    assert sizer.claimed_buys[("c", "2")] == SELL_DEPTH
+
+
+def trade(tick, buyer, seller, amount, price, resource="1"):
+    return deserialize({"tick": tick, "buyer": buyer, "seller": seller, "resource": resource, "amount": amount,
+                        "price": price}, "Trade")
+
+
+def test_ledger_joins_buy_and_sale():
+    ledger = TradeLedger()
+    ledger.issue("s", TradeCommand(amount=10, resource="1", target="a"), tick=5)
+    assert ledger.update([trade(6, "s", "a", 10, 10)], {"s"}) == []
+    entries = ledger.update([trade(9, "b", "s", 10, 25)], {"s"})
+    assert [(e.buy_planet, e.sell_planet, e.amount, e.profit, e.ticks) for e in entries] == [("a", "b", 10, 150, 4)]
+    assert ledger.route_margin("a", "b", "1") == 15
+    assert ledger.route_margin("a", "c", "1") is None
+    assert ledger.ship_yield("s") == ledger.resource_yield("1") == 150 / 4
+
+
+def test_ledger_splits_cost_over_partial_sales():
+    ledger = TradeLedger()
+    ledger.update([trade(1, "s", "a", 10, 10), trade(2, "s", "a", 10, 20)], {"s"})
+    first = ledger.update([trade(5, "b", "s", 5, 30)], {"s"})
+    second = ledger.update([trade(6, "c", "s", 15, 30)], {"s"})
+    assert first[0].profit == 5 * 30 - 5 * 15
+    assert second[0].profit == 15 * 30 - 15 * 15
+    assert ledger.total_profit == 20 * 30 - 300
+    "cargo held before the books were opened is not counted"
+    assert ledger.update([trade(7, "b", "s", 5, 30)], {"s"}) == []
+
+
+def test_ledger_yields_roll_over_the_window():
+    ledger = TradeLedger(window=2)
+    for tick, price in ((1, 20), (3, 30), (5, 40)):
+        ledger.update([trade(tick, "s", "a", 10, 10), trade(tick + 1, "b", "s", 10, price)], {"s"})
+    assert ledger.route_margin("a", "b", "1") == (20 + 30) / 2
@@ -0,0 +1,69 @@
+"""
+Copy-on-write world state and the candidates of the forward model branching it.
+"""
+import pytest
+from space_tycoon_client.models import TradeCommand
+
+from planning import CommandEvaluator
+from snapshots import data, planet, ship, static_data
+from world import WorldState
+
+
+def snapshot():
+    return data({"a": ship("3", player="1", position=(0, 0)), "b": ship("3", player="1", position=(0, 0))},
+                {"p": planet((0, 0), {"1": (100, 10, 0)}), "q": planet((500, 0), {"1": (0, 0, 30)})})
+
+
+def test_forks_change_independently():
+    world = WorldState(snapshot())
+    world.update("ships", "a", position=(5, 5))
+    branch = world.fork()
+    branch.update("ships", "a", life=1)
+    branch.update("ships", "b", position=(9, 9))
+    assert world.ships["a"].position == (5, 5) and world.ships["a"].life == branch.ships["b"].life
+    assert world.ships["b"].position == (0, 0)
+    assert branch.ships["a"].position == (5, 5) and branch.ships["a"].life == 1
+    assert world.changed() == 1 and branch.changed() == 2
+
+
+def test_rollback_to_a_checkpoint():
+    world = WorldState(snapshot())
+    world.update("ships", "a", position=(1, 1))
+    mark = world.checkpoint()
+    world.update("ships", "a", position=(2, 2))
+    world.update("players", "1", money=0)
+    world.delete("ships", "b")
+    world.rollback(mark)
+    assert world.ships["a"].position == (1, 1)
+    assert world.players["1"].money == 1000000
+    assert "b" in world.ships
+    world.rollback()
+    assert world.ships["a"].position == (0, 0) and world.changed() == 0
+
+
+def test_deleted_and_added_records():
+    world = WorldState(snapshot())
+    world.delete("ships", "a")
+    world.set("ships", "c", world.ships["b"]._replace(position=(7, 7)))
+    assert list(world.ships) == ["b", "c"] and len(world.ships) == 2
+    assert "a" not in world.ships
+    with pytest.raises(KeyError):
+        world.ships["a"]
+    with pytest.raises(KeyError):
+        world.update("ships", "a", life=1)
+    with pytest.raises(KeyError):
+        world.update("ships", "missing", life=1)
+
+
+def test_candidates_book_stock_on_their_own_branch():
+    snapshot_data = snapshot()
+    evaluator = CommandEvaluator(static_data(), attack_range=70)
+    evaluator.prepare(snapshot_data, "1", {})
+    buy = TradeCommand(amount=100, resource="1", target="p")
+    one, both, again = evaluator.evaluate([{"a": buy}, {"a": buy, "b": buy}, {"b": buy}])
+    assert one > 0
+    "the second ship finds the stock bought by the first one"
+    assert both == one == again
+    "the snapshot is never copied nor changed"
+    assert snapshot_data.planets["p"].resources["1"].amount == 100
+    assert evaluator.world.changed() == 0
@@ -0,0 +1,211 @@
+"""
+Tournament of bot versions on the local server.
+
+    python tournament.py bot bot_pl2 "bot:RADIUS=150" --seasons 5 --season-ticks 500
+
+starts a local server in lockstep, runs every variant in its own process as a player of the same galaxy and plays
+the seasons. A variant is a bot module with optional module constants, `module:NAME=JSON,NAME=JSON`. The report
+ranks the variants by season score and shows what a tick costs each of them: wall time and CPU time of game_logic
+and the time spent deserializing /data.
+"""
+import argparse
+import collections
+import contextlib
+import csv
+import importlib
+import json
+import multiprocessing
+import os
+import statistics
+import threading
+import time
+from typing import Dict, List
+
+from space_tycoon_client import ApiClient, Configuration, GameApi
+from space_tycoon_client.models.end_turn import EndTurn
+from space_tycoon_client.rest import ApiException
+
+from local_server import LocalGame, serve
+
+Variant = collections.namedtuple("Variant", ["name", "module", "params"])
+# one season of one variant, timings hold a duration in seconds per tick
+SeasonResult = collections.namedtuple("SeasonResult", ["variant", "season", "player_id", "ticks", "errors", "timings"])
+
+
+def parse_variant(text) -> Variant:
+    """
+    module:NAME=JSON,NAME=JSON, the whole text names the variant
+    """
+    module, _, assignments = text.partition(":")
+    params = {}
+    for assignment in filter(None, assignments.split(",")):
+        name, _, value = assignment.partition("=")
+        params[name.strip()] = json.loads(value)
+    return Variant(text, module, params)
+
+
+def play(variant: Variant, host, seasons, results, quiet=True):
+    """
+    Worker process, plays `seasons` seasons as one player and puts a SeasonResult per season to `results`.
+    """
+    module = importlib.import_module(variant.module)
+    for name, value in variant.params.items():
+        if not hasattr(module, name):
+            raise ValueError(f"{variant.module} has no parameter {name}")
+        setattr(module, name, value)
+
+    configuration = Configuration()
+    configuration.host = host
+    client = GameApi(api_client=ApiClient(configuration=configuration, cookie="SESSION_ID=1"))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext():
+        for _ in range(seasons):
+            game = module.Game(client, {"user": variant.name, "password": "tournament"})
+            season = game.season
+            timings = {"data": [], "game_logic": [], "cpu": []}
+            errors = 0
+            while True:
+                try:
+                    started = time.perf_counter()
+                    game.data = client.data_get()
+                    deserialized = time.perf_counter()
+                    cpu = time.process_time()
+                    try:
+                        game.game_logic()
+                    except ApiException:
+                        raise
+                    except Exception:
+                        "the bot survives its own errors in game_loop, so does the tournament"
+                        errors += 1
+                    timings["cpu"].append(time.process_time() - cpu)
+                    timings["game_logic"].append(time.perf_counter() - deserialized)
+                    timings["data"].append(deserialized - started)
+                    current_tick = client.end_turn_post(EndTurn(tick=game.tick, season=game.season))
+                except ApiException as e:
+                    if e.status == 403:
+                        "a new season logged everybody out"
+                        break
+                    raise
+                game.tick = current_tick.tick
+                game.season = current_tick.season
+            results.put(SeasonResult(variant.name, season, game.player_id, len(timings["cpu"]), errors, timings))
+
+
+def run(variants: List[Variant], seasons=3, season_ticks=500, seed=0, planets=30, npc_players=4, npc_ships=200,
+        quiet=True) -> (Dict[str, Dict[str, int]], List[SeasonResult]):
+    """
+    :return: the season scores of the server, season -> player_id -> net worth, and what every variant reported
+    """
+    game = LocalGame(seed=seed, planets=planets, npc_players=npc_players, npc_ships=npc_ships, tick_time=0,
+                     season_ticks=season_ticks, min_players=len(variants))
+    server = serve(game, "localhost", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://localhost:{server.server_address[1]}"
+
+    "clean interpreters, the server threads of this process are not forked along"
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    workers = [context.Process(target=play, args=(variant, host, seasons, queue, quiet), daemon=True)
+               for variant in variants]
+    for worker in workers:
+        worker.start()
+    results = []
+    try:
+        while len(results) < seasons * len(variants):
+            if not any(worker.is_alive() for worker in workers) and queue.empty():
+                break
+            with contextlib.suppress(Exception):
+                results.append(queue.get(timeout=1))
+    finally:
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        game.stop()
+        server.shutdown()
+        server.server_close()
+    return game.season_scores, results
+
+
+def _ms(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000 if ordered else 0.0
+
+
+def report(season_scores: Dict[str, Dict[str, int]], results: List[SeasonResult]) -> List[dict]:
+    """
+    :return: one row per variant, best mean score first
+    """
+    by_variant = collections.defaultdict(list)
+    for result in results:
+        by_variant[result.variant].append(result)
+
+    rows = []
+    for variant, played in by_variant.items():
+        scores, ranks, npc_ahead = [], [], 0
+        timings = collections.defaultdict(list)
+        for result in played:
+            season = season_scores.get(str(result.season))
+            if season is not None and result.player_id in season:
+                ours = {other.player_id for other in results if other.season == result.season}
+                score = season[result.player_id]
+                scores.append(score)
+                ranks.append(1 + sum(1 for player_id in ours if season.get(player_id, 0) > score))
+                npc_ahead += any(value > score for player_id, value in season.items() if player_id not in ours)
+            for stage, values in result.timings.items():
+                timings[stage].extend(values)
+        rows.append({
+            "variant": variant, "seasons": len(scores),
+            "mean": statistics.mean(scores) if scores else 0, "min": min(scores, default=0),
+            "max": max(scores, default=0), "wins": ranks.count(1),
+            "rank": statistics.mean(ranks) if ranks else 0, "npc_ahead": npc_ahead,
+            "errors": sum(result.errors for result in played), "ticks": sum(result.ticks for result in played),
+            "logic_ms": statistics.mean(timings["game_logic"]) * 1000 if timings["game_logic"] else 0,
+            "logic_p95_ms": _ms(timings["game_logic"], 0.95),
+            "cpu_ms": statistics.mean(timings["cpu"]) * 1000 if timings["cpu"] else 0,
+            "data_ms": statistics.mean(timings["data"]) * 1000 if timings["data"] else 0,
+        })
+    return sorted(rows, key=lambda row: row["mean"], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plays bot versions against each other on the local server.")
+    parser.add_argument("variants", type=parse_variant, nargs="+", help='bot module and constants, like "bot:RADIUS=150"')
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--season-ticks", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--planets", type=int, default=30)
+    parser.add_argument("--npc-players", type=int, default=4)
+    parser.add_argument("--npc-ships", type=int, default=200)
+    parser.add_argument("--csv", help="file to write every season of every variant to")
+    parser.add_argument("--verbose", action="store_true", help="keep the output of the bots")
+    args = parser.parse_args()
+    if len({variant.name for variant in args.variants}) < len(args.variants):
+        parser.error("every variant can play only once")
+
+    started = time.perf_counter()
+    season_scores, results = run(args.variants, seasons=args.seasons, season_ticks=args.season_ticks, seed=args.seed,
+                                 planets=args.planets, npc_players=args.npc_players, npc_ships=args.npc_ships,
+                                 quiet=not args.verbose)
+    print(f"{len(season_scores)} seasons of {args.season_ticks} ticks in {time.perf_counter() - started:.1f} s")
+    print(f"{'variant':>24}{'mean':>14}{'min':>14}{'max':>14}{'wins':>6}{'rank':>6}{'npc ahead':>10}{'errors':>8}"
+          f"{'logic ms':>10}{'p95 ms':>9}{'cpu ms':>9}{'data ms':>9}")
+    for row in report(season_scores, results):
+        print(f"{row['variant']:>24}{row['mean']:>14,.0f}{row['min']:>14,.0f}{row['max']:>14,.0f}{row['wins']:>6}"
+              f"{row['rank']:>6.1f}{row['npc_ahead']:>10}{row['errors']:>8}{row['logic_ms']:>10.2f}"
+              f"{row['logic_p95_ms']:>9.2f}{row['cpu_ms']:>9.2f}{row['data_ms']:>9.2f}")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["variant", "season", "player_id", "score", "ticks", "errors", "logic_ms", "cpu_ms",
+                             "data_ms"])
+            for result in results:
+                score = season_scores.get(str(result.season), {}).get(result.player_id)
+                writer.writerow([result.variant, result.season, result.player_id, score, result.ticks, result.errors,
+                                 round(statistics.mean(result.timings["game_logic"] or [0]) * 1000, 3),
+                                 round(statistics.mean(result.timings["cpu"] or [0]) * 1000, 3),
+                                 round(statistics.mean(result.timings["data"] or [0]) * 1000, 3)])
+
+
+if __name__ == "__main__":
+    main()
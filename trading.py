@@ -0,0 +1,458 @@
+import collections
+import itertools
+import math
+from typing import Dict, Optional, Tuple
+
+from space_tycoon_client.models.ship import Ship
+from space_tycoon_client.models.static_data import StaticData
+
+from fleet import REPAIR_RESERVE
+
+# how many units of one resource a single planet is expected to absorb per tick before its price collapses
+SELL_DEPTH = 50
+# money kept aside for repairs and construction, never spent on cargo, the same the FleetPlanner leaves untouched
+CASH_RESERVE = REPAIR_RESERVE
+
+
+def held_amount(ship: Ship) -> int:
+    if not ship.resources:
+        return 0
+    return sum(resource["amount"] for resource in ship.resources.values())
+
+
+class TradeSizer:
+    """
+    Computes how much a shipper should buy so every trip leaves with a full hold.
+
+    Buy amounts are limited by the free cargo space of the ship class, the amount offered by the planet,
+    the money we can afford (shared by all buys issued in the same tick) and the expected depth of the sell market.
+    Call `begin_tick` before issuing any trade commands in a tick.
+    """
+
+    def __init__(self, static_data: StaticData, cash_reserve=CASH_RESERVE, sell_depth=SELL_DEPTH):
+        self.ship_classes = static_data.ship_classes
+        self.cash_reserve = cash_reserve
+        self.sell_depth = sell_depth
+
+        self.budget = 0
+        # (planet_id, resource_id) -> amount already claimed this tick
+        self.claimed_buys: Dict[Tuple[str, str], int] = collections.defaultdict(int)
+        self.claimed_sells: Dict[Tuple[str, str], int] = collections.defaultdict(int)
+
+    def begin_tick(self, money):
+        self.budget = max(0, money - self.cash_reserve)
+        self.claimed_buys.clear()
+        self.claimed_sells.clear()
+
+    def free_capacity(self, ship: Ship) -> int:
+        ship_class = self.ship_classes.get(ship.ship_class)
+        if ship_class is None or not ship_class.cargo_capacity:
+            return 0
+        return max(0, ship_class.cargo_capacity - held_amount(ship))
+
+    def available(self, planet_id, resource_id, planet_amount) -> int:
+        return max(0, planet_amount - self.claimed_buys[(planet_id, resource_id)])
+
+    def sell_room(self, sell_planet_id, resource_id) -> int:
+        return max(0, self.sell_depth - self.claimed_sells[(sell_planet_id, resource_id)])
+
+    def buy_amount(self, ship: Ship, planet_id, resource_id, planet_amount, buy_price,
+                   sell_planet_id: Optional[str] = None) -> int:
+        """
+        Largest amount the ship can buy on the planet right now, without reserving anything.
+
+        :return: amount, 0 when nothing should be bought
+        """
+        amount = min(self.free_capacity(ship), self.available(planet_id, resource_id, planet_amount))
+        if buy_price:
+            amount = min(amount, int(self.budget // buy_price))
+        if sell_planet_id is not None:
+            amount = min(amount, self.sell_room(sell_planet_id, resource_id))
+        return max(0, amount)
+
+    def claim_sell(self, sell_planet_id, resource_id, amount):
+        self.claimed_sells[(sell_planet_id, resource_id)] += amount
+
+    def reserve(self, planet_id, resource_id, amount, buy_price, sell_planet_id: Optional[str] = None):
+        """
+        Books the buy, so the following shippers in the same tick do not count on the same goods and money.
+        """
+        self.claimed_buys[(planet_id, resource_id)] += amount
+        self.budget -= amount * (buy_price or 0)
+        if sell_planet_id is not None:
+            self.claim_sell(sell_planet_id, resource_id, amount)
+
+
+class PlanetDistances:
+    """
+    Planet to planet distance matrix, rebuilt only when some planet has moved.
+    """
+
+    def __init__(self):
+        self.positions: Dict[str, Tuple[float, float]] = {}
+        self.matrix: Dict[str, Dict[str, float]] = {}
+
+    def update(self, planets):
+        positions = {planet_id: (planet.position[0], planet.position[1]) for planet_id, planet in planets.items()}
+        if positions == self.positions:
+            return
+        self.positions = positions
+        self.matrix = {
+            a_id: {b_id: math.hypot(a[0] - b[0], a[1] - b[1]) for b_id, b in positions.items()}
+            for a_id, a in positions.items()
+        }
+
+    def get(self, a_id, b_id) -> float:
+        return self.matrix[a_id][b_id]
+
+    def from_point(self, x, y) -> Dict[str, float]:
+        return {planet_id: math.hypot(x - pos[0], y - pos[1]) for planet_id, pos in self.positions.items()}
+
+
+# stops: planet_id -> {resource_id: amount}, in visiting order
+SellPlan = collections.namedtuple("SellPlan", ["stops", "value", "distance"])
+
+
+class SellPlanner:
+    """
+    Plans where loaded shippers sell their cargo.
+
+    Every held resource is matched against every planet that buys it, the best few markets per resource
+    are combined into routes of up to `max_stops` planets and the route with the highest value per tick wins.
+    All loaded shippers are planned in a single pass over the planets.
+    """
+
+    def __init__(self, distances: PlanetDistances, max_stops=3, candidates=3):
+        self.distances = distances
+        self.max_stops = max_stops
+        self.candidates = candidates
+
+    def _markets(self, planets) -> Dict[str, list]:
+        markets = collections.defaultdict(list)
+        for planet_id, planet in planets.items():
+            for resource_id, resource in planet.resources.items():
+                if resource.sell_price:
+                    markets[resource_id].append((resource.sell_price, planet_id))
+        for offers in markets.values():
+            offers.sort(reverse=True)
+        return markets
+
+    def plan(self, planets, ships: Dict[str, Ship], danger: Optional[Dict[str, float]] = None) -> Dict[str, SellPlan]:
+        """
+        :param danger: planet_id -> danger around the planet, dangerous stops are scored down
+        """
+        self.distances.update(planets)
+        markets = self._markets(planets)
+
+        plans = {}
+        for ship_id, ship in ships.items():
+            if not ship.resources:
+                continue
+            plan = self._plan_ship(ship, planets, markets, danger or {})
+            if plan is not None:
+                plans[ship_id] = plan
+
+        return plans
+
+    def _plan_ship(self, ship: Ship, planets, markets, danger) -> Optional[SellPlan]:
+        held = {resource_id: resource["amount"] for resource_id, resource in ship.resources.items() if resource["amount"] > 0}
+        candidates = []
+        for resource_id in held:
+            for _, planet_id in markets.get(resource_id, [])[:self.candidates]:
+                if planet_id not in candidates:
+                    candidates.append(planet_id)
+        if not candidates:
+            return None
+
+        from_ship = self.distances.from_point(ship.position[0], ship.position[1])
+        best = None
+        best_score = -1
+        for stop_count in range(1, min(self.max_stops, len(candidates)) + 1):
+            for route in itertools.permutations(candidates, stop_count):
+                stops = self._assign(route, held, planets)
+                if stops is None:
+                    continue
+                value = sum(
+                    amount * planets[planet_id].resources[resource_id].sell_price
+                    for planet_id, sold in stops.items() for resource_id, amount in sold.items()
+                )
+                distance = from_ship[route[0]]
+                for a_id, b_id in zip(route, route[1:]):
+                    distance += self.distances.get(a_id, b_id)
+                "a ship parked on the planet sells right away"
+                score = value / max(distance, 1) / (1 + sum(danger.get(planet_id, 0) for planet_id in route))
+                if score > best_score:
+                    best_score = score
+                    best = SellPlan(stops=stops, value=value, distance=distance)
+
+        return best
+
+    @staticmethod
+    def _assign(route, held, planets) -> Optional[Dict[str, Dict[str, int]]]:
+        """
+        Sells every resource on the best paying planet of the route.
+
+        :return: stops in route order, None if some stop of the route would sell nothing
+        """
+        stops = {planet_id: {} for planet_id in route}
+        for resource_id, amount in held.items():
+            best_price = 0
+            best_planet_id = None
+            for planet_id in route:
+                offer = planets[planet_id].resources.get(resource_id)
+                if offer is not None and offer.sell_price and offer.sell_price > best_price:
+                    best_price = offer.sell_price
+                    best_planet_id = planet_id
+            if best_planet_id is not None:
+                stops[best_planet_id][resource_id] = amount
+
+        if any(not sold for sold in stops.values()):
+            return None
+        return stops
+
+
+TradeOpportunity = collections.namedtuple("TradeOpportunity", ["resource", "buy_planet", "sell_planet", "spread", "amount"])
+
+
+class OpportunityDetector:
+    """
+    Watches the markets between two consecutive `/data` snapshots and reports spreads that have opened.
+
+    Only resources whose prices or amounts changed are re-scored, so a quiet tick costs a single comparison per market.
+    """
+
+    def __init__(self, min_spread=1, preempt_factor=1.5, top=5):
+        self.min_spread = min_spread
+        # new route must be this many times better than the current one to turn a shipper around
+        self.preempt_factor = preempt_factor
+        self.top = top
+
+        # (planet_id, resource_id) -> (buy_price, sell_price, amount)
+        self.markets: Dict[Tuple[str, str], Tuple] = {}
+        # resource_id -> {planet_id: (buy_price, sell_price, amount)}
+        self.by_resource: Dict[str, Dict[str, Tuple]] = collections.defaultdict(dict)
+        # resource_id -> best TradeOpportunity
+        self.best: Dict[str, TradeOpportunity] = {}
+
+    def update(self, planets) -> list:
+        """
+        :return: opportunities which opened or widened since the last snapshot, best first
+        """
+        changed = set()
+        seen = set()
+        for planet_id, planet in planets.items():
+            for resource_id, resource in planet.resources.items():
+                key = (planet_id, resource_id)
+                seen.add(key)
+                market = (resource.buy_price, resource.sell_price, resource.amount)
+                if self.markets.get(key) != market:
+                    self.markets[key] = market
+                    self.by_resource[resource_id][planet_id] = market
+                    changed.add(resource_id)
+        for key in self.markets.keys() - seen:
+            del self.markets[key]
+            del self.by_resource[key[1]][key[0]]
+            changed.add(key[1])
+
+        events = []
+        for resource_id in changed:
+            previous = self.best.get(resource_id)
+            opportunity = self._best_spread(resource_id)
+            if opportunity is None:
+                self.best.pop(resource_id, None)
+                continue
+            self.best[resource_id] = opportunity
+            if previous is None or opportunity.spread > previous.spread or opportunity[1:3] != previous[1:3]:
+                events.append(opportunity)
+
+        events.sort(key=lambda o: o.spread * o.amount, reverse=True)
+        return events
+
+    def _best_spread(self, resource_id) -> Optional[TradeOpportunity]:
+        offers = self.by_resource[resource_id]
+        buy = min(((m[0], planet_id, m[2]) for planet_id, m in offers.items() if m[0] and m[2]), default=None)
+        sell = max(((m[1], planet_id) for planet_id, m in offers.items() if m[1]), default=None)
+        if buy is None or sell is None or sell[0] - buy[0] < self.min_spread:
+            return None
+        return TradeOpportunity(resource=resource_id, buy_planet=buy[1], sell_planet=sell[1],
+                                spread=sell[0] - buy[0], amount=buy[2])
+
+    def route_yield(self, x, y, buy_planet_id, resource_id, amount, distances: PlanetDistances) -> float:
+        """
+        Expected profit per tick of buying `amount` on the planet and selling on the best known market.
+        """
+        best = self.best.get(resource_id)
+        market = self.markets.get((buy_planet_id, resource_id))
+        if best is None or market is None or not market[0]:
+            return 0
+        buy_pos = distances.positions[buy_planet_id]
+        distance = math.hypot(x - buy_pos[0], y - buy_pos[1]) + distances.get(buy_planet_id, best.sell_planet)
+        sell_price = self.markets[(best.sell_planet, resource_id)][1]
+        return (sell_price - market[0]) * amount / max(distance, 1)
+
+    def preempt(self, ships: Dict[str, Ship], events, distances: PlanetDistances, sizer: TradeSizer) -> dict:
+        """
+        Finds empty shippers already flying to buy, for which one of the new opportunities is much better.
+
+        :return: ship_id -> (TradeOpportunity, amount)
+        """
+        if not events:
+            return {}
+        events = events[:self.top]
+
+        redirects = {}
+        for ship_id, ship in ships.items():
+            command = ship.command
+            if ship.resources or command is None or command.type != "trade" or not command.amount or command.amount < 0:
+                continue
+            x, y = ship.position[0], ship.position[1]
+            current = self.route_yield(x, y, command.target, command.resource, command.amount, distances)
+            best_yield = current * self.preempt_factor
+            best = None
+            for opportunity in events:
+                buy_price = self.markets[(opportunity.buy_planet, opportunity.resource)][0]
+                amount = sizer.buy_amount(ship, opportunity.buy_planet, opportunity.resource, opportunity.amount,
+                                          buy_price, opportunity.sell_planet)
+                if amount <= 0:
+                    continue
+                ypt = self.route_yield(x, y, opportunity.buy_planet, opportunity.resource, amount, distances)
+                if ypt > best_yield:
+                    best_yield = ypt
+                    best = (opportunity, amount)
+            if best is not None:
+                opportunity, amount = best
+                buy_price = self.markets[(opportunity.buy_planet, opportunity.resource)][0]
+                sizer.reserve(opportunity.buy_planet, opportunity.resource, amount, buy_price, opportunity.sell_planet)
+                redirects[ship_id] = best
+
+        return redirects
+
+
+# profit: realized money of the sale minus cost of the goods, ticks: from the buy command to the sale
+LedgerEntry = collections.namedtuple("LedgerEntry", ["tick", "ship", "resource", "buy_planet", "sell_planet", "amount", "profit", "ticks"])
+
+
+class RollingYield:
+    __slots__ = ("window", "profit", "amount", "ticks")
+
+    def __init__(self, size):
+        self.window = collections.deque(maxlen=size)
+        self.profit = 0
+        self.amount = 0
+        self.ticks = 0
+
+    def add(self, profit, amount, ticks):
+        if len(self.window) == self.window.maxlen:
+            old_profit, old_amount, old_ticks = self.window[0]
+            self.profit -= old_profit
+            self.amount -= old_amount
+            self.ticks -= old_ticks
+        self.window.append((profit, amount, ticks))
+        self.profit += profit
+        self.amount += amount
+        self.ticks += ticks
+
+    def margin(self) -> float:
+        return self.profit / self.amount if self.amount else 0
+
+    def per_tick(self) -> float:
+        return self.profit / self.ticks if self.ticks else 0
+
+
+class TradeLedger:
+    """
+    Realized profit and loss of our trades.
+
+    Issued TradeCommands are joined with the `Reports.trade` entries of our ships. Each finished sale is appended
+    to `entries` and folded into rolling yields per shipper, route and resource, which are read in O(1).
+    Trade prices are taken as price per unit.
+    """
+
+    def __init__(self, window=20):
+        self.window = window
+        self.entries = []
+        # ship_id -> (tick, TradeCommand) of the last issued trade
+        self.issued: Dict[str, Tuple[int, object]] = {}
+        # ship_id -> resource_id -> [amount, cost, buy_planet, buy tick]
+        self.holds: Dict[str, Dict[str, list]] = collections.defaultdict(dict)
+
+        self.by_ship: Dict[str, RollingYield] = {}
+        self.by_route: Dict[Tuple[str, str, str], RollingYield] = {}
+        self.by_resource: Dict[str, RollingYield] = {}
+        self.total_profit = 0
+
+    def issue(self, ship_id, command, tick):
+        self.issued[ship_id] = (tick, command)
+
+    def update(self, trades, our_ships) -> list:
+        """
+        :param trades: `Reports.trade` entries of the last tick
+        :param our_ships: ids of our ships
+        :return: ledger entries closed by these trades
+        """
+        closed = []
+        for trade in trades or []:
+            if trade.buyer in our_ships:
+                self._bought(trade)
+            elif trade.seller in our_ships:
+                entry = self._sold(trade)
+                if entry is not None:
+                    closed.append(entry)
+
+        return closed
+
+    def _bought(self, trade):
+        issued_tick = trade.tick
+        issued = self.issued.get(trade.buyer)
+        if issued is not None and issued[1].resource == trade.resource and issued[1].amount > 0:
+            issued_tick = issued[0]
+        hold = self.holds[trade.buyer].get(trade.resource)
+        if hold is None:
+            self.holds[trade.buyer][trade.resource] = [trade.amount, trade.amount * trade.price, trade.seller, issued_tick]
+        else:
+            hold[0] += trade.amount
+            hold[1] += trade.amount * trade.price
+
+    def _sold(self, trade) -> Optional[LedgerEntry]:
+        hold = self.holds[trade.seller].get(trade.resource)
+        if hold is None:
+            "bought before we started to keep the books"
+            return None
+        amount = min(trade.amount, hold[0])
+        cost = hold[1] * amount / hold[0] if hold[0] else 0
+        hold[0] -= amount
+        hold[1] -= cost
+        if hold[0] <= 0:
+            del self.holds[trade.seller][trade.resource]
+
+        entry = LedgerEntry(
+            tick=trade.tick, ship=trade.seller, resource=trade.resource, buy_planet=hold[2], sell_planet=trade.buyer,
+            amount=amount, profit=amount * trade.price - cost, ticks=max(1, trade.tick - hold[3]),
+        )
+        self.entries.append(entry)
+        self.total_profit += entry.profit
+        for store, key in ((self.by_ship, entry.ship),
+                           (self.by_route, (entry.buy_planet, entry.sell_planet, entry.resource)),
+                           (self.by_resource, entry.resource)):
+            if key not in store:
+                store[key] = RollingYield(self.window)
+            store[key].add(entry.profit, entry.amount, entry.ticks)
+
+        return entry
+
+    def route_margin(self, buy_planet_id, sell_planet_id, resource_id) -> Optional[float]:
+        """
+        Recent realized profit per unit on the route, None if we have not traded it yet.
+        """
+        route = self.by_route.get((buy_planet_id, sell_planet_id, resource_id))
+        if route is None:
+            return None
+        return route.margin()
+
+    def ship_yield(self, ship_id) -> float:
+        ship = self.by_ship.get(ship_id)
+        return ship.per_tick() if ship is not None else 0
+
+    def resource_yield(self, resource_id) -> float:
+        resource = self.by_resource.get(resource_id)
+        return resource.per_tick() if resource is not None else 0
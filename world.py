@@ -0,0 +1,170 @@
+"""
+Copy-on-write world state for planners and simulations.
+
+A WorldState reads ships, planets and players from a `Data` snapshot in place and keeps only what changed since,
+so forking a state costs its changes and rolling one back costs the changes undone, never the size of the galaxy.
+
+    world = WorldState(game.data)
+    mark = world.checkpoint()
+    world.update("ships", ship_id, position=(x, y))
+    branch = world.fork()
+    world.rollback(mark)
+
+Records are namedtuples and never change, a change replaces a record. Positions are tuples, resources and commands
+are the objects of the snapshot and must be treated as read only.
+"""
+import collections
+import collections.abc
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from space_tycoon_client.models.data import Data
+
+ShipState = collections.namedtuple("ShipState", ["ship_class", "player", "position", "life", "resources", "command"])
+# resources: resource_id -> ResourceState
+PlanetState = collections.namedtuple("PlanetState", ["position", "resources"])
+ResourceState = collections.namedtuple("ResourceState", ["amount", "buy_price", "sell_price"])
+PlayerState = collections.namedtuple("PlayerState", ["name", "money"])
+
+TABLES = ("ships", "planets", "players")
+
+# marks a record deleted in the changes
+_DELETED = object()
+
+
+def _ship(ship) -> ShipState:
+    return ShipState(ship.ship_class, ship.player, (ship.position[0], ship.position[1]), ship.life,
+                     ship.resources or {}, ship.command)
+
+
+def _planet(planet) -> PlanetState:
+    return PlanetState((planet.position[0], planet.position[1]), {
+        resource_id: ResourceState(resource.amount, resource.buy_price, resource.sell_price)
+        for resource_id, resource in planet.resources.items()})
+
+
+def _player(player) -> PlayerState:
+    return PlayerState(player.name, player.net_worth.money if player.net_worth is not None else 0)
+
+
+class _Base:
+    """
+    The snapshot every state of one tick forks from. Records are built on first read and shared by all the forks.
+    """
+
+    def __init__(self, data: Data):
+        self.models = {"ships": data.ships, "planets": data.planets, "players": data.players}
+        self.convert = {"ships": _ship, "planets": _planet, "players": _player}
+        self.records: Dict[str, dict] = {table: {} for table in TABLES}
+
+    def get(self, table, key):
+        records = self.records[table]
+        record = records.get(key)
+        if record is None:
+            model = self.models[table].get(key)
+            if model is None:
+                return None
+            record = records[key] = self.convert[table](model)
+        return record
+
+
+class Table(collections.abc.Mapping):
+    """
+    Read only view of one table of a WorldState.
+    """
+
+    def __init__(self, world: "WorldState", name):
+        self.world = world
+        self.name = name
+
+    def __getitem__(self, key):
+        record = self.world.get(self.name, key)
+        if record is None:
+            raise KeyError(key)
+        return record
+
+    def __contains__(self, key):
+        return self.world.get(self.name, key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        changes = self.world.changes[self.name]
+        for key in self.world.base.models[self.name]:
+            if changes.get(key) is not _DELETED:
+                yield key
+        for key, record in changes.items():
+            if record is not _DELETED and key not in self.world.base.models[self.name]:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class WorldState:
+    """
+    Ships, planets and players of a snapshot plus the changes made on top of it.
+
+    :param data: snapshot of this tick, it is never modified
+    """
+
+    def __init__(self, data: Optional[Data] = None, base: Optional[_Base] = None):
+        self.base = base if base is not None else _Base(data)
+        # table -> key -> record, or _DELETED
+        self.changes: Dict[str, dict] = {table: {} for table in TABLES}
+        # (table, key, previous change or None) of every change, for rollback
+        self.undo: List[Tuple[str, str, object]] = []
+        self.ships = Table(self, "ships")
+        self.planets = Table(self, "planets")
+        self.players = Table(self, "players")
+
+    def get(self, table, key):
+        record = self.changes[table].get(key)
+        if record is None:
+            return self.base.get(table, key)
+        return None if record is _DELETED else record
+
+    def set(self, table, key, record):
+        changes = self.changes[table]
+        self.undo.append((table, key, changes.get(key)))
+        changes[key] = record
+
+    def update(self, table, key, **fields):
+        """
+        Replaces fields of a record.
+
+        :return: the new record
+        :raises KeyError: when there is no such record or it was deleted
+        """
+        record = self.get(table, key)
+        if record is None:
+            raise KeyError(key)
+        record = record._replace(**fields)
+        self.set(table, key, record)
+        return record
+
+    def delete(self, table, key):
+        self.set(table, key, _DELETED)
+
+    def fork(self) -> "WorldState":
+        """
+        A branch which starts from this state and changes independently of it.
+        """
+        branch = WorldState(base=self.base)
+        for table, changes in self.changes.items():
+            branch.changes[table] = dict(changes)
+        return branch
+
+    def checkpoint(self) -> int:
+        return len(self.undo)
+
+    def rollback(self, mark=0):
+        """
+        Undoes the changes made since `checkpoint` returned `mark`.
+        """
+        while len(self.undo) > mark:
+            table, key, previous = self.undo.pop()
+            if previous is None:
+                del self.changes[table][key]
+            else:
+                self.changes[table][key] = previous
+
+    def changed(self) -> int:
+        return sum(len(changes) for changes in self.changes.values())